@@ -0,0 +1,160 @@
+"""Benchmark: indexed BookStore vs. a linear scan, from 1k to 10M books.
+
+Builds synthetic corpora of increasing size and times the queries
+``search_database`` answers (whole word, word prefix, word fragment, phrase
+and a non-selective one) against ``BookStore.search`` and against the previous
+implementation, which lowercased every title and author on every call.
+The linear scan is only run up to ``--baseline-max-rows``.
+
+Usage (from the repository root):
+    PYTHONPATH=. python benchmarks/bench_book_store.py
+    PYTHONPATH=. python benchmarks/bench_book_store.py --sizes 1000 10000000 --from-file
+"""
+
+import argparse
+import csv
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(
+    0, str(Path(__file__).resolve().parent.parent / "projects" / "05_Tool_Use")
+)
+from book_store import BookStore  # noqa: E402
+
+QUERIES = {
+    "word": "gatsby",
+    "prefix": "The Great Gats",
+    "fragment": "atsb",
+    "phrase": "great gatsby",
+    "non-selective": "e",
+}
+
+
+def make_words(rng: random.Random, count: int) -> list:
+    return [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+        for _ in range(count)
+    ]
+
+
+def generate_rows(rows: int, seed: int = 7):
+    """Yield synthetic (title, author, copies) rows, with a Gatsby every 100k rows."""
+    rng = random.Random(seed)
+    words = make_words(rng, 50_000)
+    names = [word.title() for word in make_words(rng, 5_000)]
+    for row_id in range(rows):
+        if row_id % 100_000 == 0:
+            yield "The Great Gatsby", "F. Scott Fitzgerald", rng.randint(0, 20)
+            continue
+        title = " ".join(rng.choices(words, k=rng.randint(1, 6))).capitalize()
+        author = f"{rng.choice(names)} {rng.choice(names)}"
+        yield title, author, rng.randint(0, 20)
+
+
+def linear_search(books: list, query: str, limit: int) -> list:
+    """The previous ``search_database`` implementation, with a result limit."""
+    query_lower = query.lower()
+    results = []
+    for book in books:
+        if (
+            query_lower in book["title"].lower()
+            or query_lower in book["author"].lower()
+        ):
+            results.append(book)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def store_size(store: BookStore) -> int:
+    """Approximate memory used by the store, in bytes."""
+    size = sum(
+        sys.getsizeof(part)
+        for part in (
+            store.titles,
+            store.authors,
+            store.text,
+            store.title_offsets,
+            store.author_offsets,
+            store.text_offsets,
+            store.copies,
+            store.postings,
+            store.vocabulary,
+            store._vocabulary_blob,
+        )
+    )
+    size += sum(
+        sys.getsizeof(token) + sys.getsizeof(rows)
+        for token, rows in store.postings.items()
+    )
+    return size
+
+
+def time_query(search, query: str, repeat: int) -> float:
+    """Mean time of ``search(query)`` in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        search(query)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--baseline-max-rows", type=int, default=1_000_000)
+    parser.add_argument(
+        "--from-file", action="store_true", help="Also time loading from a CSV file"
+    )
+    args = parser.parse_args()
+
+    for rows in args.sizes:
+        start = time.perf_counter()
+        store = BookStore(generate_rows(rows))
+        build = time.perf_counter() - start
+        print(
+            f"\n📚 {rows:,} books: built in {build:.2f}s, "
+            f"~{store_size(store) / 2**20:.0f} MiB, {len(store.vocabulary):,} words"
+        )
+
+        if args.from_file:
+            with tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / "books.csv"
+                with open(path, "w", newline="", encoding="utf-8") as csv_file:
+                    writer = csv.writer(csv_file)
+                    writer.writerow(["title", "author", "copies"])
+                    writer.writerows(generate_rows(rows))
+                start = time.perf_counter()
+                BookStore.from_file(path)
+                print(f"   loaded from CSV in {time.perf_counter() - start:.2f}s")
+
+        books = None
+        if rows <= args.baseline_max_rows:
+            books = [
+                {"title": title, "author": author, "copies": copies}
+                for title, author, copies in generate_rows(rows)
+            ]
+
+        print(f"   {'query':<16}{'matches':>9}{'index (µs)':>14}{'scan (µs)':>14}")
+        for name, query in QUERIES.items():
+            matches = len(store.search(query, args.limit))
+            indexed = time_query(
+                lambda q: store.search(q, args.limit), query, args.repeat
+            )
+            scan = (
+                f"{time_query(lambda q: linear_search(books, q, args.limit), query, max(1, args.repeat // 50)):>14.1f}"
+                if books is not None
+                else f"{'-':>14}"
+            )
+            print(f"   {name:<16}{matches:>9}{indexed:>14.1f}{scan}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark: start-up time of the workflow command line.
+
+Runs ``python -m shared.cli --help`` and ``<subcommand> --help`` in fresh
+interpreters ``--repeat`` times and checks their median against
+``--target-ms``: they must not import any workflow. It also times loading each
+workflow module (LangChain and the OpenAI client included), which is the
+start-up cost a subcommand pays before its first LLM call.
+
+Exits with code 1 when a ``--help`` run misses the target.
+
+Usage (from the repository root):
+    PYTHONPATH=. python benchmarks/bench_cli_startup.py --repeat 10 --target-ms 150
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from shared.cli import WORKFLOW_PROJECTS  # noqa: E402
+
+
+def time_command(command: list, repeat: int, env: dict) -> float:
+    """Median wall time of ``command`` in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            command,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(ROOT), env.get("PYTHONPATH")])
+    )
+    cli = [sys.executable, "-m", "shared.cli"]
+
+    interpreter = time_command([sys.executable, "-c", "pass"], args.repeat, env)
+    print(
+        f"Python start-up: {interpreter:.0f} ms, target for --help: {args.target_ms:.0f} ms"
+    )
+    print(f"{'command':<40}{'median (ms)':>12}")
+
+    missed = []
+    for name in [None, *WORKFLOW_PROJECTS]:
+        command = cli + ([name] if name else []) + ["--help"]
+        label = " ".join(["cli"] + ([name] if name else []) + ["--help"])
+        median = time_command(command, args.repeat, env)
+        status = "✅" if median <= args.target_ms else "⚠️"
+        print(f"{label:<40}{median:>12.0f} {status}")
+        if median > args.target_ms:
+            missed.append(label)
+
+    for name in WORKFLOW_PROJECTS:
+        code = f"from shared.cli import load_workflow; load_workflow({name!r})"
+        median = time_command([sys.executable, "-c", code], args.repeat, env)
+        print(f"{'load ' + name:<40}{median:>12.0f}")
+
+    if missed:
+        print(f"\n⚠️ Missed the {args.target_ms:.0f} ms target: {', '.join(missed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
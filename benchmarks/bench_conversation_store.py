@@ -0,0 +1,118 @@
+"""Benchmark: memory per session of the Tool Use conversation store.
+
+Simulates ``--sessions`` conversations of ``--turns`` questions each (question,
+tool call, tool result, answer) and measures with ``tracemalloc`` the memory
+held by an unbounded history (what the class-level list used to keep), by a
+``ConversationStore`` trimmed to ``--token-budget``, and after its idle
+sessions were spilled to disk.
+
+Usage (from the repository root):
+    PYTHONPATH=. python benchmarks/bench_conversation_store.py --sessions 2000 --turns 20
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+sys.path.insert(
+    0, str(Path(__file__).resolve().parent.parent / "projects" / "05_Tool_Use")
+)
+from conversation_store import ConversationStore  # noqa: E402
+
+TOOL_RESULT = (
+    '{"total":3,"columns":["title","author","copies"],"rows":'
+    '[["The Great Gatsby","F. Scott Fitzgerald",10],["1984","George Orwell",5],'
+    '["To Kill a Mockingbird","Harper Lee",3]]}'
+)
+
+
+def turn(session: int, number: int) -> list:
+    call_id = f"call_{session}_{number}"
+    return [
+        HumanMessage(content=f"How many copies of book {number} are there?"),
+        AIMessage(
+            content="",
+            tool_calls=[
+                {"name": "search_database", "args": {"query": "gatsby"}, "id": call_id}
+            ],
+        ),
+        ToolMessage(content=TOOL_RESULT, tool_call_id=call_id),
+        AIMessage(content=f"There are {number} copies of book {number}."),
+    ]
+
+
+def measure(fill) -> tuple:
+    """Memory allocated by ``fill()`` (kept alive) and the time it took."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = fill()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--token-budget", type=int, default=1000)
+    args = parser.parse_args()
+
+    def unbounded():
+        histories = {}
+        for session in range(args.sessions):
+            history = [SystemMessage(content="You are an assistant.")]
+            for number in range(args.turns):
+                history.extend(turn(session, number))
+            histories[session] = history
+        return histories
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = ConversationStore(
+            token_budget=args.token_budget, spill_dir=spill_dir, idle_seconds=0
+        )
+
+        def bounded():
+            for session in range(args.sessions):
+                session_id = f"session-{session}"
+                store.append(session_id, SystemMessage(content="You are an assistant."))
+                for number in range(args.turns):
+                    store.append(session_id, *turn(session, number))
+            return store
+
+        _, unbounded_bytes, unbounded_time = measure(unbounded)
+        tracemalloc.start()
+        start = time.perf_counter()
+        bounded()
+        bounded_time = time.perf_counter() - start
+        bounded_bytes, _ = tracemalloc.get_traced_memory()
+        spilled = store.spill_idle()
+        spilled_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        on_disk = sum(path.stat().st_size for path in Path(spill_dir).glob("*.json"))
+
+    per_session = lambda total: total / args.sessions / 1024  # noqa: E731
+    print(
+        f"{args.sessions} sessions x {args.turns} turns, budget {args.token_budget} tokens"
+    )
+    print(f"{'history':<28}{'KiB/session':>14}{'build (s)':>12}")
+    print(
+        f"{'unbounded list':<28}{per_session(unbounded_bytes):>14.1f}{unbounded_time:>12.2f}"
+    )
+    print(
+        f"{'ConversationStore':<28}{per_session(bounded_bytes):>14.1f}{bounded_time:>12.2f}"
+    )
+    print(
+        f"\nSpilled {spilled} idle sessions: {per_session(spilled_bytes):.1f} KiB/session left in memory, "
+        f"{on_disk / args.sessions / 1024:.1f} KiB/session on disk"
+    )
+
+
+if __name__ == "__main__":
+    main()
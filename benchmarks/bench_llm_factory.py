@@ -0,0 +1,119 @@
+"""Benchmark: one HTTP client per model vs. the shared LLMClientFactory pool.
+
+Starts ``StubOpenAIServer`` locally and creates ``--models`` chat models, as
+that many workflow instances would, each sending ``--calls`` requests one
+after the other, all models at the same time. It is run twice: with a new
+``httpx`` client per model (what every ``ChatOpenAI`` built on its own used
+to amount to) and with models from an ``LLMClientFactory`` sharing one pool.
+It reports model creation time, wall time, latency percentiles and the TCP
+connections the stub server saw.
+
+The stub is local and speaks plain HTTP, so the connection cost measured
+here is a TCP handshake only; against the real API every new connection
+also costs a TLS handshake.
+
+Usage (from the repository root):
+    PYTHONPATH=. python benchmarks/bench_llm_factory.py --models 50 --calls 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from shared.llm_factory import HttpPoolConfig, LLMClientFactory
+from shared.stub_openai_server import StubOpenAIServer
+
+
+def per_model_clients(count: int, config: HttpPoolConfig) -> list:
+    return [
+        ChatOpenAI(
+            model="gpt-4o-mini",
+            temperature=0,
+            timeout=config.timeout(),
+            http_async_client=httpx.AsyncClient(timeout=config.timeout()),
+        )
+        for _ in range(count)
+    ]
+
+
+def shared_pool(count: int, config: HttpPoolConfig) -> list:
+    factory = LLMClientFactory(config)
+    return [factory.chat_model("gpt-4o-mini", temperature=0) for _ in range(count)]
+
+
+async def run(stub: StubOpenAIServer, build, args) -> dict:
+    config = HttpPoolConfig(
+        max_connections=args.max_connections,
+        max_keepalive_connections=args.max_connections,
+    )
+    connections_before = len(stub.connections)
+    start = time.perf_counter()
+    models = build(args.models, config)
+    creation = time.perf_counter() - start
+    latencies = []
+
+    async def instance(model, number: int):
+        for call in range(args.calls):
+            started = time.perf_counter()
+            await model.ainvoke(f"Request {call} of model {number}")
+            latencies.append(time.perf_counter() - started)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(instance(model, i) for i, model in enumerate(models)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "creation_ms": creation * 1000,
+        "wall_s": wall,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "connections": len(stub.connections) - connections_before,
+    }
+
+
+async def main_async(args) -> None:
+    stub = StubOpenAIServer(reply="ok", latency_ms=args.latency_ms)
+    os.environ["OPENAI_BASE_URL"] = await stub.start()
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    # Identical prompts would be answered by the cache, keep it out of the measurement
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    try:
+        print(
+            f"{args.models} models x {args.calls} calls, stub latency "
+            f"{args.latency_ms:.0f} ms, pool of {args.max_connections} connections"
+        )
+        print(
+            f"{'clients':<20}{'create (ms)':>12}{'wall (s)':>10}{'p50 (ms)':>10}"
+            f"{'p95 (ms)':>10}{'connections':>13}"
+        )
+        for name, build in (
+            ("one per model", per_model_clients),
+            ("shared factory", shared_pool),
+        ):
+            result = await run(stub, build, args)
+            print(
+                f"{name:<20}{result['creation_ms']:>12.0f}{result['wall_s']:>10.2f}"
+                f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+                f"{result['connections']:>13}"
+            )
+    finally:
+        await stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--max-connections", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
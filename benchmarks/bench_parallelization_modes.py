@@ -0,0 +1,107 @@
+"""Benchmark: fan-out vs. fused analysis in the Parallelization workflow.
+
+Runs the same comments through ``ParallelizationWorkflow`` in "fanout" mode
+(four branch calls plus a synthesis call) and in "fused" mode (one
+structured-output call), against ``FakeChatModel`` with a per-call latency,
+and compares LLM calls, tokens and latency per comment.
+
+Token counts are estimated by the fake model from the prompt and reply
+lengths, so they compare the prompt overhead of both modes, not real usage.
+
+Usage (from the repository root):
+    PYTHONPATH=. python benchmarks/bench_parallelization_modes.py --comments 50
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from langchain_core.callbacks import get_usage_metadata_callback
+
+from shared.fake_llm import FakeChatModel
+
+sys.path.insert(
+    0, str(Path(__file__).resolve().parent.parent / "projects" / "03_parallelization")
+)
+from main import ParallelizationWorkflow  # noqa: E402
+
+COMMENTS = [
+    "The new release is great, but the documentation is out of date.",
+    "This feature broke my whole workflow, please revert it!",
+    "I think the pricing is fair for what you get.",
+    "Why does the app take so long to start on older phones?",
+]
+
+
+def fake_reply(messages) -> str:
+    """Answer the fused prompt with JSON and every other prompt with text."""
+    if "JSON" in messages[0].content:
+        return json.dumps(
+            {
+                "sentiment": "mixed",
+                "criteria": "objective and constructive",
+                "response": "Thank you for the feedback, we will look into it.",
+                "key_points": ["release quality", "documentation"],
+                "synthesis": "A constructive, mixed comment that deserves a thankful reply.",
+            }
+        )
+    return "A short analysis of the comment, written in a couple of sentences."
+
+
+async def run_mode(mode: str, comments: int, latency_ms: float, jitter: float):
+    rng = random.Random(42)
+    llm = FakeChatModel(
+        reply=fake_reply,
+        latency=lambda call: latency_ms / 1000 * rng.uniform(1 - jitter, 1 + jitter),
+    )
+    workflow = ParallelizationWorkflow(llm=llm, mode=mode)
+    latencies = []
+    # The workflow logs every branch call, keep that out of the report
+    with get_usage_metadata_callback() as usage, contextlib.redirect_stdout(
+        io.StringIO()
+    ):
+        for i in range(comments):
+            start = time.perf_counter()
+            await workflow.analyze_comment(COMMENTS[i % len(COMMENTS)])
+            latencies.append(time.perf_counter() - start)
+    tokens = sum(
+        model_usage["input_tokens"] + model_usage["output_tokens"]
+        for model_usage in usage.usage_metadata.values()
+    )
+    return llm.calls / comments, tokens / comments, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comments", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument(
+        "--jitter", type=float, default=0.5, help="Relative latency jitter per call"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"Comments: {args.comments}, model latency {args.latency_ms:.0f} ms ±{args.jitter:.0%}"
+    )
+    print(f"{'mode':<10}{'calls':>8}{'tokens':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+    for mode in ("fanout", "fused"):
+        calls, tokens, latencies = asyncio.run(
+            run_mode(mode, args.comments, args.latency_ms, args.jitter)
+        )
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        print(
+            f"{mode:<10}{calls:>8.1f}{tokens:>10.0f}"
+            f"{statistics.median(latencies) * 1000:>12.0f}{p95 * 1000:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
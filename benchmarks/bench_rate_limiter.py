@@ -0,0 +1,116 @@
+"""Benchmark: concurrent calls against a rate limited API, with and without the limiter.
+
+Starts ``StubOpenAIServer`` with a requests-per-minute budget and a cap on the
+requests it serves at once (both answered with a 429 and ``retry-after``
+beyond), then sends ``--calls`` chat completions ``--concurrency`` at a time,
+as several workflows sharing a process would. It is run twice: through an
+``LLMClientFactory`` without a rate limiter (every call retried on its own by
+the OpenAI client) and with an ``AdaptiveRateLimiter`` shared by all calls.
+It reports the 429s the server sent, the calls that failed once their
+retries ran out, wall time and the final state of the limiter.
+
+Usage (from the repository root):
+    PYTHONPATH=. python benchmarks/bench_rate_limiter.py --calls 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Optional
+
+import openai
+
+from shared.llm_factory import HttpPoolConfig, LLMClientFactory
+from shared.rate_limiter import AdaptiveRateLimiter
+from shared.stub_openai_server import StubOpenAIServer
+
+
+async def run(
+    stub: StubOpenAIServer, limiter: Optional[AdaptiveRateLimiter], args
+) -> dict:
+    factory = LLMClientFactory(HttpPoolConfig(max_retries=args.max_retries), limiter)
+    model = factory.chat_model("gpt-4o-mini", temperature=0)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    throttled_before = stub.throttled
+    failures = 0
+
+    async def call(number: int):
+        nonlocal failures
+        async with semaphore:
+            try:
+                await model.ainvoke(f"Request {number}")
+            except openai.RateLimitError:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(args.calls)))
+    return {
+        "wall_s": time.perf_counter() - start,
+        "throttled": stub.throttled - throttled_before,
+        "failures": failures,
+        "limiter": limiter.stats() if limiter else None,
+    }
+
+
+async def main_async(args) -> None:
+    stub = StubOpenAIServer(
+        reply="ok",
+        latency_ms=args.latency_ms,
+        requests_per_minute=args.server_rpm,
+        max_concurrent_requests=args.server_concurrency,
+    )
+    os.environ["OPENAI_BASE_URL"] = await stub.start()
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    # Identical prompts would be answered by the cache, keep it out of the measurement
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    try:
+        print(
+            f"{args.calls} calls, {args.concurrency} at a time; server: "
+            f"{args.server_rpm} RPM, {args.server_concurrency} concurrent, "
+            f"{args.latency_ms:.0f} ms latency; {args.max_retries} retries per call"
+        )
+        print(f"{'limiter':<12}{'429s':>8}{'failed':>8}{'wall (s)':>10}  state")
+        for name, limiter in (
+            ("none", None),
+            (
+                "adaptive",
+                AdaptiveRateLimiter(
+                    requests_per_minute=args.rpm,
+                    max_concurrency=args.concurrency,
+                ),
+            ),
+        ):
+            result = await run(stub, limiter, args)
+            state = ""
+            if result["limiter"]:
+                stats = result["limiter"]
+                state = (
+                    f"limit {stats['limit']}, {stats['decreases']} decreases, "
+                    f"queue {stats['queue_depth']}, waited {stats['wait_seconds']} s"
+                )
+            print(
+                f"{name:<12}{result['throttled']:>8}{result['failures']:>8}"
+                f"{result['wall_s']:>10.2f}  {state}"
+            )
+    finally:
+        await stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--server-rpm", type=int, default=3000)
+    parser.add_argument("--server-concurrency", type=int, default=8)
+    parser.add_argument(
+        "--rpm", type=float, help="RPM budget of the limiter (default: none)"
+    )
+    parser.add_argument("--max-retries", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
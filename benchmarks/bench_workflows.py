@@ -0,0 +1,374 @@
+"""Benchmark: all five workflows end to end against a scripted fake model.
+
+Each workflow gets a ``FakeChatModel`` through its ``llm`` argument, answering
+with a ``ScriptedReply`` (topic lists and outlines as JSON, routing labels,
+critiques, tool calls...). Latency per call is log-normal around
+``--latency-ms`` and free-text replies are between ``--min-reply-tokens`` and
+``--max-reply-tokens`` long, picked from a hash of the prompt so that runs are
+reproducible.
+
+For every workflow it reports the wall time, LLM calls, tokens (estimated by
+the fake model), the peak memory allocated (``tracemalloc``, measured in a
+second run so it does not slow down the timed one) and the most LLM calls in
+flight at once. ``--save`` writes the results to a baseline JSON file and
+``--compare`` fails (exit code 1) when a result regressed against one, by more
+than ``--tolerance`` and by at least the noise floor of the metric (0.1 s of
+wall time, 0.25 MiB of memory).
+
+Usage (from the repository root):
+    PYTHONPATH=. python benchmarks/bench_workflows.py
+    PYTHONPATH=. python benchmarks/bench_workflows.py --save benchmarks/baseline.json
+    PYTHONPATH=. python benchmarks/bench_workflows.py --compare benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import zlib
+from pathlib import Path
+
+from langchain_core.callbacks import get_usage_metadata_callback
+from langchain_core.messages import AIMessage, ToolMessage
+
+from shared.cli import load_workflow
+from shared.fake_llm import (
+    FakeChatModel,
+    ScriptedReply,
+    filler_text,
+    lognormal_latency,
+)
+
+ROUTING_REQUESTS = [
+    "What's the weather in Paris?",
+    "Show me the latest news headlines",
+    "How are tech stocks doing on the Nasdaq?",
+    "Can you help me with something?",
+    "What do you think about Paris?",
+    "How is Apple doing?",
+]
+COMMENTS = [
+    "The new release is great, but the documentation is out of date.",
+    "This feature broke my whole workflow, please revert it!",
+    "I think the pricing is fair for what you get.",
+    "Why does the app take so long to start on older phones?",
+]
+FUSED_ANALYSIS = {
+    "sentiment": "mixed",
+    "criteria": "objective and constructive",
+    "response": "Thank you for the feedback, we will look into it.",
+    "key_points": ["release quality", "documentation"],
+    "synthesis": "A constructive, mixed comment that deserves a thankful reply.",
+}
+
+# Compared with --compare: metric -> whether higher is worse
+METRICS = {
+    "wall_s": True,
+    "llm_calls": True,
+    "tokens": True,
+    "peak_mib": True,
+    "max_in_flight": False,
+}
+# Changes smaller than these are noise, whatever their relative size: most
+# workflows run in a few tenths of a second and allocate under a MiB
+ABSOLUTE_FLOORS = {
+    "wall_s": 0.1,
+    "peak_mib": 0.25,
+}
+
+
+def text_reply(min_tokens: int, max_tokens: int):
+    """Free-text reply whose length only depends on the prompt."""
+
+    def reply(messages) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        rng = random.Random(zlib.crc32(prompt.encode("utf-8")))
+        return filler_text(rng.randint(min_tokens, max_tokens))
+
+    return reply
+
+
+def route_label(messages) -> str:
+    request = str(messages[-1].content).lower()
+    for keyword, label in (
+        ("weather", "weather"),
+        ("news", "news"),
+        ("stock", "stock_market"),
+        ("apple", "stock_market"),
+    ):
+        if keyword in request:
+            return label
+    return "unclear"
+
+
+def search_call(messages) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "search_database",
+                "args": {"query": "The Great Gatsby"},
+                "id": f"call_{len(messages)}",
+            }
+        ],
+    )
+
+
+def make_script(args) -> ScriptedReply:
+    """Replies of every workflow prompt, first matching rule wins."""
+    outline = [f"Section {i}" for i in range(1, args.sections + 1)]
+    return ScriptedReply(
+        [
+            # Tool Use: answer once the tool results are in, request them first
+            (
+                lambda messages: isinstance(messages[-1], ToolMessage),
+                "There are 10 copies of 'The Great Gatsby' in the database.",
+            ),
+            ("search a database of books", search_call),
+            # Prompt Chaining
+            ("topic ideas", json.dumps([f"Topic {i}" for i in range(1, 6)])),
+            ("detailed, comprehensive outline", json.dumps(outline)),
+            # Routing
+            ("Only output one word", route_label),
+            # Parallelization, fused mode
+            ("JSON", json.dumps(FUSED_ANALYSIS)),
+            # Reflection: critics always find something, loops run to max_iterations
+            (
+                "RESULT_IS_PERFECT",
+                "- Question 3 tests recall, ask about causes instead\n"
+                "- Question 7 is too hard for high school students",
+            ),
+        ],
+        default=text_reply(args.min_reply_tokens, args.max_reply_tokens),
+    )
+
+
+def run_prompt_chaining(llm, args):
+    module = load_workflow("prompt-chaining")
+    workflow = module.PromptChainingWorkflow(llm=llm)
+    workflow.run_complete_workflow(
+        "artificial intelligence",
+        auto_select=True,
+        concurrent_sections=True,
+        max_concurrency=args.max_concurrency,
+    )
+
+
+def run_routing(llm, args):
+    module = load_workflow("routing")
+    workflow = module.RoutingWorkflow(llm=llm)
+    requests = [
+        ROUTING_REQUESTS[i % len(ROUTING_REQUESTS)] + f" (#{i})"
+        for i in range(args.requests)
+    ]
+    workflow.route_many(requests, max_concurrency=args.max_concurrency)
+
+
+def run_parallelization(llm, args):
+    module = load_workflow("parallelization")
+    workflow = module.ParallelizationWorkflow(
+        llm=llm, max_in_flight_calls=args.max_concurrency
+    )
+
+    async def comments():
+        for i in range(args.requests):
+            yield COMMENTS[i % len(COMMENTS)]
+
+    async def consume():
+        async for outcome in workflow.process_comments(comments()):
+            if "error" in outcome:
+                raise RuntimeError(f"Comment analysis failed: {outcome['error']}")
+
+    asyncio.run(consume())
+
+
+def run_reflection(llm, args):
+    module = load_workflow("reflection")
+    workflow = module.ReflectionWorkflow(llm=llm)
+    tasks = [module.ReflectionTask(task_id=str(i)) for i in range(args.tasks)]
+
+    async def consume():
+        async for result in workflow.run_many(
+            tasks, max_concurrent_calls=args.max_concurrency
+        ):
+            if result.error:
+                raise RuntimeError(f"Reflection task failed: {result.error}")
+
+    asyncio.run(consume())
+
+
+def run_tool_use(llm, args):
+    module = load_workflow("tool-use")
+    workflow = module.ToolUseWorkflow(llm=llm)
+
+    async def sessions():
+        await asyncio.gather(
+            *(
+                workflow.arun(module.DEFAULT_QUESTION, session_id=f"session-{i}")
+                for i in range(args.requests)
+            )
+        )
+
+    try:
+        asyncio.run(sessions())
+    finally:
+        workflow.registry.shutdown()
+
+
+WORKFLOWS = {
+    "prompt_chaining": run_prompt_chaining,
+    "routing": run_routing,
+    "parallelization": run_parallelization,
+    "reflection": run_reflection,
+    "tool_use": run_tool_use,
+}
+
+
+def run_once(run, args, trace_memory: bool) -> dict:
+    """Run one workflow with a fresh fake model and measure it."""
+    llm = FakeChatModel(
+        reply=make_script(args),
+        latency=lognormal_latency(
+            args.latency_ms / 1000, sigma=args.latency_sigma, seed=args.seed
+        ),
+    )
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    # The workflows print every step, keep that out of the report
+    with get_usage_metadata_callback() as usage, contextlib.redirect_stdout(
+        io.StringIO()
+    ):
+        run(llm, args)
+    wall = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "wall_s": round(wall, 3),
+        "llm_calls": llm.calls,
+        "tokens": sum(
+            model_usage["input_tokens"] + model_usage["output_tokens"]
+            for model_usage in usage.usage_metadata.values()
+        ),
+        "peak_mib": round(peak / 2**20, 2),
+        "max_in_flight": llm.max_in_flight,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions of ``results`` against ``baseline``, as readable lines.
+
+    A metric regresses when it changed by more than ``tolerance`` relative to
+    the baseline and by at least its ``ABSOLUTE_FLOORS`` entry.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for metric, higher_is_worse in METRICS.items():
+            old, new = previous.get(metric), metrics[metric]
+            if not old or (metric == "peak_mib" and not new):
+                continue
+            if abs(new - old) < ABSOLUTE_FLOORS.get(metric, 0):
+                continue
+            change = (new - old) / old
+            if change > tolerance if higher_is_worse else change < -tolerance:
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--workflows", nargs="+", choices=list(WORKFLOWS), default=list(WORKFLOWS)
+    )
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--min-reply-tokens", type=int, default=100)
+    parser.add_argument("--max-reply-tokens", type=int, default=400)
+    parser.add_argument(
+        "--requests", type=int, default=50, help="Routing requests, comments, sessions"
+    )
+    parser.add_argument("--tasks", type=int, default=10, help="Reflection tasks")
+    parser.add_argument("--sections", type=int, default=6, help="Outline sections")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--skip-memory", action="store_true", help="Do not measure peak memory"
+    )
+    parser.add_argument("--save", type=Path, help="Write the results to this file")
+    parser.add_argument("--compare", type=Path, help="Baseline file to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Relative change tolerated before a metric counts as a regression",
+    )
+    args = parser.parse_args()
+
+    config = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("workflows", "save", "compare", "tolerance", "skip_memory")
+    }
+    results = {}
+    print(
+        f"{'workflow':<18}{'wall (s)':>10}{'calls':>8}{'tokens':>10}"
+        f"{'peak MiB':>10}{'in flight':>11}"
+    )
+    # Import the workflows up front, so the timed runs do not include it
+    for name in args.workflows:
+        load_workflow(name.replace("_", "-"))
+    for name in args.workflows:
+        results[name] = run_once(WORKFLOWS[name], args, trace_memory=False)
+        if not args.skip_memory:
+            traced = run_once(WORKFLOWS[name], args, trace_memory=True)
+            results[name]["peak_mib"] = traced["peak_mib"]
+        metrics = results[name]
+        print(
+            f"{name:<18}{metrics['wall_s']:>10.2f}{metrics['llm_calls']:>8}"
+            f"{metrics['tokens']:>10}{metrics['peak_mib']:>10.2f}"
+            f"{metrics['max_in_flight']:>11}"
+        )
+
+    if args.save:
+        args.save.write_text(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "config": config,
+                    "results": results,
+                },
+                indent=2,
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+        print(f"\n✅ Baseline saved to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if baseline.get("config") != config:
+            print(
+                f"\n⚠️ {args.compare} was recorded with other settings: {baseline.get('config')}"
+            )
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} regression(s) against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\n✅ No regression against {args.compare} (±{args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Batch mode for the Prompt Chaining workflow
+
+Reads interests from a JSONL file (one ``{"interest": "..."}`` object per line,
+an optional ``"id"`` is copied to the output) and runs
+``run_complete_workflow(auto_select=True)`` for many of them at once:
+
+- at most ``--max-concurrency`` workflows run at the same time
+- ``--rate`` optionally caps how many workflows start per second
+- each result is appended to the output JSONL as soon as it finishes
+- a failing item is recorded with its error and does not stop the run
+
+Usage:
+    python batch.py interests.jsonl results.jsonl --max-concurrency 8 --rate 2
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional
+
+from asyncio_throttle import Throttler
+from main import PromptChainingWorkflow
+
+
+def read_items(input_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield one item per non-empty JSONL line, keeping malformed lines as errors."""
+    with open(input_path, encoding="utf-8") as input_file:
+        for line_number, line in enumerate(input_file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                if isinstance(item, str):
+                    item = {"interest": item}
+                item.setdefault("id", line_number)
+                if not item.get("interest"):
+                    raise ValueError("missing 'interest'")
+            except (json.JSONDecodeError, AttributeError, ValueError) as e:
+                item = {"id": line_number, "error": f"Invalid input line: {e}"}
+            yield item
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    max_concurrency: int = 8,
+    rate_limit: Optional[float] = None,
+    concurrent_sections: bool = False,
+) -> Dict[str, int]:
+    """Run the workflow for every interest of ``input_path``.
+
+    Each concurrent slot owns its own ``PromptChainingWorkflow`` (the workflow
+    keeps per-run state) and runs it in a worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    workflows: asyncio.Queue = asyncio.Queue()
+    for _ in range(max_concurrency):
+        workflows.put_nowait(PromptChainingWorkflow())
+    throttler = Throttler(rate_limit=rate_limit, period=1.0) if rate_limit else None
+    summary = {"succeeded": 0, "failed": 0}
+
+    async def run_item(item: Dict[str, Any]) -> Dict[str, Any]:
+        if "error" in item:
+            return {"id": item["id"], "status": "error", "error": item["error"]}
+        workflow = await workflows.get()
+        start = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(
+                executor,
+                lambda: workflow.run_complete_workflow(
+                    item["interest"],
+                    auto_select=True,
+                    concurrent_sections=concurrent_sections,
+                ),
+            )
+            record = {"id": item["id"], "status": "ok", **result}
+        except Exception as e:
+            record = {"id": item["id"], "status": "error", "error": str(e)}
+        finally:
+            workflows.put_nowait(workflow)
+        record["duration"] = round(time.perf_counter() - start, 3)
+        return record
+
+    with open(output_path, "a", encoding="utf-8") as output_file:
+        in_flight = set()
+
+        def write_finished(done) -> None:
+            for task in done:
+                record = task.result()
+                summary["succeeded" if record["status"] == "ok" else "failed"] += 1
+                output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output_file.flush()
+                print(f"📦 [{record['id']}] {record['status']}")
+
+        for item in read_items(input_path):
+            # Only read the next line once a slot is free, so memory stays bounded
+            if len(in_flight) >= max_concurrency:
+                done, in_flight = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                write_finished(done)
+            if throttler:
+                async with throttler:
+                    pass
+            in_flight.add(asyncio.create_task(run_item(item)))
+
+        if in_flight:
+            done, _ = await asyncio.wait(in_flight)
+            write_finished(done)
+
+    executor.shutdown()
+    return summary
+
+
+def main():
+    """Parse the command line and run the batch."""
+    parser = argparse.ArgumentParser(
+        description="Run the Prompt Chaining workflow over a JSONL file of interests."
+    )
+    parser.add_argument("input", help="JSONL file with one interest per line")
+    parser.add_argument("output", help="JSONL file the results are appended to")
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of workflows running at the same time",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=None, help="Maximum workflows started per second"
+    )
+    parser.add_argument(
+        "--concurrent-sections",
+        action="store_true",
+        help="Draft the sections of each article concurrently",
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = asyncio.run(
+        run_batch(
+            args.input,
+            args.output,
+            max_concurrency=args.max_concurrency,
+            rate_limit=args.rate,
+            concurrent_sections=args.concurrent_sections,
+        )
+    )
+    print("\n📊 Batch Summary:")
+    print(f"• Succeeded: {summary['succeeded']}")
+    print(f"• Failed: {summary['failed']}")
+    print(f"• Total time: {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Context builder for the section drafting step of the Prompt Chaining workflow.
+
+Sending every finished section back as context makes prompt size grow with
+each section, so the total cost of drafting grows quadratically with the
+outline length. The builder keeps the context under a fixed token budget:
+the most recent sections are kept verbatim, older ones are replaced by short
+rolling summaries.
+"""
+
+import re
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about 4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def summarize_section(content: str, max_words: int = 40) -> str:
+    """Local extractive summary: the leading sentences of a section, capped in words."""
+    sentences = re.split(r"(?<=[.!?])\s+", " ".join(content.split()))
+    words: List[str] = []
+    for sentence in sentences:
+        sentence_words = sentence.split()
+        if words and len(words) + len(sentence_words) > max_words:
+            break
+        words.extend(sentence_words)
+    if len(words) > max_words:
+        return " ".join(words[:max_words]) + "..."
+    return " ".join(words)
+
+
+class SectionContextBuilder:
+    """Builds the drafting context for the next section under a token budget."""
+
+    def __init__(
+        self,
+        topic: str,
+        token_budget: int = 2000,
+        recent_sections: int = 2,
+        summary_words: int = 40,
+        summarizer: Optional[Callable[[str], str]] = None,
+        token_counter: Callable[[str], int] = estimate_tokens,
+    ):
+        """Initialize the builder.
+
+        Args:
+            topic: The article topic, always included in the context
+            token_budget: Maximum number of tokens the built context may use
+            recent_sections: Number of latest sections kept verbatim
+            summary_words: Length of the local summary of older sections
+            summarizer: Optional replacement for the local summary (e.g. an LLM call)
+            token_counter: Function used to count tokens in a text
+        """
+        self.topic = topic
+        self.token_budget = token_budget
+        self.summary_words = summary_words
+        self.summarizer = summarizer
+        self.token_counter = token_counter
+        self._recent: Deque[Tuple[str, str]] = deque()
+        self._recent_limit = recent_sections
+        self._summaries: List[str] = []
+
+    def add_section(self, heading: str, content: str) -> None:
+        """Record a finished section, rolling the oldest verbatim one into a summary."""
+        self._recent.append((heading, content))
+        while len(self._recent) > self._recent_limit:
+            self._summarize_oldest_recent()
+
+    def build(self) -> str:
+        """Build the context for the next section, trimmed to the token budget."""
+        context = self._render()
+        while self.token_counter(context) > self.token_budget:
+            if self._recent:
+                self._summarize_oldest_recent()
+            elif self._summaries:
+                self._summaries.pop(0)
+            else:
+                break
+            context = self._render()
+        return context
+
+    def _summarize_oldest_recent(self) -> None:
+        heading, content = self._recent.popleft()
+        summary = (
+            self.summarizer(content)
+            if self.summarizer
+            else summarize_section(content, self.summary_words)
+        )
+        self._summaries.append(f"- {heading}: {summary}")
+
+    def _render(self) -> str:
+        parts = [f"Topic: {self.topic}"]
+        if self._summaries:
+            parts.append("Summary of earlier sections:\n" + "\n".join(self._summaries))
+        if self._recent:
+            recent = "".join(
+                f"\n## {heading}\n\n{content}\n" for heading, content in self._recent
+            )
+            parts.append(f"Previous sections:\n{recent}")
+        return "\n\n".join(parts)
@@ -11,41 +11,131 @@ This demonstrates a complete prompt chaining workflow for content creation:
 This pattern breaks down complex content creation into manageable, sequential steps.
 """
 
-from typing import List, Dict, Any
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+import asyncio
+import time
+from typing import AsyncIterator, List, Dict, Any, Optional
+from langchain_core.language_models import BaseChatModel
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from dotenv import load_dotenv
+from context_builder import SectionContextBuilder, estimate_tokens
+from shared.chain_registry import ChainRegistry, compile_template
+from shared.llm_factory import chat_model
+from shared.tracing import trace_step
 
 load_dotenv()
 
+TOPIC_IDEAS_PROMPT = """
+Generate exactly 5 creative and engaging topic ideas based on this field of interest: {interest}
+
+Return the topics as a JSON array of strings. Each topic should be:
+- Specific and actionable
+- Interesting to the target audience
+- Suitable for creating detailed content
+
+Format: ["Topic 1", "Topic 2", "Topic 3", "Topic 4", "Topic 5"]
+"""
+
+OUTLINE_PROMPT = """
+Create a detailed, comprehensive outline for an article about: {topic}
+
+The outline should include:
+- Introduction section
+- 3-5 main content sections with specific subtopics
+- Conclusion section
+
+Return as a JSON array of strings, where each string is a section heading.
+Each section should be substantial enough to write 2-3 paragraphs about.
+
+Format: ["Section 1", "Section 2", "Section 3", ...]
+"""
+
+SECTION_PROMPT = """
+Write a detailed draft section for: {section}
+
+Context:
+{context}
+
+Requirements:
+- Write 2-3 substantial paragraphs
+- Maintain consistency with previous sections
+- Use engaging, informative tone
+- Include specific examples or details where appropriate
+- Ensure smooth transition from previous content
+
+Focus on this section only, but ensure it flows naturally with the overall piece.
+"""
+
+CONCURRENT_SECTION_PROMPT = """
+Write a detailed draft section for: {section}
+
+Context:
+Topic: {topic}
+
+Full outline of the article:
+{outline}
+
+Requirements:
+- Write 2-3 substantial paragraphs
+- Cover only this section, other sections are written separately
+- Use engaging, informative tone
+- Include specific examples or details where appropriate
+
+Focus on this section only, but keep its place in the outline in mind.
+"""
+
+REVIEW_PROMPT = """
+Review and refine this complete article draft about: {topic}
+
+Draft:
+{draft}
+
+Please improve the article by:
+1. Ensuring smooth transitions between sections
+2. Maintaining consistent tone throughout
+3. Fixing any grammar or style issues
+4. Improving clarity and flow
+5. Adding or enhancing examples where helpful
+6. Ensuring the conclusion ties everything together
+
+Return the refined version of the complete article.
+"""
+
 
 class PromptChainingWorkflow:
     """Implements a complete prompt chaining workflow for content creation."""
 
-    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.7):
-        """Initialize the workflow with LLM configuration."""
-        self.llm = ChatOpenAI(model=model, temperature=temperature)
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.7,
+        context_token_budget: int = 2000,
+        recent_sections: int = 2,
+        llm: Optional[BaseChatModel] = None,
+    ):
+        """Initialize the workflow with LLM configuration.
+
+        ``context_token_budget`` and ``recent_sections`` bound the context sent
+        with each draft section (see ``SectionContextBuilder``). ``llm``
+        replaces the OpenAI model, e.g. with ``shared.fake_llm.FakeChatModel``.
+        """
+        self.llm = llm or chat_model(model=model, temperature=temperature)
         self.json_parser = JsonOutputParser()
         self.str_parser = StrOutputParser()
+        self.context_token_budget = context_token_budget
+        self.recent_sections = recent_sections
+        self.section_prompt_tokens: List[int] = []
+        # Time to first token and duration of each streamed step, in seconds
+        self.step_metrics: Dict[str, Dict[str, float]] = {}
+        # Chains are built on first use and reused by every later call
+        self.chains = ChainRegistry()
 
     def generate_topic_ideas(self, user_interest: str) -> List[str]:
         """Prompt 1: Generate 5 topic ideas"""
-        prompt = ChatPromptTemplate.from_template(
-            """
-        Generate exactly 5 creative and engaging topic ideas based on this field of interest: {interest}
-        
-        Return the topics as a JSON array of strings. Each topic should be:
-        - Specific and actionable
-        - Interesting to the target audience
-        - Suitable for creating detailed content
-        
-        Format: ["Topic 1", "Topic 2", "Topic 3", "Topic 4", "Topic 5"]
-        """
+        chain = self.chains.get(
+            "topic_ideas",
+            lambda: compile_template(TOPIC_IDEAS_PROMPT) | self.llm | self.json_parser,
         )
-
-        chain = prompt | self.llm | self.json_parser
-        topics = chain.invoke({"interest": user_interest})
+        topics = chain.invoke({"interest": user_interest}, {"run_name": "topics"})
 
         print("\n📝 Generated Topics:")
         for i, topic in enumerate(topics, 1):
@@ -76,24 +166,11 @@ class PromptChainingWorkflow:
 
     def generate_outline(self, topic: str) -> List[str]:
         """Prompt 2: Generate detailed outline based on selected topic."""
-        prompt = ChatPromptTemplate.from_template(
-            """
-        Create a detailed, comprehensive outline for an article about: {topic}
-        
-        The outline should include:
-        - Introduction section
-        - 3-5 main content sections with specific subtopics
-        - Conclusion section
-        
-        Return as a JSON array of strings, where each string is a section heading.
-        Each section should be substantial enough to write 2-3 paragraphs about.
-        
-        Format: ["Section 1", "Section 2", "Section 3", ...]
-        """
+        chain = self.chains.get(
+            "outline",
+            lambda: compile_template(OUTLINE_PROMPT) | self.llm | self.json_parser,
         )
-
-        chain = prompt | self.llm | self.json_parser
-        outline = chain.invoke({"topic": topic})
+        outline = chain.invoke({"topic": topic}, {"run_name": "outline"})
 
         print("\n📋 Generated Outline:")
         for i, section in enumerate(outline, 1):
@@ -102,115 +179,281 @@ class PromptChainingWorkflow:
         return outline
 
     def write_draft_sections(self, topic: str, outline: List[str]) -> str:
-        """Prompts 3-4: Write draft sections for each outline point with context."""
+        """Prompts 3-4: Write draft sections for each outline point with context.
+
+        The context is built by a ``SectionContextBuilder``: the latest sections
+        are passed verbatim and older ones as short summaries, so each prompt
+        stays under ``context_token_budget`` tokens. Prompt tokens of each
+        section are recorded in ``self.section_prompt_tokens``.
+        """
         complete_draft = ""
+        context_builder = SectionContextBuilder(
+            topic,
+            token_budget=self.context_token_budget,
+            recent_sections=self.recent_sections,
+        )
+        self.section_prompt_tokens = []
+        prompt = compile_template(SECTION_PROMPT)
+        chain = self.chains.get("section", lambda: prompt | self.llm | self.str_parser)
 
         for i, section in enumerate(outline):
             print(f"\n✍️  Writing section {i+1}/{len(outline)}: {section}")
 
-            # Build context from previous sections
-            context = (
-                f"Topic: {topic}\n\nPrevious sections:\n{complete_draft}"
-                if complete_draft
-                else f"Topic: {topic}"
-            )
+            # Build bounded context from previous sections
+            context = context_builder.build()
 
-            prompt = ChatPromptTemplate.from_template(
-                """
-            Write a detailed draft section for: {section}
-            
-            Context:
-            {context}
-            
-            Requirements:
-            - Write 2-3 substantial paragraphs
-            - Maintain consistency with previous sections
-            - Use engaging, informative tone
-            - Include specific examples or details where appropriate
-            - Ensure smooth transition from previous content
-            
-            Focus on this section only, but ensure it flows naturally with the overall piece.
-            """
+            prompt_tokens = estimate_tokens(
+                prompt.format(section=section, context=context)
             )
+            self.section_prompt_tokens.append(prompt_tokens)
+            print(f"   Prompt tokens: ~{prompt_tokens}")
 
-            chain = prompt | self.llm | self.str_parser
-            section_content = chain.invoke({"section": section, "context": context})
+            section_content = chain.invoke(
+                {"section": section, "context": context}, {"run_name": f"section {i+1}"}
+            )
 
-            # Add section to complete draft
+            # Add section to complete draft and to the context for the next ones
             complete_draft += f"\n## {section}\n\n{section_content}\n"
+            context_builder.add_section(section, section_content)
+
+        print(
+            f"\n📊 Section prompt tokens: ~{sum(self.section_prompt_tokens)} total "
+            f"over {len(outline)} sections"
+        )
 
         return complete_draft
 
+    async def awrite_draft_sections(
+        self, topic: str, outline: List[str], max_concurrency: int = 4
+    ) -> str:
+        """Prompts 3-4 (concurrent): Draft all outline sections at the same time.
+
+        Each section gets the topic and the full outline instead of the previous
+        sections, so no section waits on another. The review step then acts as
+        the stitching pass that smooths the transitions between sections.
+        """
+        print(
+            f"\n✍️  Writing {len(outline)} sections concurrently "
+            f"(max {max_concurrency} at a time)"
+        )
+        full_outline = "\n".join(f"{i}. {s}" for i, s in enumerate(outline, 1))
+        prompt = compile_template(CONCURRENT_SECTION_PROMPT)
+
+        inputs = [
+            {"section": section, "topic": topic, "outline": full_outline}
+            for section in outline
+        ]
+        self.section_prompt_tokens = [
+            estimate_tokens(prompt.format(**section_input)) for section_input in inputs
+        ]
+
+        chain = self.chains.get(
+            "concurrent_section", lambda: prompt | self.llm | self.str_parser
+        )
+        sections_content = await chain.abatch(
+            inputs,
+            config=[
+                {"max_concurrency": max_concurrency, "run_name": f"section {i}"}
+                for i in range(1, len(inputs) + 1)
+            ],
+        )
+
+        return "".join(
+            f"\n## {section}\n\n{section_content}\n"
+            for section, section_content in zip(outline, sections_content)
+        )
+
     def review_and_refine(self, topic: str, draft: str) -> str:
         """Prompt 5: Review and refine the complete draft for coherence, tone, and grammar."""
         print("\n🔍 Reviewing and refining the complete draft...")
 
-        prompt = ChatPromptTemplate.from_template(
-            """
-        Review and refine this complete article draft about: {topic}
-        
-        Draft:
-        {draft}
-        
-        Please improve the article by:
-        1. Ensuring smooth transitions between sections
-        2. Maintaining consistent tone throughout
-        3. Fixing any grammar or style issues
-        4. Improving clarity and flow
-        5. Adding or enhancing examples where helpful
-        6. Ensuring the conclusion ties everything together
-        
-        Return the refined version of the complete article.
-        """
+        chain = self.chains.get(
+            "review",
+            lambda: compile_template(REVIEW_PROMPT) | self.llm | self.str_parser,
+        )
+        refined_draft = chain.invoke(
+            {"topic": topic, "draft": draft}, {"run_name": "review"}
         )
-
-        chain = prompt | self.llm | self.str_parser
-        refined_draft = chain.invoke({"topic": topic, "draft": draft})
 
         return refined_draft
 
+    async def astream_draft_sections(
+        self, topic: str, outline: List[str]
+    ) -> AsyncIterator[str]:
+        """Streaming version of ``write_draft_sections``.
+
+        Yields each section heading followed by the section tokens as they
+        arrive; concatenating everything yielded gives the complete draft.
+        """
+        context_builder = SectionContextBuilder(
+            topic,
+            token_budget=self.context_token_budget,
+            recent_sections=self.recent_sections,
+        )
+        chain = self.chains.get(
+            "section",
+            lambda: compile_template(SECTION_PROMPT) | self.llm | self.str_parser,
+        )
+
+        for i, section in enumerate(outline):
+            yield f"\n## {section}\n\n"
+            section_content = ""
+            async for token in self._astream_step(
+                f"section {i+1}",
+                chain,
+                {"section": section, "context": context_builder.build()},
+            ):
+                section_content += token
+                yield token
+            yield "\n"
+            context_builder.add_section(section, section_content)
+
+    async def astream_review(self, topic: str, draft: str) -> AsyncIterator[str]:
+        """Streaming version of ``review_and_refine``, yielding tokens as they arrive."""
+        chain = self.chains.get(
+            "review",
+            lambda: compile_template(REVIEW_PROMPT) | self.llm | self.str_parser,
+        )
+        async for token in self._astream_step(
+            "review", chain, {"topic": topic, "draft": draft}
+        ):
+            yield token
+
+    async def _astream_step(
+        self, step_name: str, chain, inputs: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """Stream a chain and record its time to first token in ``step_metrics``."""
+        start = time.perf_counter()
+        time_to_first_token = None
+        async for token in chain.astream(inputs, {"run_name": step_name}):
+            # OpenAI streams open with an empty chunk (the role) before any text
+            if time_to_first_token is None and token:
+                time_to_first_token = time.perf_counter() - start
+            yield token
+        duration = time.perf_counter() - start
+        self.step_metrics[step_name] = {
+            "time_to_first_token": (
+                duration if time_to_first_token is None else time_to_first_token
+            ),
+            "duration": duration,
+        }
+
     def run_complete_workflow(
-        self, user_interest: str, auto_select: bool = False
+        self,
+        user_interest: str,
+        auto_select: bool = False,
+        concurrent_sections: bool = False,
+        max_concurrency: int = 4,
     ) -> Dict[str, Any]:
-        """Run the complete prompt chaining workflow."""
+        """Run the complete prompt chaining workflow.
+
+        With ``concurrent_sections`` the draft sections are written in parallel
+        (at most ``max_concurrency`` LLM calls at once) instead of one by one.
+        """
         print("🔗 Prompt Chaining Workflow")
         print("=" * 50)
 
         try:
-            # Step 1: Generate topic ideas
+            with trace_step("prompt chaining", interest=user_interest):
+                # Step 1: Generate topic ideas
+                print(f"\n📝 Step 1: Generating topic ideas for '{user_interest}'...")
+                topics = self.generate_topic_ideas(user_interest)
+
+                # Step 2: Select topic
+                print("\n🎯 Step 2: Topic selection...")
+                selected_topic = self.select_topic(topics, auto_select)
+
+                # Step 3: Generate outline
+                print("\n📋 Step 3: Creating detailed outline...")
+                outline = self.generate_outline(selected_topic)
+
+                # Step 4: Write draft sections
+                print("\n✍️  Step 4: Writing draft sections...")
+                if concurrent_sections:
+                    draft = asyncio.run(
+                        self.awrite_draft_sections(
+                            selected_topic, outline, max_concurrency
+                        )
+                    )
+                else:
+                    draft = self.write_draft_sections(selected_topic, outline)
+
+                # Step 5: Review and refine
+                print("\n🔍 Step 5: Reviewing and refining...")
+                final_draft = self.review_and_refine(selected_topic, draft)
+
+                print("\n✅ Workflow completed successfully!")
+
+                return {
+                    "user_interest": user_interest,
+                    "generated_topics": topics,
+                    "selected_topic": selected_topic,
+                    "outline": outline,
+                    "draft": draft,
+                    "section_prompt_tokens": self.section_prompt_tokens,
+                    "final_draft": final_draft,
+                }
+
+        except Exception as e:
+            print(f"\n❌ Error in workflow: {str(e)}")
+            raise
+
+    def run_streaming_workflow(
+        self, user_interest: str, auto_select: bool = False
+    ) -> Dict[str, Any]:
+        """Run the workflow, printing the draft and the final article as they stream."""
+        print("🔗 Prompt Chaining Workflow (streaming)")
+        print("=" * 50)
+
+        with trace_step("prompt chaining", interest=user_interest, streaming=True):
             print(f"\n📝 Step 1: Generating topic ideas for '{user_interest}'...")
             topics = self.generate_topic_ideas(user_interest)
 
-            # Step 2: Select topic
             print("\n🎯 Step 2: Topic selection...")
             selected_topic = self.select_topic(topics, auto_select)
 
-            # Step 3: Generate outline
             print("\n📋 Step 3: Creating detailed outline...")
             outline = self.generate_outline(selected_topic)
 
-            # Step 4: Write draft sections
-            print("\n✍️  Step 4: Writing draft sections...")
-            draft = self.write_draft_sections(selected_topic, outline)
+            self.step_metrics = {}
+            draft, final_draft = asyncio.run(
+                self._print_streamed_steps(selected_topic, outline)
+            )
+
+        print("\n\n⏱️  Time to first token per step:")
+        for step_name, metrics in self.step_metrics.items():
+            print(
+                f"• {step_name}: {metrics['time_to_first_token']:.2f}s "
+                f"(total {metrics['duration']:.2f}s)"
+            )
 
-            # Step 5: Review and refine
-            print("\n🔍 Step 5: Reviewing and refining...")
-            final_draft = self.review_and_refine(selected_topic, draft)
+        print("\n✅ Workflow completed successfully!")
 
-            print("\n✅ Workflow completed successfully!")
+        return {
+            "user_interest": user_interest,
+            "generated_topics": topics,
+            "selected_topic": selected_topic,
+            "outline": outline,
+            "draft": draft,
+            "final_draft": final_draft,
+            "step_metrics": self.step_metrics,
+        }
 
-            return {
-                "user_interest": user_interest,
-                "generated_topics": topics,
-                "selected_topic": selected_topic,
-                "outline": outline,
-                "draft": draft,
-                "final_draft": final_draft,
-            }
+    async def _print_streamed_steps(self, topic: str, outline: List[str]):
+        """Print the streamed draft (step 4) and review (step 5), returning both texts."""
+        print("\n✍️  Step 4: Writing draft sections...")
+        draft = ""
+        async for token in self.astream_draft_sections(topic, outline):
+            draft += token
+            print(token, end="", flush=True)
 
-        except Exception as e:
-            print(f"\n❌ Error in workflow: {str(e)}")
-            raise
+        print("\n\n🔍 Step 5: Reviewing and refining...\n")
+        final_draft = ""
+        async for token in self.astream_review(topic, draft):
+            final_draft += token
+            print(token, end="", flush=True)
+
+        return draft, final_draft
 
 
 def main():
@@ -226,13 +469,25 @@ def main():
     # Ask if user wants auto-selection
     auto_mode = input("Auto-select best topic? (y/n): ").strip().lower() == "y"
 
-    # Run the complete workflow
-    result = workflow.run_complete_workflow(user_interest, auto_mode)
+    # Ask if the article should be streamed as it is written
+    stream_mode = input("Stream the article as it is written? (y/n): ").strip()
+    if stream_mode.lower() == "y":
+        result = workflow.run_streaming_workflow(user_interest, auto_mode)
+    else:
+        # Ask if sections should be drafted concurrently
+        concurrent_mode = (
+            input("Draft sections concurrently? (y/n): ").strip().lower() == "y"
+        )
 
-    # Display final result
-    print("\n🎯 Final Article:")
-    print("=" * 50)
-    print(result["final_draft"])
+        # Run the complete workflow
+        result = workflow.run_complete_workflow(
+            user_interest, auto_mode, concurrent_sections=concurrent_mode
+        )
+
+        # Display final result
+        print("\n🎯 Final Article:")
+        print("=" * 50)
+        print(result["final_draft"])
 
     print("\n📊 Workflow Summary:")
     print(f"• Interest: {result['user_interest']}")
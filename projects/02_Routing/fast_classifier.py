@@ -0,0 +1,263 @@
+"""Local fast-path classifier for the Routing workflow.
+
+Most requests are obvious ("what's the weather in Paris") and do not need an
+LLM call to be routed. ``FastPathClassifier`` answers those locally, on the
+CPU, in microseconds:
+
+1. Keyword rules give a label when the request only mentions one topic, with
+   a topic word (weight 2) or several hints: a single hint word ("latest",
+   "temperature"...) is too ambiguous to skip the LLM.
+2. A small multinomial Naive Bayes model (a linear model over word counts),
+   trained from the decisions previously logged for the LLM router, covers
+   requests the rules are unsure about. It abstains (confidence 0) when no
+   word of the request was seen in training.
+
+When neither reaches the confidence threshold the caller falls back to the
+LLM router, whose decision can be logged to train the model further.
+"""
+
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LABELS = ("weather", "news", "stock_market", "unclear")
+
+# Keyword weights: 2 for words that identify the topic alone, 1 for hints
+KEYWORDS: Dict[str, Dict[str, int]] = {
+    "weather": {
+        "weather": 2,
+        "forecast": 2,
+        "rain": 1,
+        "raining": 1,
+        "snow": 1,
+        "snowing": 1,
+        "sunny": 1,
+        "cloudy": 1,
+        "storm": 1,
+        "wind": 1,
+        "windy": 1,
+        "humidity": 1,
+        "temperature": 1,
+        "celsius": 1,
+        "fahrenheit": 1,
+        "umbrella": 1,
+    },
+    "news": {
+        "news": 2,
+        "headline": 2,
+        "headlines": 2,
+        "breaking": 1,
+        "latest": 1,
+        "happened": 1,
+        "election": 1,
+        "article": 1,
+        "journalist": 1,
+        "report": 1,
+    },
+    "stock_market": {
+        "stock": 2,
+        "stocks": 2,
+        "nasdaq": 2,
+        "nyse": 2,
+        "dow": 2,
+        "ticker": 2,
+        "shares": 1,
+        "share": 1,
+        "market": 1,
+        "markets": 1,
+        "dividend": 1,
+        "earnings": 1,
+        "portfolio": 1,
+        "invest": 1,
+        "investing": 1,
+        "trading": 1,
+    },
+}
+
+# Confidence of a single hint word at best: below the default threshold
+HINT_CONFIDENCE = 0.5
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9&]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a request."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_label(label: str) -> str:
+    """Map a router output to one of the known labels ("unclear" otherwise)."""
+    label = label.strip().strip("\"'").lower()
+    return label if label in LABELS else "unclear"
+
+
+def load_decisions(path: str | Path) -> List[Tuple[str, str]]:
+    """Read (request, label) pairs from a JSONL decision log."""
+    decisions = []
+    with open(path, encoding="utf-8") as log_file:
+        for line in log_file:
+            if line.strip():
+                record = json.loads(line)
+                decisions.append((record["request"], normalize_label(record["label"])))
+    return decisions
+
+
+class FastPathClassifier:
+    """Keyword rules plus a Naive Bayes model, with path counters."""
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        min_training_examples: int = 20,
+        decision_log_path: Optional[str | Path] = None,
+    ):
+        """Initialize the classifier.
+
+        Args:
+            threshold: Minimum confidence for a label to be returned
+            min_training_examples: Decisions needed before the model is used
+            decision_log_path: JSONL file LLM decisions are appended to; when it
+                already exists the model is trained from it
+        """
+        self.threshold = threshold
+        self.min_training_examples = min_training_examples
+        self.decision_log_path = Path(decision_log_path) if decision_log_path else None
+        self.path_counts: Counter = Counter()
+        self.label_counts: Counter = Counter()
+        self._class_log_priors: Dict[str, float] = {}
+        self._token_log_probs: Dict[str, Dict[str, float]] = {}
+        # Log probability of a vocabulary word never seen with the label
+        self._unseen_log_probs: Dict[str, float] = {}
+        self._vocabulary: set = set()
+        self._log_file = None
+
+        if self.decision_log_path and self.decision_log_path.exists():
+            self.fit(load_decisions(self.decision_log_path))
+
+    def fit(self, examples: Iterable[Tuple[str, str]]) -> None:
+        """Train the Naive Bayes model on (request, label) examples."""
+        class_counts: Counter = Counter()
+        token_counts: Dict[str, Counter] = defaultdict(Counter)
+        for request, label in examples:
+            label = normalize_label(label)
+            class_counts[label] += 1
+            token_counts[label].update(tokenize(request))
+
+        total = sum(class_counts.values())
+        if total < self.min_training_examples:
+            return
+
+        vocabulary = set()
+        for counts in token_counts.values():
+            vocabulary.update(counts)
+        vocabulary_size = len(vocabulary)
+
+        self._class_log_priors = {
+            label: math.log(count / total) for label, count in class_counts.items()
+        }
+        self._token_log_probs = {}
+        self._unseen_log_probs = {}
+        self._vocabulary = vocabulary
+        for label in class_counts:
+            counts = token_counts[label]
+            denominator = sum(counts.values()) + vocabulary_size
+            self._token_log_probs[label] = {
+                token: math.log((count + 1) / denominator)
+                for token, count in counts.items()
+            }
+            self._unseen_log_probs[label] = math.log(1 / denominator)
+
+    def classify(self, request: str) -> Tuple[str, float]:
+        """Return the most likely label and its confidence (0 to 1)."""
+        tokens = tokenize(request)
+        label, confidence = self._classify_with_rules(tokens)
+        if confidence < self.threshold and self._class_log_priors:
+            model_label, model_confidence = self._classify_with_model(tokens)
+            if model_confidence > confidence:
+                label, confidence = model_label, model_confidence
+        return label, confidence
+
+    def predict(self, request: str) -> Optional[str]:
+        """Return a label when confident enough, None when the LLM should decide."""
+        label, confidence = self.classify(request)
+        if confidence >= self.threshold:
+            self.path_counts["fast_path"] += 1
+            self.label_counts[label] += 1
+            return label
+        return None
+
+    def record_llm_decision(self, request: str, decision: str) -> None:
+        """Count a decision made by the LLM router and append it to the decision log.
+
+        The log is kept open and buffered (this runs on the event loop of the
+        server); ``flush`` writes the buffered decisions, ``close`` closes it.
+        """
+        label = normalize_label(decision)
+        self.path_counts["llm"] += 1
+        self.label_counts[label] += 1
+        if self.decision_log_path:
+            if self._log_file is None:
+                self.decision_log_path.parent.mkdir(parents=True, exist_ok=True)
+                self._log_file = open(self.decision_log_path, "a", encoding="utf-8")
+            self._log_file.write(
+                json.dumps({"request": request, "label": label}) + "\n"
+            )
+
+    def flush(self) -> None:
+        """Write the buffered decisions to the decision log."""
+        if self._log_file is not None:
+            self._log_file.flush()
+
+    def close(self) -> None:
+        """Close the decision log."""
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+
+    def report(self) -> Dict[str, object]:
+        """How often each path and label was taken."""
+        total = sum(self.path_counts.values())
+        return {
+            "requests": total,
+            "fast_path": self.path_counts["fast_path"],
+            "llm": self.path_counts["llm"],
+            "fast_path_ratio": self.path_counts["fast_path"] / total if total else 0.0,
+            "labels": dict(self.label_counts),
+        }
+
+    def _classify_with_rules(self, tokens: List[str]) -> Tuple[str, float]:
+        scores = {
+            label: sum(keywords.get(token, 0) for token in tokens)
+            for label, keywords in KEYWORDS.items()
+        }
+        best_label = max(scores, key=scores.__getitem__)
+        best_score = scores[best_label]
+        if best_score == 0:
+            return "unclear", 0.0
+        purity = best_score / sum(scores.values())
+        if best_score < 2:
+            return best_label, purity * HINT_CONFIDENCE
+        return best_label, purity * min(1.0, 0.7 + 0.15 * best_score)
+
+    def _classify_with_model(self, tokens: List[str]) -> Tuple[str, float]:
+        # Words never seen in training are equally likely under every label:
+        # they are left out, and a request made only of them is not classified
+        tokens = [token for token in tokens if token in self._vocabulary]
+        if not tokens:
+            return "unclear", 0.0
+        log_scores = {}
+        for label, log_prior in self._class_log_priors.items():
+            token_log_probs = self._token_log_probs[label]
+            unseen = self._unseen_log_probs[label]
+            log_scores[label] = log_prior + sum(
+                token_log_probs.get(token, unseen) for token in tokens
+            )
+        best_label = max(log_scores, key=log_scores.__getitem__)
+        best_log_score = log_scores[best_label]
+        normalizer = sum(
+            math.exp(score - best_log_score) for score in log_scores.values()
+        )
+        return best_label, 1 / normalizer
@@ -0,0 +1,139 @@
+"""
+Routing Server Load Test
+
+Starts a stub OpenAI chat completions server and the routing server in the
+same process, then sends ``--requests`` requests with ``--concurrency`` clients.
+Runs fully offline and reports throughput, latency percentiles, rejected
+(503) requests and the micro-batch sizes achieved.
+
+Usage:
+    python load_test.py --requests 2000 --concurrency 200 --latency-ms 300
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from aiohttp import ClientSession, web
+
+from shared.stub_openai_server import StubOpenAIServer
+
+AMBIGUOUS_REQUESTS = [
+    "Can you help me with something?",
+    "What do you think about Paris?",
+    "Tell me something interesting",
+    "How is Apple doing?",
+    "What is going on in the world?",
+]
+OBVIOUS_REQUESTS = [
+    "What's the weather in Paris?",
+    "Show me the latest news headlines",
+    "How are tech stocks doing on the Nasdaq?",
+]
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_load_test(args) -> None:
+    stub = StubOpenAIServer(reply="unclear", latency_ms=args.latency_ms)
+    os.environ["OPENAI_BASE_URL"] = await stub.start()
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    # Unique requests would never hit the cache, keep it out of the measurement
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+
+    from main import RoutingWorkflow
+    from server import MicroBatcher, create_app
+
+    batcher = MicroBatcher(
+        RoutingWorkflow(),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        max_queue_size=args.max_queue_size,
+        max_concurrent_batches=args.max_concurrent_batches,
+        max_concurrency=args.max_batch_size,
+    )
+    runner = web.AppRunner(create_app(batcher))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}/route"
+
+    latencies = []
+    statuses: dict = {}
+    request_numbers = iter(range(args.requests))
+
+    async def client(session: ClientSession) -> None:
+        for number in request_numbers:
+            pool = (
+                OBVIOUS_REQUESTS
+                if random.random() < args.obvious_share
+                else AMBIGUOUS_REQUESTS
+            )
+            payload = {"request": f"{random.choice(pool)} (#{number})"}
+            start = time.perf_counter()
+            async with session.post(url, json=payload) as response:
+                await response.read()
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+            if response.status == 200:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*(client(session) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stats = batcher.stats()
+    await runner.cleanup()
+    await stub.stop()
+
+    print("\n📊 Load Test Results")
+    print(
+        f"• Requests: {args.requests} in {elapsed:.2f}s ({args.requests / elapsed:.0f} req/s)"
+    )
+    print(f"• Status codes: {statuses}")
+    if latencies:
+        print(
+            f"• Latency p50/p95/p99: {percentile(latencies, 0.5) * 1000:.0f} / "
+            f"{percentile(latencies, 0.95) * 1000:.0f} / "
+            f"{percentile(latencies, 0.99) * 1000:.0f} ms "
+            f"(mean {statistics.mean(latencies) * 1000:.0f} ms)"
+        )
+    print(
+        f"• Batches: {stats['batches']}, average size {stats['average_batch_size']:.1f}, "
+        f"largest {stats['largest_batch']}"
+    )
+    print(f"• Stub LLM calls: {stub.requests} (max {stub.max_in_flight} in flight)")
+    print(f"• Routing paths: {stats['routing']}")
+
+
+def main():
+    """Parse the command line and run the load test."""
+    parser = argparse.ArgumentParser(
+        description="Offline load test of the routing server"
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--max-queue-size", type=int, default=1000)
+    parser.add_argument("--max-concurrent-batches", type=int, default=4)
+    parser.add_argument(
+        "--obvious-share",
+        type=float,
+        default=0.5,
+        help="Share of requests the fast path can route without the LLM",
+    )
+    args = parser.parse_args()
+    asyncio.run(run_load_test(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,27 @@ Routing Example
 
 This example demonstrates the **Routing** agentic design pattern through a coordinator agent that determines which handler should process the user's request.
 
+Obvious requests are routed by a local fast-path classifier; the LLM router is
+only called when the classifier is not confident.
+
 """
 
-from langchain_openai import ChatOpenAI
+import asyncio
+import os
+from typing import Iterable, List, Optional, Union
+
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import Runnable, RunnableBranch, RunnablePassthrough
+from langchain_core.runnables import (
+    Runnable,
+    RunnableConfig,
+    RunnableLambda,
+    RunnablePassthrough,
+)
 from dotenv import load_dotenv
+from shared.llm_factory import chat_model
+from fast_classifier import FastPathClassifier, normalize_label
 
 load_dotenv()
 
@@ -17,31 +31,52 @@ load_dotenv()
 class RoutingWorkflow:
     """Routing Workflow"""
 
-    def __init__(self, model: str = "gpt-4.1-nano", temperature: float = 0):
+    def __init__(
+        self,
+        model: str = "gpt-4.1-nano",
+        temperature: float = 0,
+        fast_path: bool = True,
+        fast_path_threshold: float = 0.8,
+        decision_log_path: Optional[str] = None,
+        llm: Optional[BaseChatModel] = None,
+    ):
+        """Initialize the workflow.
+
+        With ``fast_path`` requests are first classified locally and only sent
+        to the LLM router below ``fast_path_threshold`` confidence. LLM
+        decisions are appended to ``decision_log_path`` (JSONL), which also
+        trains the local classifier on the next start. ``llm`` replaces the
+        OpenAI router model (e.g. a ``shared.fake_llm.FakeChatModel`` offline).
+        """
         try:
-            self.llm = ChatOpenAI(model=model, temperature=temperature)
+            self.llm = llm or chat_model(model=model, temperature=temperature)
         except Exception as e:
             print(f"Error initializing LLM: {e}")
             exit(1)
         self.define_branches()
+        self.fast_classifier = (
+            FastPathClassifier(fast_path_threshold, decision_log_path=decision_log_path)
+            if fast_path
+            else None
+        )
         self.coordinator_router_chain = self.create_coordinator_router_chain()
+        self.decision_chain = RunnableLambda(self.decide, afunc=self.adecide)
         self.delegation_branch = self.create_delegation_branch()
+        self.coordinator_agent = self.create_coordinator_agent()
 
     def define_branches(self):
         """Define the branches for the routing workflow"""
+        self.handlers = {
+            "weather": self.weather_handler,
+            "news": self.news_handler,
+            "stock_market": self.stock_market_handler,
+            "unclear": self.unclear_handler,
+        }
         self.branches = {
-            "weather": RunnablePassthrough.assign(
-                output=lambda x: self.weather_handler(x["request"]["request"])
-            ),
-            "news": RunnablePassthrough.assign(
-                output=lambda x: self.news_handler(x["request"]["request"])
-            ),
-            "stock_market": RunnablePassthrough.assign(
-                output=lambda x: self.stock_market_handler(x["request"]["request"])
-            ),
-            "unclear": RunnablePassthrough.assign(
-                output=lambda x: self.unclear_handler(x["request"]["request"])
-            ),
+            label: RunnablePassthrough.assign(
+                output=lambda x, handler=handler: handler(x["request"]["request"])
+            ).with_config(run_name=f"{label} handler")
+            for label, handler in self.handlers.items()
         }
 
     def start_workflow(self):
@@ -51,20 +86,122 @@ class RoutingWorkflow:
 
     def run_coordinator_agent(self, request: str):
         """Run the coordinator agent"""
-        agent: Runnable = (
+        output = self.coordinator_agent.invoke({"request": request})
+        if self.fast_classifier:
+            self.fast_classifier.flush()
+        return output
+
+    def route_many(
+        self, requests: Iterable[str], max_concurrency: int = 16
+    ) -> List[str]:
+        """Route a backlog of requests as one batched job"""
+        return asyncio.run(self.aroute_many(requests, max_concurrency))
+
+    async def aroute_many(
+        self,
+        requests: Iterable[str],
+        max_concurrency: int = 16,
+        return_exceptions: bool = False,
+    ) -> List[Union[str, Exception]]:
+        """Route many requests, sending the LLM router calls through ``abatch``.
+
+        Requests the fast path can classify skip the LLM entirely; the others
+        are routed with at most ``max_concurrency`` router calls in flight. A
+        failed router call sends its request to the unclear handler instead of
+        failing the whole batch; with ``return_exceptions`` the exception of a
+        failed router call or handler is returned in place of its output.
+        Outputs are returned in the order of ``requests``.
+        """
+        inputs = [{"request": request} for request in requests]
+        decisions: List[Optional[str]] = [
+            self.fast_classifier.predict(x["request"]) if self.fast_classifier else None
+            for x in inputs
+        ]
+        pending = [i for i, decision in enumerate(decisions) if decision is None]
+        if pending:
+            print(f"Routing {len(pending)}/{len(inputs)} requests with the LLM router")
+            llm_decisions = await self.coordinator_router_chain.abatch(
+                [inputs[i] for i in pending],
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True,
+            )
+            for i, decision in zip(pending, llm_decisions):
+                if isinstance(decision, Exception):
+                    print(f"⚠️ Router call failed: {decision}")
+                    decisions[i] = decision if return_exceptions else "unclear"
+                else:
+                    decisions[i] = self.record_decision(inputs[i]["request"], decision)
+            # One write of the decision log per batch
+            if self.fast_classifier:
+                self.fast_classifier.flush()
+
+        if not return_exceptions:
+            return [
+                self.handlers[decision](x["request"])
+                for x, decision in zip(inputs, decisions)
+            ]
+        outputs: List[Union[str, Exception]] = []
+        for x, decision in zip(inputs, decisions):
+            if isinstance(decision, Exception):
+                outputs.append(decision)
+                continue
+            try:
+                outputs.append(self.handlers[decision](x["request"]))
+            except Exception as e:
+                outputs.append(e)
+        return outputs
+
+    def create_coordinator_agent(self) -> Runnable:
+        """Create the coordinator agent, built once and reused for every request"""
+        return (
             {
-                "decision": self.coordinator_router_chain,
+                "decision": self.decision_chain,
                 "request": RunnablePassthrough(),
             }
             | self.delegation_branch
             | (lambda x: x["output"])
+        ).with_config(run_name="routing")
+
+    def decide(self, x: dict, config: RunnableConfig) -> str:
+        """Route with the fast-path classifier, falling back to the LLM router"""
+        label = (
+            self.fast_classifier.predict(x["request"]) if self.fast_classifier else None
+        )
+        if label is not None:
+            return label
+        decision = self.coordinator_router_chain.invoke(x, config)
+        return self.record_decision(x["request"], decision)
+
+    async def adecide(self, x: dict, config: RunnableConfig) -> str:
+        """Async version of ``decide``"""
+        label = (
+            self.fast_classifier.predict(x["request"]) if self.fast_classifier else None
         )
+        if label is not None:
+            return label
+        decision = await self.coordinator_router_chain.ainvoke(x, config)
+        return self.record_decision(x["request"], decision)
+
+    def record_decision(self, request: str, decision: str) -> str:
+        """Normalize an LLM router decision once and log it for the fast path"""
+        if self.fast_classifier:
+            self.fast_classifier.record_llm_decision(request, decision)
+        return normalize_label(decision)
 
-        return agent.invoke({"request": request})
+    def close(self) -> None:
+        """Close the decision log of the fast path"""
+        if self.fast_classifier:
+            self.fast_classifier.close()
+
+    def routing_report(self) -> dict:
+        """How often the fast path and the LLM router were used"""
+        return self.fast_classifier.report() if self.fast_classifier else {}
 
     def create_coordinator_router_chain(self) -> Runnable:
         """Create the coordinator router chain"""
-        return self.build_coordinator_router_prompt() | self.llm | StrOutputParser()
+        return (
+            self.build_coordinator_router_prompt() | self.llm | StrOutputParser()
+        ).with_config(run_name="router")
 
     def build_coordinator_router_prompt(self) -> ChatPromptTemplate:
         """Build the coordinator router prompt"""
@@ -85,16 +222,14 @@ class RoutingWorkflow:
             ]
         )
 
-    def create_delegation_branch(self) -> RunnableBranch:
-        """Create the delegation branch as a RunnableBranch"""
-        return RunnableBranch(
-            (lambda x: x["decision"].strip() == "weather", self.branches["weather"]),
-            (lambda x: x["decision"].strip() == "news", self.branches["news"]),
-            (
-                lambda x: x["decision"].strip() == "stock_market",
-                self.branches["stock_market"],
-            ),
-            self.branches["unclear"],
+    def create_delegation_branch(self) -> Runnable:
+        """Create the delegation step as an O(1) lookup in the branches table.
+
+        The decision is already normalized by ``decide``; unknown labels go to
+        the unclear branch. The selected branch is invoked with the same input.
+        """
+        return RunnableLambda(
+            lambda x: self.branches.get(x["decision"], self.branches["unclear"])
         )
 
     def weather_handler(self, request: str) -> str:
@@ -123,9 +258,10 @@ class RoutingWorkflow:
 
 
 def main():
-    workflow = RoutingWorkflow()
+    workflow = RoutingWorkflow(decision_log_path=os.getenv("ROUTING_DECISION_LOG"))
     result = workflow.start_workflow()
     print(result)
+    print(f"Routing paths: {workflow.routing_report()}")
 
 
 if __name__ == "__main__":
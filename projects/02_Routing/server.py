@@ -0,0 +1,239 @@
+"""
+Routing Server
+
+Exposes the coordinator agent of the Routing workflow over HTTP with aiohttp.
+
+Requests that arrive close together are grouped into micro-batches routed with
+``RoutingWorkflow.aroute_many``: the fast path classifies the obvious ones and
+the others still get one LLM router call each, through ``abatch``. Batching
+does not reduce the number of router calls, it bounds how many are in flight
+(``--max-concurrent-batches`` batches of at most ``max_concurrency`` calls) and
+writes the decision log once per batch. A batch is sent when it reaches
+``--max-batch-size`` requests or when its oldest request has waited
+``--max-wait-ms``. Pending requests are held in a
+bounded queue: when it is full the server answers ``503`` with a
+``Retry-After`` header instead of queueing without limit.
+
+Endpoints:
+    POST /route   {"request": "..."}  ->  {"output": "..."}
+    GET  /stats   queue depth and batch statistics
+
+Usage:
+    python server.py --port 8000 --max-batch-size 32 --max-wait-ms 10
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import List, Optional, Tuple
+
+from aiohttp import web
+from shared.cli import load_workflow
+
+# Imported under its own name: another project's main.py may be on sys.path
+RoutingWorkflow = load_workflow("routing").RoutingWorkflow
+
+
+class MicroBatcher:
+    """Groups concurrent routing requests into batches for ``aroute_many``.
+
+    Each request of a batch that needs the LLM router still makes its own
+    router call; batches bound the calls in flight, not their number.
+    """
+
+    def __init__(
+        self,
+        workflow: RoutingWorkflow,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        max_queue_size: int = 1000,
+        max_concurrent_batches: int = 4,
+        max_concurrency: int = 16,
+    ):
+        """Initialize the batcher.
+
+        Args:
+            workflow: Routing workflow used to route each batch
+            max_batch_size: Maximum number of requests per batch
+            max_wait_ms: Maximum time the first request of a batch waits for others
+            max_queue_size: Maximum number of requests waiting for a batch
+            max_concurrent_batches: Maximum number of batches routed at the same time
+            max_concurrency: Maximum LLM router calls in flight within a batch
+        """
+        self.workflow = workflow
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrency = max_concurrency
+        self.queue: asyncio.Queue[Tuple[str, asyncio.Future]] = asyncio.Queue(
+            maxsize=max_queue_size
+        )
+        self._batch_slots = asyncio.Semaphore(max_concurrent_batches)
+        self._batch_tasks: set = set()
+        self._collector: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.batched_requests = 0
+        self.largest_batch = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        """Start collecting batches in the running event loop."""
+        self._collector = asyncio.create_task(self._collect_batches())
+
+    async def stop(self) -> None:
+        """Stop collecting batches and wait for the batches being routed."""
+        if self._collector:
+            self._collector.cancel()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+    async def submit(self, request: str) -> str:
+        """Queue a request and wait for its output.
+
+        Raises:
+            asyncio.QueueFull: when the queue is full (backpressure)
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((request, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise
+        return await future
+
+    def stats(self) -> dict:
+        """Queue depth and batch statistics."""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+            "average_batch_size": (
+                self.batched_requests / self.batches if self.batches else 0.0
+            ),
+            "largest_batch": self.largest_batch,
+            "rejected": self.rejected,
+            "routing": self.workflow.routing_report(),
+        }
+
+    async def _collect_batches(self) -> None:
+        while True:
+            # Wait for a free slot first: requests keep accumulating meanwhile,
+            # so batches grow under load instead of queueing many small ones
+            await self._batch_slots.acquire()
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = asyncio.create_task(self._route_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _route_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            self.batches += 1
+            self.batched_requests += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            try:
+                # A failed request gets its own exception, the others their output
+                outputs = await self.workflow.aroute_many(
+                    [request for request, _ in batch],
+                    self.max_concurrency,
+                    return_exceptions=True,
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for (_, future), output in zip(batch, outputs):
+                if future.done():
+                    continue
+                if isinstance(output, Exception):
+                    future.set_exception(output)
+                else:
+                    future.set_result(output)
+        finally:
+            self._batch_slots.release()
+
+
+def create_app(batcher: MicroBatcher) -> web.Application:
+    """Create the aiohttp application serving the coordinator agent."""
+
+    async def route(request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+            user_request = body["request"]
+            if not isinstance(user_request, str):
+                raise TypeError("request must be a string")
+        except (ValueError, KeyError, TypeError):
+            return web.json_response(
+                {"error": 'Expected a JSON body like {"request": "..."}'}, status=400
+            )
+        try:
+            output = await batcher.submit(user_request)
+        except asyncio.QueueFull:
+            return web.json_response(
+                {"error": "Server busy, retry later"},
+                status=503,
+                headers={"Retry-After": "1"},
+            )
+        except Exception as e:
+            return web.json_response({"error": str(e)}, status=500)
+        return web.json_response({"output": output})
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response(batcher.stats())
+
+    async def on_startup(app: web.Application) -> None:
+        batcher.start()
+
+    async def on_cleanup(app: web.Application) -> None:
+        await batcher.stop()
+        batcher.workflow.close()
+
+    app = web.Application()
+    app.router.add_post("/route", route)
+    app.router.add_get("/stats", stats)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main():
+    """Parse the command line and run the server."""
+    parser = argparse.ArgumentParser(description="Serve the Routing coordinator agent")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--max-queue-size", type=int, default=1000)
+    parser.add_argument("--max-concurrent-batches", type=int, default=4)
+    parser.add_argument(
+        "--openai-base-url",
+        default=None,
+        help="OpenAI compatible endpoint, e.g. a local stub server",
+    )
+    args = parser.parse_args()
+
+    if args.openai_base_url:
+        os.environ["OPENAI_BASE_URL"] = args.openai_base_url
+
+    batcher = MicroBatcher(
+        RoutingWorkflow(decision_log_path=os.getenv("ROUTING_DECISION_LOG")),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        max_queue_size=args.max_queue_size,
+        max_concurrent_batches=args.max_concurrent_batches,
+    )
+    web.run_app(create_app(batcher), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import pytest
+
+from fast_classifier import FastPathClassifier, load_decisions
+
+TRAINING = [
+    ("will it rain in paris tomorrow", "weather"),
+    ("is it sunny in rome", "weather"),
+    ("how cold is it in oslo", "weather"),
+    ("what happened in the world today", "news"),
+    ("latest election results", "news"),
+    ("top stories this morning", "news"),
+    ("how is apple stock doing", "stock_market"),
+    ("price of tesla shares", "stock_market"),
+    ("should i buy nvidia", "stock_market"),
+    ("what is the meaning of life", "unclear"),
+] * 3
+
+
+@pytest.mark.parametrize(
+    "request_text",
+    [
+        "What is the latest iPhone?",
+        "How do I write a report?",
+        "What temperature should I cook chicken at?",
+        "flower market opening hours",
+    ],
+)
+def test_single_hint_word_does_not_skip_the_llm(request_text):
+    assert FastPathClassifier().predict(request_text) is None
+
+
+@pytest.mark.parametrize(
+    "request_text, label",
+    [
+        ("What's the weather in Paris?", "weather"),
+        ("Give me today's headlines", "news"),
+        ("How are NASDAQ stocks doing?", "stock_market"),
+        ("Will it rain and snow tomorrow?", "weather"),
+    ],
+)
+def test_topic_words_and_several_hints_take_the_fast_path(request_text, label):
+    assert FastPathClassifier().predict(request_text) == label
+
+
+@pytest.mark.parametrize("request_text", ["tell me a joke", ""])
+def test_model_abstains_on_unknown_words(request_text):
+    classifier = FastPathClassifier()
+    classifier.fit(TRAINING)
+    assert classifier.classify(request_text)[1] == 0.0
+    assert classifier.predict(request_text) is None
+
+
+def test_model_classifies_known_words():
+    classifier = FastPathClassifier()
+    classifier.fit(TRAINING)
+    assert classifier.classify("how cold is it in madrid")[0] == "weather"
+
+
+def test_decision_log_is_buffered_until_flushed(tmp_path):
+    log_path = tmp_path / "decisions.jsonl"
+    classifier = FastPathClassifier(decision_log_path=log_path)
+    classifier.record_llm_decision("what's up", "unclear")
+    classifier.record_llm_decision("apple earnings", "stock_market")
+    classifier.flush()
+    assert load_decisions(log_path) == [
+        ("what's up", "unclear"),
+        ("apple earnings", "stock_market"),
+    ]
+    classifier.close()
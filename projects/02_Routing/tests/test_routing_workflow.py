@@ -0,0 +1,21 @@
+from shared.cli import load_workflow
+from shared.fake_llm import FakeChatModel
+
+
+def flaky_router(messages):
+    if "explode" in messages[-1].content:
+        raise RuntimeError("router unavailable")
+    return "weather"
+
+
+def test_failed_router_call_routes_only_its_request_to_unclear():
+    module = load_workflow("routing")
+    workflow = module.RoutingWorkflow(
+        fast_path=False, llm=FakeChatModel(reply=flaky_router)
+    )
+    outputs = workflow.route_many(["is it nice out?", "explode", "any plans?"])
+    assert outputs == [
+        workflow.weather_handler("is it nice out?"),
+        workflow.unclear_handler("explode"),
+        workflow.weather_handler("any plans?"),
+    ]
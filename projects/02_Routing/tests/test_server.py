@@ -0,0 +1,38 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from server import MicroBatcher, create_app
+from shared.cli import load_workflow
+from shared.fake_llm import FakeChatModel
+
+
+def flaky_router(messages):
+    if "explode" in messages[-1].content:
+        raise RuntimeError("router unavailable")
+    return "weather"
+
+
+async def post_requests(bodies):
+    workflow = load_workflow("routing").RoutingWorkflow(
+        fast_path=False, llm=FakeChatModel(reply=flaky_router)
+    )
+    batcher = MicroBatcher(workflow, max_wait_ms=50)
+    async with TestClient(TestServer(create_app(batcher))) as client:
+        responses = await asyncio.gather(
+            *(client.post("/route", json=body) for body in bodies)
+        )
+        return [(r.status, await r.json()) for r in responses]
+
+
+def test_failed_request_does_not_fail_its_batch():
+    results = asyncio.run(
+        post_requests([{"request": "is it nice out?"}, {"request": "explode"}])
+    )
+    assert results[0] == (200, {"output": "Weather handler: is it nice out?"})
+    assert results[1] == (500, {"error": "router unavailable"})
+
+
+def test_non_string_request_is_rejected():
+    results = asyncio.run(post_requests([{"request": 42}, {"request": ["a"]}]))
+    assert [status for status, _ in results] == [400, 400]
@@ -0,0 +1,135 @@
+"""Deadlines and hedged requests for the branches of the Parallelization workflow.
+
+The synthesis step waits for the slowest branch, so one slow upstream call sets
+the end-to-end latency. ``HedgedRunnable`` bounds that:
+
+- hedging: when the branch has not answered after its p9x service time (wall
+  time minus the time queued for an LLM slot, taken from the
+  ``InMemoryHistogramSink`` of the workflow, cancelled calls counting as
+  censored samples), a duplicate call is fired and whichever answer arrives
+  first wins, the other one is cancelled
+- deadline: when the branch has not answered after ``deadline`` seconds, the
+  calls are cancelled and either a placeholder is returned (degraded mode) or
+  ``asyncio.TimeoutError`` is raised
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from langchain_core.runnables import Runnable
+
+from instrumentation import InMemoryHistogramSink
+
+
+class HedgedRunnable(Runnable):
+    """Wrapper class adding a deadline and latency hedging to a branch."""
+
+    def __init__(
+        self,
+        runnable,
+        chain_name: str,
+        deadline: Optional[float] = None,
+        hedge_percentile: Optional[float] = None,
+        metrics: Optional[InMemoryHistogramSink] = None,
+        min_samples: int = 20,
+        initial_hedge_delay: Optional[float] = None,
+        placeholder: Optional[str] = None,
+    ):
+        """Initialize the wrapper.
+
+        Args:
+            runnable: Branch to call
+            chain_name: Name the branch latencies are recorded under in ``metrics``
+            deadline: Seconds after which the branch gives up, None for no deadline
+            hedge_percentile: Service time quantile (e.g. 0.95) after which a duplicate
+                call is fired, None to disable hedging
+            metrics: Histogram the latency quantile is read from
+            min_samples: Samples needed before the histogram quantile is trusted
+            initial_hedge_delay: Hedge delay used until then, None to not hedge
+            placeholder: Output returned when the deadline is missed (degraded
+                mode), None to raise ``asyncio.TimeoutError`` instead
+        """
+        super().__init__()
+        self.runnable = runnable
+        self.chain_name = chain_name
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.metrics = metrics
+        self.min_samples = min_samples
+        self.initial_hedge_delay = initial_hedge_delay
+        self.placeholder = placeholder
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_misses = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before firing a duplicate call, None to not hedge."""
+        if self.hedge_percentile is None:
+            return None
+        if self.metrics and self.metrics.sample_count(self.chain_name) >= self.min_samples:
+            return self.metrics.service_time_quantile(self.chain_name, self.hedge_percentile)
+        return self.initial_hedge_delay
+
+    def report(self) -> dict:
+        """How often hedges were fired and won, and deadlines were missed."""
+        return {
+            "hedge_delay": self.hedge_delay(),
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "deadline_misses": self.deadline_misses,
+        }
+
+    async def ainvoke(self, input_data, config=None, **kwargs):
+        start = time.perf_counter()
+        primary = asyncio.create_task(self.runnable.ainvoke(input_data, config, **kwargs))
+        attempts = {primary}
+        hedge_at = self.hedge_delay()
+        last_error: Optional[BaseException] = None
+
+        try:
+            while attempts:
+                elapsed = time.perf_counter() - start
+                timeouts = []
+                if hedge_at is not None:
+                    timeouts.append(hedge_at - elapsed)
+                if self.deadline is not None:
+                    timeouts.append(self.deadline - elapsed)
+                timeout = max(0.0, min(timeouts)) if timeouts else None
+
+                done, attempts = await asyncio.wait(
+                    attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not primary:
+                            self.hedge_wins += 1
+                        return attempt.result()
+                    last_error = attempt.exception()
+
+                elapsed = time.perf_counter() - start
+                if self.deadline is not None and elapsed >= self.deadline:
+                    return self._missed_deadline()
+                if hedge_at is not None and elapsed >= hedge_at and attempts:
+                    print(f"🔁 Hedging {self.chain_name} after {elapsed:.2f}s")
+                    self.hedges += 1
+                    attempts.add(
+                        asyncio.create_task(self.runnable.ainvoke(input_data, config, **kwargs))
+                    )
+                    hedge_at = None
+            raise last_error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    def invoke(self, input_data, config=None, **kwargs):
+        return self.runnable.invoke(input_data, config, **kwargs)
+
+    def _missed_deadline(self):
+        self.deadline_misses += 1
+        if self.placeholder is None:
+            raise asyncio.TimeoutError(
+                f"{self.chain_name} did not answer within {self.deadline:.2f}s"
+            )
+        print(f"⏱️ {self.chain_name} missed its {self.deadline:.2f}s deadline, using a placeholder")
+        return self.placeholder
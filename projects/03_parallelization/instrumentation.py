@@ -0,0 +1,296 @@
+"""Instrumentation for the chains of the Parallelization workflow.
+
+``LoggingWrapper`` records one ``ChainCallRecord`` per wrapped chain call and
+hands it to pluggable sinks:
+
+- ``InMemoryHistogramSink`` keeps recent samples and reports p50/p95/p99 per chain,
+  and service time (wall time minus queued time) quantiles that account for
+  cancelled calls
+- ``JsonlSink`` appends every record to a JSONL file
+- ``PrometheusTextSink`` aggregates histograms and counters and renders them
+  in the Prometheus text exposition format
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Protocol, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig, ensure_config
+
+
+@dataclass
+class ChainCallRecord:
+    """Measurements of one call of a wrapped chain."""
+
+    chain_name: str
+    started_at: float
+    wall_time: float
+    queued_time: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    error: Optional[str] = None
+    # Cancelled before answering (e.g. the loser of a hedged pair): its wall
+    # time is only a lower bound of the latency it would have had
+    cancelled: bool = False
+
+
+class MetricSink(Protocol):
+    """Destination of chain call records."""
+
+    def record(self, call: ChainCallRecord) -> None: ...
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def censored_percentile(samples: List[Tuple[float, bool]], fraction: float) -> float:
+    """Percentile of durations some of which are censored, with Kaplan-Meier.
+
+    ``samples`` are ``(duration, censored)`` pairs sorted by duration; a
+    censored duration only tells the call would have taken longer. When
+    censoring hides the percentile the longest duration is returned.
+    """
+    if not samples:
+        return 0.0
+    at_risk = len(samples)
+    survival = 1.0
+    for duration, censored in samples:
+        if not censored:
+            survival *= (at_risk - 1) / at_risk
+            if 1.0 - survival > fraction:
+                return duration
+        at_risk -= 1
+    return samples[-1][0]
+
+
+class InMemoryHistogramSink:
+    """Keeps the latest samples per chain and reports latency percentiles."""
+
+    def __init__(self, max_samples: int = 10_000):
+        self.max_samples = max_samples
+        self._wall_times: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=max_samples)
+        )
+        self._queued_times: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=max_samples)
+        )
+        self._service_times: Dict[str, Deque[Tuple[float, bool]]] = defaultdict(
+            lambda: deque(maxlen=max_samples)
+        )
+        self._tokens: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, call: ChainCallRecord) -> None:
+        with self._lock:
+            self._service_times[call.chain_name].append(
+                (call.wall_time - call.queued_time, call.cancelled)
+            )
+            if call.cancelled:
+                return
+            self._wall_times[call.chain_name].append(call.wall_time)
+            self._queued_times[call.chain_name].append(call.queued_time)
+            tokens = self._tokens[call.chain_name]
+            tokens[0] += call.prompt_tokens
+            tokens[1] += call.completion_tokens
+            if call.error:
+                self._errors[call.chain_name] += 1
+
+    def quantile(self, chain_name: str, fraction: float) -> Optional[float]:
+        """Wall time quantile of a chain, None before any call was recorded."""
+        with self._lock:
+            values = sorted(self._wall_times.get(chain_name, ()))
+        return percentile(values, fraction) if values else None
+
+    def service_time_quantile(
+        self, chain_name: str, fraction: float
+    ) -> Optional[float]:
+        """Service time (wall time minus queued time) quantile of a chain.
+
+        Cancelled calls are censored samples: they count as calls that would
+        have taken longer than they ran. None before any call was recorded.
+        """
+        with self._lock:
+            samples = sorted(self._service_times.get(chain_name, ()))
+        return censored_percentile(samples, fraction) if samples else None
+
+    def sample_count(self, chain_name: str) -> int:
+        """Number of wall time samples kept for a chain."""
+        with self._lock:
+            return len(self._wall_times.get(chain_name, ()))
+
+    def percentiles(self, chain_name: str) -> Dict[str, float]:
+        """p50/p95/p99 wall time of a chain, in seconds."""
+        with self._lock:
+            values = sorted(self._wall_times.get(chain_name, ()))
+        return {
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+        }
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per chain: call count, wall time percentiles, mean queued time, tokens, errors."""
+        report = {}
+        for chain_name in list(self._wall_times):
+            with self._lock:
+                queued = list(self._queued_times[chain_name])
+                prompt_tokens, completion_tokens = self._tokens[chain_name]
+                errors = self._errors[chain_name]
+            report[chain_name] = {
+                "calls": len(queued),
+                **self.percentiles(chain_name),
+                "mean_queued": sum(queued) / len(queued) if queued else 0.0,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "errors": errors,
+            }
+        return report
+
+
+class JsonlSink:
+    """Appends every record as one JSON line."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def record(self, call: ChainCallRecord) -> None:
+        with self._lock, open(self.path, "a", encoding="utf-8") as output:
+            output.write(json.dumps(asdict(call)) + "\n")
+
+
+class PrometheusTextSink:
+    """Aggregates records into Prometheus histograms and counters."""
+
+    DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[str, Dict[str, Dict[str, Any]]] = {
+            "chain_wall_time_seconds": {},
+            "chain_queued_time_seconds": {},
+        }
+        self._counters: Dict[str, Dict[tuple, int]] = {
+            "chain_tokens_total": defaultdict(int),
+            "chain_errors_total": defaultdict(int),
+            "chain_cancelled_total": defaultdict(int),
+        }
+        self._lock = threading.Lock()
+
+    def record(self, call: ChainCallRecord) -> None:
+        with self._lock:
+            if call.cancelled:
+                self._counters["chain_cancelled_total"][(call.chain_name,)] += 1
+                return
+            self._observe("chain_wall_time_seconds", call.chain_name, call.wall_time)
+            self._observe(
+                "chain_queued_time_seconds", call.chain_name, call.queued_time
+            )
+            tokens = self._counters["chain_tokens_total"]
+            tokens[(call.chain_name, "prompt")] += call.prompt_tokens
+            tokens[(call.chain_name, "completion")] += call.completion_tokens
+            if call.error:
+                self._counters["chain_errors_total"][(call.chain_name,)] += 1
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for metric, series in self._histograms.items():
+                lines.append(f"# TYPE {metric} histogram")
+                for chain_name, histogram in series.items():
+                    label = f'chain="{chain_name}"'
+                    for bound, count in zip(self.buckets, histogram["buckets"]):
+                        lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+                    lines.append(
+                        f'{metric}_bucket{{{label},le="+Inf"}} {histogram["count"]}'
+                    )
+                    lines.append(f"{metric}_sum{{{label}}} {histogram['sum']}")
+                    lines.append(f"{metric}_count{{{label}}} {histogram['count']}")
+            lines.append("# TYPE chain_tokens_total counter")
+            for (chain_name, token_type), value in self._counters[
+                "chain_tokens_total"
+            ].items():
+                lines.append(
+                    f'chain_tokens_total{{chain="{chain_name}",type="{token_type}"}} {value}'
+                )
+            for metric in ("chain_errors_total", "chain_cancelled_total"):
+                lines.append(f"# TYPE {metric} counter")
+                for (chain_name,), value in self._counters[metric].items():
+                    lines.append(f'{metric}{{chain="{chain_name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | Path) -> None:
+        """Write the rendered metrics to a file (e.g. for a node exporter textfile collector)."""
+        Path(path).write_text(self.render(), encoding="utf-8")
+
+    def _observe(self, metric: str, chain_name: str, value: float) -> None:
+        histogram = self._histograms[metric].setdefault(
+            chain_name, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        )
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+class CallUsageHandler(BaseCallbackHandler):
+    """Callback capturing when the first LLM call of a chain starts and its token usage."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.llm_started_at: Optional[float] = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs) -> None:
+        if self.llm_started_at is None:
+            self.llm_started_at = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, **kwargs) -> None:
+        if self.llm_started_at is None:
+            self.llm_started_at = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, **kwargs) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage:
+                    self.prompt_tokens += usage.get("input_tokens", 0)
+                    self.completion_tokens += usage.get("output_tokens", 0)
+                    return
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        self.prompt_tokens += token_usage.get("prompt_tokens", 0)
+        self.completion_tokens += token_usage.get("completion_tokens", 0)
+
+
+def with_handler(
+    config: Optional[RunnableConfig], handler: BaseCallbackHandler
+) -> RunnableConfig:
+    """Return a copy of ``config`` with ``handler`` added to its callbacks."""
+    config = ensure_config(config)
+    callbacks = config.get("callbacks")
+    if callbacks is None:
+        callbacks = [handler]
+    elif isinstance(callbacks, list):
+        callbacks = [*callbacks, handler]
+    else:
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+    return {**config, "callbacks": callbacks}
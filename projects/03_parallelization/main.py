@@ -1,81 +1,300 @@
 from dotenv import load_dotenv
 import asyncio
-from langchain_openai import ChatOpenAI
+import time
+import weakref
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
 from langchain_core.runnables import RunnableParallel, RunnablePassthrough, Runnable
+from shared.chain_registry import ChainRegistry
+from shared.llm_factory import chat_model
+from instrumentation import (
+    CallUsageHandler,
+    ChainCallRecord,
+    InMemoryHistogramSink,
+    MetricSink,
+    with_handler,
+)
+from hedging import HedgedRunnable
 
 load_dotenv()
 
+AnalysisMode = Literal["fanout", "fused"]
+
+class CommentAnalysis(BaseModel):
+    """Output of the fused analysis: every branch and the synthesis in one call."""
+    sentiment: str = Field(description="Sentiment of the comment")
+    criteria: str = Field(description="Whether the comment is objective, constructive, helpful and relevant")
+    response: str = Field(description="A diplomatic response to the comment")
+    key_points: List[str] = Field(description="Key points of the comment")
+    synthesis: str = Field(description="Short and concise relationship between the sentiment, criteria and response")
+
 class LoggingWrapper(Runnable):
-    """Wrapper class to add logging to chain execution."""
+    """Wrapper class to add logging and instrumentation to chain execution.
+
+    Every call records its wall time, the time spent queued before its LLM call
+    started, its token usage and its error (if any), and sends the record to
+    each of ``sinks``.
+    """
     
-    def __init__(self, chain, chain_name: str):
+    def __init__(self, chain, chain_name: str, sinks: Optional[List[MetricSink]] = None):
         super().__init__()
         self.chain = chain
         self.chain_name = chain_name
+        self.sinks = sinks or []
     
-    async def ainvoke(self, input_data, config=None):
+    async def ainvoke(self, input_data, config=None, **kwargs):
         print(f"🚀 Starting {self.chain_name} chain...")
+        usage = CallUsageHandler()
+        started_at, start = time.time(), time.perf_counter()
+        error = None
+        cancelled = False
         try:
-            result = await self.chain.ainvoke(input_data, config)
-            print(f"✅ Completed {self.chain_name} chain")
+            result = await self.chain.ainvoke(input_data, with_handler(config, usage), **kwargs)
+            print(f"✅ Completed {self.chain_name} chain in {time.perf_counter() - start:.2f}s")
             print(f"Result: {result}")
             return result
+        except asyncio.CancelledError:
+            # Cancelled calls (e.g. the loser of a hedged pair) are recorded as
+            # censored samples: their truncated wall time is only a lower bound
+            print(f"⏹️ Cancelled {self.chain_name} chain")
+            cancelled = True
+            raise
         except Exception as e:
+            error = str(e)
             print(f"❌ Error in {self.chain_name} chain: {e}")
-            print(f"Result: {result}")
             raise
+        finally:
+            self._record(usage, started_at, start, error, cancelled)
     
-    def invoke(self, input_data, config=None):
+    def invoke(self, input_data, config=None, **kwargs):
         print(f"🚀 Starting {self.chain_name} chain...")
+        usage = CallUsageHandler()
+        started_at, start = time.time(), time.perf_counter()
+        error = None
         try:
-            result = self.chain.invoke(input_data, config)
-            print(f"✅ Completed {self.chain_name} chain")
+            result = self.chain.invoke(input_data, with_handler(config, usage), **kwargs)
+            print(f"✅ Completed {self.chain_name} chain in {time.perf_counter() - start:.2f}s")
             return result
         except Exception as e:
+            error = str(e)
             print(f"❌ Error in {self.chain_name} chain: {e}")
             raise
+        finally:
+            self._record(usage, started_at, start, error)
+
+    def _record(
+        self, usage: CallUsageHandler, started_at: float, start: float, error: Optional[str], cancelled: bool = False
+    ):
+        """Send the measurements of one call to the sinks."""
+        end = time.perf_counter()
+        call = ChainCallRecord(
+            chain_name=self.chain_name,
+            started_at=started_at,
+            wall_time=end - start,
+            queued_time=(usage.llm_started_at or end) - start,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            error=error,
+            cancelled=cancelled,
+        )
+        for sink in self.sinks:
+            sink.record(call)
+
+class ConcurrencyLimitedRunnable(Runnable):
+    """Wrapper class to limit how many calls of a runnable are in flight at once.
+
+    A semaphore is bound to the event loop it first waits in, so each running
+    loop gets its own (the workflow may be used by several ``asyncio.run``).
+    """
+
+    def __init__(self, runnable, max_in_flight: int):
+        super().__init__()
+        self.runnable = runnable
+        self.max_in_flight = max_in_flight
+        # Event loop -> its semaphore, dropped when the loop is garbage collected
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Semaphore of the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+        return semaphore
+
+    async def ainvoke(self, input_data, config=None, **kwargs):
+        async with self.semaphore:
+            return await self.runnable.ainvoke(input_data, config, **kwargs)
+
+    def invoke(self, input_data, config=None, **kwargs):
+        return self.runnable.invoke(input_data, config, **kwargs)
 
 class ParallelizationWorkflow:
     """Parallelization Workflow"""
 
-    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.7):
-        """Initialize the workflow with LLM configuration."""
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.7,
+        max_in_flight_calls: int = 16,
+        metric_sinks: Optional[List[MetricSink]] = None,
+        branch_deadlines: Optional[Dict[str, float]] = None,
+        hedge_percentile: Optional[float] = None,
+        initial_hedge_delay: Optional[float] = None,
+        degraded_mode: bool = False,
+        llm: Optional[BaseChatModel] = None,
+        mode: AnalysisMode = "fanout",
+    ):
+        """Initialize the workflow with LLM configuration.
+
+        At most ``max_in_flight_calls`` LLM calls run at once, across every
+        comment being processed by this instance. Every branch call is recorded
+        in ``self.metrics`` and in the optional extra ``metric_sinks``
+        (e.g. ``JsonlSink`` or ``PrometheusTextSink``).
+
+        Tail latency of the fan-out (see ``hedging.py``):
+            branch_deadlines: Seconds each branch ("sentiment", "criteria",
+                "response", "key_points") may take before it gives up
+            hedge_percentile: Service time quantile of a branch (e.g. 0.95) after
+                which a duplicate call is fired, the first answer wins
+            initial_hedge_delay: Hedge delay used until enough latencies are recorded
+            degraded_mode: Synthesize with a placeholder for a branch that missed
+                its deadline instead of failing the comment
+
+        ``mode`` is the default way comments are analyzed: "fanout" makes one
+        call per branch plus a synthesis call, "fused" gets everything from a
+        single structured-output call. It can be overridden per request.
+
+        ``llm`` replaces the OpenAI model, e.g. with ``shared.fake_llm.FakeChatModel``.
+        """
         try:
-            self.llm = ChatOpenAI(model=model, temperature=temperature)
+            self.llm = llm or chat_model(model=model, temperature=temperature)
+            self.limited_llm = ConcurrencyLimitedRunnable(self.llm, max_in_flight_calls)
             self.str_parser = StrOutputParser()
+            self.chains = ChainRegistry()
+            self.metrics = InMemoryHistogramSink()
+            self.metric_sinks = [self.metrics, *(metric_sinks or [])]
+            self.branch_deadlines = branch_deadlines or {}
+            self.hedge_percentile = hedge_percentile
+            self.initial_hedge_delay = initial_hedge_delay
+            self.degraded_mode = degraded_mode
+            self.branch_guards: Dict[str, HedgedRunnable] = {}
+            self.mode = mode
         except Exception as e:
             print(f"Error initializing LLM: {e}")
             exit(1)
 
-        asyncio.run(self.run_workflow())
-
-
     async def run_workflow(self):
         """Run the parallelization workflow."""
         print("🔗 Parallelization Workflow")
         print("Enter a comment :")
         comment = input("Comment: ")
+        fused = input("Analyze with a single fused call? (y/N): ").strip().lower() == "y"
         
         try:
-            result = await self.build_parrallel_chain().ainvoke({"comment": comment})
+            result = await self.analyze_comment(comment, "fused" if fused else "fanout")
             print("\n----- Result -----\n")
             print(result)
+            self.print_latency_report()
             
         except Exception as e:
             print(f"Error in workflow: {str(e)}")
             raise
 
+    def print_latency_report(self):
+        """Print the latency percentiles and token usage of each branch."""
+        print("\n----- Branch latency -----\n")
+        print(f"{'chain':<24}{'calls':>6}{'p50':>8}{'p95':>8}{'p99':>8}{'queued':>8}{'tokens in/out':>16}")
+        for chain_name, stats in self.metrics.summary().items():
+            print(
+                f"{chain_name:<24}{stats['calls']:>6}{stats['p50']:>7.2f}s{stats['p95']:>7.2f}s"
+                f"{stats['p99']:>7.2f}s{stats['mean_queued']:>7.2f}s"
+                f"{stats['prompt_tokens']:>8}/{stats['completion_tokens']:<7}"
+            )
+        for branch, guard in self.branch_guards.items():
+            print(f"{branch}: {guard.report()}")
+
+    async def analyze_comment(self, comment: str, mode: Optional[AnalysisMode] = None) -> str:
+        """Run the analysis and synthesis for one comment, in ``mode`` (default: the workflow mode)."""
+        if (mode or self.mode) == "fused":
+            analysis = await self.analyze_comment_fused(comment)
+            return analysis.synthesis
+        chain = self.chains.get("parallel", self.build_parrallel_chain)
+        return await chain.ainvoke({"comment": comment})
+
+    async def analyze_comment_fused(self, comment: str) -> CommentAnalysis:
+        """Get every branch and the synthesis of one comment from a single LLM call."""
+        chain = self.chains.get("fused", self.build_fused_chain)
+        return await chain.ainvoke({"comment": comment})
+
+    async def process_comments(
+        self,
+        comments: AsyncIterable[str],
+        max_active_comments: Optional[int] = None,
+        mode: Optional[AnalysisMode] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Analyze a stream of comments, yielding each result as soon as it is ready.
+
+        Comments are processed concurrently, but at most ``max_active_comments``
+        (default: the in-flight LLM call limit) at a time. The next comment is
+        only pulled from ``comments`` when a slot frees up, so a fast producer
+        is held back instead of filling an unbounded queue.
+
+        When the consumer stops early (``aclose`` or ``break``), the comments
+        still being analyzed are cancelled and awaited.
+
+        Yields:
+            {"comment": ..., "result": ...} or {"comment": ..., "error": ...}
+        """
+        limit = max_active_comments or self.limited_llm.max_in_flight
+        iterator = comments.__aiter__()
+        active = set()
+        next_comment: Optional[asyncio.Task] = None
+        exhausted = False
+
+        try:
+            while active or not exhausted:
+                if next_comment is None and not exhausted and len(active) < limit:
+                    next_comment = asyncio.ensure_future(iterator.__anext__())
+
+                waiting = active | ({next_comment} if next_comment else set())
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+                if next_comment in done:
+                    try:
+                        active.add(asyncio.create_task(self._analyze_safely(next_comment.result(), mode)))
+                    except StopAsyncIteration:
+                        exhausted = True
+                    next_comment = None
+
+                for task in done & active:
+                    active.discard(task)
+                    yield task.result()
+        finally:
+            pending = active | ({next_comment} if next_comment else set())
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _analyze_safely(self, comment: str, mode: Optional[AnalysisMode] = None) -> Dict[str, Any]:
+        """Analyze one comment, returning the error instead of raising it."""
+        try:
+            return {"comment": comment, "result": await self.analyze_comment(comment, mode)}
+        except Exception as e:
+            return {"comment": comment, "error": str(e)}
+
     def build_parrallel_chain(self) :
         """Build the parallelization chain."""
 
         chains = self.define_independant_chains()
+        branches = dict(zip(["sentiment", "criteria", "response", "key_points"], chains))
         map_chain = RunnableParallel({
-            "sentiment": chains[0],
-            "criteria": chains[1],
-            "response": chains[2],
-            "key_points": chains[3],
+            **{branch: self.guard_branch(branch, chain) for branch, chain in branches.items()},
             "comment": RunnablePassthrough(),
         })
         
@@ -90,7 +309,41 @@ class ParallelizationWorkflow:
             """),
             ("user", "{comment}"),
         ])
-        return map_chain | synthesis_promp | self.llm | self.str_parser
+        return map_chain | synthesis_promp | self.limited_llm | self.str_parser
+
+    def build_fused_chain(self):
+        """Build the single-call chain returning a ``CommentAnalysis``."""
+        parser = PydanticOutputParser(pydantic_object=CommentAnalysis)
+        fused_prompt = ChatPromptTemplate.from_messages([
+            ("system", """Analyze the following comment:
+            - Analyze its sentiment
+            - Validate if it meets these criterias: objective, constructive, helpful and relevant
+            - Generate a diplomatic response to it
+            - Extract its key points
+            - Synthesize the relationship between the sentiment, criteria and response in a short and concise manner
+
+            {format_instructions}
+            """),
+            ("user", "{comment}"),
+        ]).partial(format_instructions=parser.get_format_instructions())
+        return LoggingWrapper(fused_prompt | self.limited_llm | parser, "Fused Analysis", self.metric_sinks)
+
+    def guard_branch(self, branch: str, chain: LoggingWrapper) -> Runnable:
+        """Wrap a branch with its deadline and hedging, when configured."""
+        deadline = self.branch_deadlines.get(branch)
+        if deadline is None and self.hedge_percentile is None:
+            return chain
+        guard = HedgedRunnable(
+            chain,
+            chain.chain_name,
+            deadline=deadline,
+            hedge_percentile=self.hedge_percentile,
+            metrics=self.metrics,
+            initial_hedge_delay=self.initial_hedge_delay,
+            placeholder=f"[{chain.chain_name} unavailable]" if self.degraded_mode else None,
+        )
+        self.branch_guards[branch] = guard
+        return guard
 
     def define_independant_chains(self):
         """Define the independant chains for the parallelization workflow."""
@@ -102,10 +355,10 @@ class ParallelizationWorkflow:
                 ("system", "Analyze the sentiment of the following comment:"),
                 ("user", "{comment}"),
             ])
-            | self.llm 
+            | self.limited_llm
             | self.str_parser
         )
-        chains.append(LoggingWrapper(sentiment_analysis_chain, "Sentiment Analysis"))
+        chains.append(LoggingWrapper(sentiment_analysis_chain, "Sentiment Analysis", self.metric_sinks))
 
         # Criteria validation chain
         criteria_validation_chain = (
@@ -118,10 +371,10 @@ class ParallelizationWorkflow:
                 """),
                 ("user", "{comment}"),
             ])
-            | self.llm 
+            | self.limited_llm
             | self.str_parser
         )
-        chains.append(LoggingWrapper(criteria_validation_chain, "Criteria Validation"))
+        chains.append(LoggingWrapper(criteria_validation_chain, "Criteria Validation", self.metric_sinks))
 
         # Response generation chain
         terms_chain = (
@@ -129,10 +382,10 @@ class ParallelizationWorkflow:
                 ("system", "Generate a diplomatic response to the following comment:"),
                 ("user", "{comment}"),
             ])
-            | self.llm
+            | self.limited_llm
             | self.str_parser
         )
-        chains.append(LoggingWrapper(terms_chain, "Response Generation"))
+        chains.append(LoggingWrapper(terms_chain, "Response Generation", self.metric_sinks))
 
         # Key points extraction chain
         key_points_extraction_chain = (
@@ -140,12 +393,13 @@ class ParallelizationWorkflow:
                 ("system", "Extract the key points from the following comment:"),
                 ("user", "{comment}"),
             ])
-            | self.llm
+            | self.limited_llm
             | self.str_parser
         )
-        chains.append(LoggingWrapper(key_points_extraction_chain, "Key Points Extraction"))
+        chains.append(LoggingWrapper(key_points_extraction_chain, "Key Points Extraction", self.metric_sinks))
 
         return chains
 
 if __name__ == "__main__":
-    ParallelizationWorkflow()
+    workflow = ParallelizationWorkflow()
+    asyncio.run(workflow.run_workflow())
@@ -0,0 +1,76 @@
+import asyncio
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from hedging import HedgedRunnable
+from instrumentation import ChainCallRecord, InMemoryHistogramSink
+from shared.cli import load_workflow
+from shared.fake_llm import FakeChatModel
+
+
+def record(wall_time, queued_time=0.0, cancelled=False):
+    return ChainCallRecord(
+        chain_name="branch",
+        started_at=0.0,
+        wall_time=wall_time,
+        queued_time=queued_time,
+        cancelled=cancelled,
+    )
+
+
+def test_service_time_quantile_leaves_out_queued_time():
+    metrics = InMemoryHistogramSink()
+    for _ in range(10):
+        metrics.record(record(wall_time=5.0, queued_time=4.9))
+    assert metrics.quantile("branch", 0.9) == 5.0
+    assert abs(metrics.service_time_quantile("branch", 0.9) - 0.1) < 1e-9
+
+
+def test_cancelled_calls_are_censored_samples():
+    metrics = InMemoryHistogramSink()
+    for _ in range(9):
+        metrics.record(record(wall_time=0.1))
+    # Hedge losers cancelled after 0.2s would have taken longer than that
+    for _ in range(9):
+        metrics.record(record(wall_time=0.2, cancelled=True))
+    assert metrics.sample_count("branch") == 9
+    assert metrics.quantile("branch", 0.95) == 0.1
+    assert metrics.service_time_quantile("branch", 0.95) == 0.2
+
+
+def test_hedge_fires_and_wins_against_a_slow_call():
+    module = load_workflow("parallelization")
+    # The first call is stuck in the slow tail, the duplicate answers quickly
+    llm = FakeChatModel(
+        reply="positive", latency=lambda call: 5.0 if call == 0 else 0.01
+    )
+    metrics = InMemoryHistogramSink()
+    chain = module.LoggingWrapper(
+        ChatPromptTemplate.from_messages([("user", "{comment}")])
+        | llm
+        | StrOutputParser(),
+        "Sentiment Analysis",
+        [metrics],
+    )
+    guard = HedgedRunnable(
+        chain,
+        "Sentiment Analysis",
+        hedge_percentile=0.95,
+        metrics=metrics,
+        initial_hedge_delay=0.05,
+    )
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        result = await guard.ainvoke({"comment": "Great product"})
+        await asyncio.sleep(0)
+        return result, asyncio.get_running_loop().time() - started
+
+    result, elapsed = asyncio.run(run())
+    assert result == "positive"
+    assert elapsed < 1.0
+    assert guard.report()["hedges"] == 1
+    assert guard.report()["hedge_wins"] == 1
+    assert metrics.sample_count("Sentiment Analysis") == 1
+    assert metrics.service_time_quantile("Sentiment Analysis", 0.99) >= 0.05
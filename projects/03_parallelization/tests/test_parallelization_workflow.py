@@ -0,0 +1,51 @@
+import asyncio
+
+from shared.cli import load_workflow
+from shared.fake_llm import FakeChatModel
+
+
+def test_closing_the_stream_cancels_comments_in_flight():
+    module = load_workflow("parallelization")
+    workflow = module.ParallelizationWorkflow(llm=FakeChatModel(reply="ok"))
+    cancelled = []
+
+    async def analyze(comment, mode=None):
+        try:
+            await asyncio.sleep(0.01 if comment == "first" else 5.0)
+        except asyncio.CancelledError:
+            cancelled.append(comment)
+            raise
+        return {"comment": comment, "result": "ok"}
+
+    workflow._analyze_safely = analyze
+
+    async def comments():
+        for comment in ("first", "slow 0", "slow 1", "slow 2"):
+            yield comment
+
+    async def run():
+        stream = workflow.process_comments(comments())
+        first = await anext(stream)
+        await stream.aclose()
+        return first, {task for task in asyncio.all_tasks() if not task.done()}
+
+    first, pending = asyncio.run(run())
+    assert first == {"comment": "first", "result": "ok"}
+    assert sorted(cancelled) == ["slow 0", "slow 1", "slow 2"]
+    assert len(pending) == 1  # only the task of run() itself
+
+
+def test_llm_limit_works_across_event_loops():
+    module = load_workflow("parallelization")
+    llm = FakeChatModel(reply="ok", latency=0.01)
+    limited = module.ConcurrencyLimitedRunnable(llm, max_in_flight=2)
+
+    async def run():
+        # More calls than the limit: some of them wait on the semaphore
+        replies = await asyncio.gather(
+            *(limited.ainvoke(f"call {i}") for i in range(6))
+        )
+        return [reply.content for reply in replies]
+
+    assert asyncio.run(run()) == ["ok"] * 6
+    assert asyncio.run(run()) == ["ok"] * 6
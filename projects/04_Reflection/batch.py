@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Batch mode for the Reflection workflow
+
+Reads tasks from a JSONL file, one object per line:
+``{"id": "...", "task": "...", "rubric": "...", "max_iterations": 3}``
+(only ``task`` is required, the rubric defaults to the Renaissance reviewer;
+``"critics": {"name": "prompt", ...}`` sets the critics of ``--multi-critic``,
+which otherwise review a task with a custom rubric against that rubric alone)
+and runs their reflection loops concurrently with ``ReflectionWorkflow.run_many``:
+
+- every loop keeps its own state, all of them share ``--max-concurrent-calls``
+- each result is appended to the output JSONL as soon as its loop finishes,
+  with its iteration count, stop reason, LLM calls and prompt tokens
+- a failing task is recorded with its error and does not stop the run
+
+Usage:
+    python batch.py question_bank.jsonl results.jsonl --max-concurrent-calls 32
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import asdict
+from typing import Any, Dict, Iterator
+
+from main import CRITIQUE_OUTPUT, ReflectionTask, ReflectionWorkflow
+
+
+def reviewer_prompt(prompt: str) -> str:
+    """A user-supplied rubric or critic prompt, with the critique output instructions.
+
+    Without them the critic is never asked to answer RESULT_IS_PERFECT, and
+    the task could not stop as "perfect".
+    """
+    return prompt if "RESULT_IS_PERFECT" in prompt else prompt + "\n" + CRITIQUE_OUTPUT
+
+
+def read_tasks(input_path: str, errors: list) -> Iterator[ReflectionTask]:
+    """Yield one task per valid JSONL line, collecting malformed lines in ``errors``."""
+    with open(input_path, encoding="utf-8") as input_file:
+        for line_number, line in enumerate(input_file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item: Dict[str, Any] = json.loads(line)
+                task = ReflectionTask(
+                    task_prompt=item["task"],
+                    max_iterations=int(item.get("max_iterations", 3)),
+                    task_id=str(item.get("id", line_number)),
+                )
+                if item.get("rubric"):
+                    task.rubric = reviewer_prompt(item["rubric"])
+                    # The default critics review against the Renaissance rubric
+                    task.critics = {"Rubric": task.rubric}
+                if item.get("critics"):
+                    task.critics = {
+                        str(name): reviewer_prompt(str(prompt)) for name, prompt in item["critics"].items()
+                    }
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError, AttributeError) as e:
+                errors.append({"task_id": str(line_number), "error": f"Invalid input line: {e}"})
+                continue
+            yield task
+
+
+async def run_batch(args) -> Dict[str, int]:
+    """Run every task of the input file and write the results."""
+    workflow = ReflectionWorkflow(
+        compact_history=args.compact_history,
+        convergence_threshold=args.convergence_threshold,
+        multi_critic=args.multi_critic,
+    )
+    errors: list = []
+    counts = {"succeeded": 0, "failed": 0, "llm_calls": 0}
+
+    with open(args.output, "w", encoding="utf-8") as output:
+        async for result in workflow.run_many(
+            read_tasks(args.input, errors), max_concurrent_calls=args.max_concurrent_calls
+        ):
+            output.write(json.dumps(asdict(result)) + "\n")
+            output.flush()
+            counts["failed" if result.error else "succeeded"] += 1
+            counts["llm_calls"] += result.llm_calls
+        for error in errors:
+            output.write(json.dumps(error) + "\n")
+    counts["failed"] += len(errors)
+    return counts
+
+
+def main():
+    """Parse the command line and run the batch."""
+    parser = argparse.ArgumentParser(description="Run the Reflection workflow over a JSONL file of tasks")
+    parser.add_argument("input", help="JSONL file with one task per line")
+    parser.add_argument("output", help="JSONL file the results are written to")
+    parser.add_argument("--max-concurrent-calls", type=int, default=16)
+    parser.add_argument("--compact-history", action="store_true")
+    parser.add_argument("--convergence-threshold", type=float, default=None)
+    parser.add_argument("--multi-critic", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = asyncio.run(run_batch(args))
+    print(
+        f"✅ {counts['succeeded']} succeeded, {counts['failed']} failed, "
+        f"{counts['llm_calls']} LLM calls in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,19 +5,160 @@ This workflow demonstrates the Reflection agentic design pattern through
 a complete reflection process.
 """
 
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+import asyncio
+import difflib
+import re
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.language_models import BaseChatModel
 from dotenv import load_dotenv
+from shared.llm_factory import chat_model
+from shared.tracing import trace_step
 
 load_dotenv()
 
+RENAISSANCE_TASK = """
+            Your task is to write a 10 questions questionnaire about the renaissance.
+            It should test understanding of the period and not only recall facts.
+
+            The questions should be in the following format:
+            Question {number}: {question}
+
+            The answers should be in the following format:
+            Answer {number}: {answer}
+            """
+
+REFINE_REQUEST = "Please refine the questionnaire using the critique provided"
+
+CRITIQUE_OUTPUT = """
+                    ## Output
+                    If the questionnaire meets all requirements, respond with the single phrase 'RESULT_IS_PERFECT'.
+                    Otherwise, provide a bulleted list of your critique.
+"""
+
+REFLECTOR_PROMPT = """
+                    You are a historian and an expert in the Renaissance.
+                    Your role is to perform a meticulous questionnaire review.
+                    Critically evaluate the provided questionnaire based  on the original task requirements.
+                    Look for questions that are not relevant to the Renaissance, are based on fact recalls and not understanding, to hard for a high school level knowledge, and areas for improvement.
+                    Focus on critiquing, not rewriting, fixing nor answering the question. You are here to comment on how areas of improvement.
+                    Be precise on which questions to improve and how to improve them.
+""" + CRITIQUE_OUTPUT
+
+# Specialized critics used in multi-critic mode, each focused on one aspect
+CRITIC_PROMPTS = {
+    "Relevance": """
+                    You are a historian and an expert in the Renaissance.
+                    Review the provided questionnaire for relevance only: flag questions or answers that are not about the Renaissance, are anachronistic or historically inaccurate.
+                    Focus on critiquing, not rewriting. Be precise on which questions to improve and how.
+""" + CRITIQUE_OUTPUT,
+    "Depth": """
+                    You are a history teacher designing assessments.
+                    Review the provided questionnaire for conceptual depth only: flag questions that test fact recall instead of understanding of causes, consequences and connections.
+                    Focus on critiquing, not rewriting. Be precise on which questions to improve and how.
+""" + CRITIQUE_OUTPUT,
+    "Difficulty": """
+                    You are a high school teacher.
+                    Review the provided questionnaire for difficulty only: flag questions that are too hard or too easy for high school level knowledge, or ambiguous.
+                    Focus on critiquing, not rewriting. Be precise on which questions to improve and how.
+""" + CRITIQUE_OUTPUT,
+}
+
+@dataclass
+class ReflectionTask:
+    """One generation task and the rubric its output is reviewed against."""
+    task_prompt: str = RENAISSANCE_TASK
+    rubric: str = REFLECTOR_PROMPT
+    critics: Dict[str, str] = field(default_factory=lambda: dict(CRITIC_PROMPTS))
+    max_iterations: int = 3
+    task_id: Optional[str] = None
+
+    def __post_init__(self):
+        if self.max_iterations < 1:
+            raise ValueError(f"max_iterations must be at least 1, got {self.max_iterations}")
+
+@dataclass
+class ReflectionResult:
+    """Outcome of the reflection loop of one task."""
+    task_id: Optional[str]
+    output: str = ""
+    iterations: int = 0
+    stop_reason: str = ""
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    duration: float = 0.0
+    error: Optional[str] = None
+
+_BULLET_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+
+def similarity(previous: str, current: str, threshold: float = 0.0) -> float:
+    """Similarity ratio (0 to 1) between two versions of a text, word by word.
+
+    Comparing word lists instead of characters keeps this cheap on long texts.
+    When the cheap upper bounds of the ratio are already below ``threshold``
+    that bound is returned instead of the exact ratio.
+    """
+    matcher = difflib.SequenceMatcher(None, previous.split(), current.split(), autojunk=False)
+    for bound in (matcher.real_quick_ratio, matcher.quick_ratio):
+        ratio = bound()
+        if ratio < threshold:
+            return ratio
+    return matcher.ratio()
+
+def merge_critiques(critiques: Dict[str, str], duplicate_threshold: float = 0.85) -> str:
+    """Merge the bullet points of several critics, dropping near-duplicates.
+
+    Critics answering RESULT_IS_PERFECT are skipped; when all of them do, the
+    merged critique is RESULT_IS_PERFECT as well.
+    """
+    merged: List[str] = []
+    seen: List[str] = []
+    for critic, critique in critiques.items():
+        if "RESULT_IS_PERFECT" in critique:
+            continue
+        for line in critique.splitlines():
+            point = _BULLET_PATTERN.sub("", line).strip()
+            if not point or point.startswith("#"):
+                continue
+            normalized = " ".join(re.findall(r"\w+", point.lower()))
+            if any(similarity(normalized, other, duplicate_threshold) >= duplicate_threshold for other in seen):
+                continue
+            seen.append(normalized)
+            merged.append(f"- [{critic}] {point}")
+    return "\n".join(merged) if merged else "RESULT_IS_PERFECT"
+
 class ReflectionWorkflow:
     """Reflection Workflow"""
 
-    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.1):
-        """Initialize the workflow with LLM configuration."""
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.1,
+        compact_history: bool = False,
+        convergence_threshold: Optional[float] = None,
+        multi_critic: bool = False,
+        llm: Optional[BaseChatModel] = None,
+    ):
+        """Initialize the workflow with LLM configuration.
+
+        Args:
+            compact_history: Send the generator only the task, the latest
+                questionnaire and the latest critique instead of the whole history
+            convergence_threshold: Stop early when two consecutive questionnaires
+                are at least this similar (e.g. 0.95), None to disable
+            multi_critic: Review each questionnaire with the specialized critics
+                of ``CRITIC_PROMPTS`` concurrently and merge their critiques,
+                instead of the single reflector
+            llm: Model used instead of the OpenAI one, e.g. a
+                ``shared.fake_llm.FakeChatModel`` to run offline
+        """
         try:
-            self.llm = ChatOpenAI(model=model, temperature=temperature)
+            self.llm = llm or chat_model(model=model, temperature=temperature)
+            self.compact_history = compact_history
+            self.convergence_threshold = convergence_threshold
+            self.multi_critic = multi_critic
         except Exception as e:
             print(f"Error initializing LLM: {e}")
             exit(1)
@@ -27,67 +168,196 @@ class ReflectionWorkflow:
         print("🔗 Reflection Workflow")
         return self.run_reflection_loop()
 
-    def run_reflection_loop(self):
-        task_prompt = """
-            Your task is to write a 10 questions questionnaire about the renaissance.
-            It should test understanding of the period and not only recall facts.
+    def build_generator_messages(
+        self, message_history: List[BaseMessage], task_prompt: str, questionnaire: str, critique: str
+    ) -> List[BaseMessage]:
+        """Messages sent to refine the questionnaire."""
+        if self.compact_history:
+            return [
+                HumanMessage(content=task_prompt),
+                AIMessage(content=questionnaire),
+                HumanMessage(content=f"Critique of the previous questionnaire:\n{critique}\n\n{REFINE_REQUEST}"),
+            ]
+        message_history.append(HumanMessage(content=f"Critique of the previous questionnaire:\n{critique}"))
+        message_history.append(HumanMessage(content=REFINE_REQUEST))
+        return message_history
 
-            The questions should be in the following format:
-            Question {number}: {question}
+    async def critique(self, task: ReflectionTask, questionnaire: str, invoke, step: str = "critique") -> str:
+        """Critique a questionnaire with the task rubric, or with every critic at once.
 
-            The answers should be in the following format:
-            Answer {number}: {answer}
-            """
+        ``step`` names the critique calls in traces (suffixed by the critic name).
+        """
+        def review(system_prompt: str) -> List[BaseMessage]:
+            return [
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=f"Original Task:\n{task.task_prompt}\n\nQuestionnaire to review:\n{questionnaire}"),
+            ]
+
+        if not self.multi_critic:
+            return await invoke(review(task.rubric), step)
+        critiques = await asyncio.gather(
+            *(invoke(review(prompt), f"{step}: {name}") for name, prompt in task.critics.items())
+        )
+        return merge_critiques(dict(zip(task.critics, critiques)))
+
+    def run_reflection_loop(self, task: Optional[ReflectionTask] = None) -> ReflectionResult:
+        """Synchronous wrapper of ``arun_reflection_loop``."""
+        return asyncio.run(self.arun_reflection_loop(task))
+
+    async def arun_reflection_loop(
+        self,
+        task: Optional[ReflectionTask] = None,
+        limiter: Optional[asyncio.Semaphore] = None,
+        verbose: bool = True,
+    ) -> ReflectionResult:
+        """Generate, critique and refine the output of ``task`` (default: the Renaissance questionnaire).
+
+        Args:
+            task: Task prompt, rubric and iteration budget
+            limiter: Semaphore bounding the LLM calls in flight, shared between loops
+            verbose: Print every stage of the loop
+
+        Returns:
+            The final output, the number of iterations, why the loop stopped
+            ("perfect", "converged" or "max_iterations"), the LLM calls made
+            and the prompt tokens they used
+        """
+        task = task or ReflectionTask()
+        with trace_step("reflection", task_id=task.task_id):
+            return await self._reflection_loop(task, limiter, verbose)
+
+    async def _reflection_loop(
+        self, task: ReflectionTask, limiter: Optional[asyncio.Semaphore], verbose: bool
+    ) -> ReflectionResult:
+        """Body of ``arun_reflection_loop``."""
+        task_prompt = task.task_prompt
+        log: Callable[..., None] = print if verbose else (lambda *args, **kwargs: None)
+        started = time.perf_counter()
         
-        max_iteration = 3
+        max_iteration = task.max_iterations
         current_questionnaire = ""
+        critique = ""
         message_history = [HumanMessage(content=task_prompt)]
+        stop_reason = "max_iterations"
+        llm_calls = 0
+        prompt_tokens = 0
+
+        async def invoke(messages: List[BaseMessage], step: str) -> str:
+            nonlocal llm_calls, prompt_tokens
+            config = {"run_name": step}
+            if limiter:
+                async with limiter:
+                    response = await self.llm.ainvoke(messages, config)
+            else:
+                response = await self.llm.ainvoke(messages, config)
+            llm_calls += 1
+            prompt_tokens += (response.usage_metadata or {}).get("input_tokens", 0)
+            return response.content
         
         for i in range(max_iteration):
-            print("\n" + "=" *25 + f"Reflexion loop: Iteration {i+1}" + "=" *25)
+            log("\n" + "=" *25 + f"Reflexion loop: Iteration {i+1}" + "=" *25)
 
+            previous_questionnaire = current_questionnaire
             if(i == 0):
-                print("\n >>> Stage 1: Generating initial questionnaire")
-                response = self.llm.invoke(message_history)
-                current_questionnaire = response.content
+                log("\n >>> Stage 1: Generating initial questionnaire")
+                current_questionnaire = await invoke(message_history, f"iteration {i+1} generation")
             else:
-                print("\n >>> Stage 1: Refining questionnaire based on previous critiques")
-                message_history.append(HumanMessage(content="Please refine the questionnaire using the critique provided"))
-                response = self.llm.invoke(message_history)
-                current_questionnaire = response.content 
+                log("\n >>> Stage 1: Refining questionnaire based on previous critiques")
+                messages = self.build_generator_messages(message_history, task_prompt, current_questionnaire, critique)
+                current_questionnaire = await invoke(messages, f"iteration {i+1} generation")
+            if not self.compact_history:
+                message_history.append(AIMessage(content=current_questionnaire))
 
-            print("\n--- Generated Questionnaire (v" + str(i+1) + ") ---\n")
+            log("\n--- Generated Questionnaire (v" + str(i+1) + ") ---\n")
 
-            print("\n>>>Stage 2: Reflecting on the generated questionnaire...")
+            if i > 0 and self.convergence_threshold is not None:
+                ratio = similarity(previous_questionnaire, current_questionnaire, self.convergence_threshold)
+                if ratio >= self.convergence_threshold:
+                    log(f"\n---Convergence---\nThe questionnaire barely changed (similarity {ratio:.2f}), stopping.")
+                    stop_reason = "converged"
+                    break
 
-            reflector_prompt = [SystemMessage(content="""
-                    You are a historian and an expert in the Renaissance.
-                    Your role is to perform a meticulous questionnaire review.
-                    Critically evaluate the provided questionnaire based  on the original task requirements.
-                    Look for questions that are not relevant to the Renaissance, are based on fact recalls and not understanding, to hard for a high school level knowledge, and areas for improvement.
-                    Focus on critiquing, not rewriting, fixing nor answering the question. You are here to comment on how areas of improvement.
-                    Be precise on which questions to improve and how to improve them.
+            log("\n>>>Stage 2: Reflecting on the generated questionnaire...")
 
-                    ## Output
-                    If the questionnaire meets all requirements, respond with the single phrase 'RESULT_IS_PERFECT'.
-                    Otherwise, provide a bulleted list of your critique.
-            """),
-            HumanMessage(content=f"Original Task:\n{task_prompt}\n\nQuestionnaire to review:\n{current_questionnaire}")
-            ]
-
-            critique_response = self.llm.invoke(reflector_prompt)
-            critique = critique_response.content
+            critique = await self.critique(task, current_questionnaire, invoke, f"iteration {i+1} critique")
 
             if("RESULT_IS_PERFECT" in critique):
-                print("\n---Critique---\nNo further critique found. The questionnaire is satisfactory.")
+                log("\n---Critique---\nNo further critique found. The questionnaire is satisfactory.")
+                stop_reason = "perfect"
                 break
 
-            print("\n--- Critique ---\n" + critique)
-            message_history.append(HumanMessage(content=f"Critique of the previous questionnaire:\n{critique}"))
+            log("\n--- Critique ---\n" + critique)
+
+        log("\n" + "=" *25 + "Final result" + "=" *25)
+        log("\nFinal refined questionnaire after the reflection process:\n")
+        log(current_questionnaire)
+        log(f"\n📊 {i+1} iteration(s), stopped: {stop_reason}, {llm_calls} LLM calls, {prompt_tokens} prompt tokens")
 
-        print("\n" + "=" *25 + "Final result" + "=" *25)
-        print("\nFinal refined questionnaire after the reflection process:\n")
-        print(current_questionnaire)
+        return ReflectionResult(
+            task_id=task.task_id,
+            output=current_questionnaire,
+            iterations=i + 1,
+            stop_reason=stop_reason,
+            llm_calls=llm_calls,
+            prompt_tokens=prompt_tokens,
+            duration=time.perf_counter() - started,
+        )
+
+    async def run_many(
+        self,
+        tasks: Iterable[ReflectionTask],
+        max_concurrent_calls: int = 16,
+        max_active_tasks: Optional[int] = None,
+    ) -> AsyncIterator[ReflectionResult]:
+        """Run the reflection loops of many tasks at once, yielding each result when it is done.
+
+        Every loop keeps its own state; all of them share one limit of
+        ``max_concurrent_calls`` LLM calls in flight. At most
+        ``max_active_tasks`` loops (default: twice the call limit) are active,
+        so ``tasks`` can be a lazy iterator over a large question bank. A
+        failing task yields a result with its ``error`` instead of stopping the run.
+        When the consumer stops early, the loops still running are cancelled.
+        """
+        limiter = asyncio.Semaphore(max_concurrent_calls)
+        max_active_tasks = max_active_tasks or 2 * max_concurrent_calls
+        pending = iter(tasks)
+        active = set()
+
+        def start_next() -> bool:
+            task = next(pending, None)
+            if task is None:
+                return False
+            active.add(asyncio.create_task(self._run_safely(task, limiter)))
+            return True
+
+        while len(active) < max_active_tasks and start_next():
+            pass
+        try:
+            while active:
+                done, _ = await asyncio.wait(active, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    active.discard(finished)
+                    yield finished.result()
+                    start_next()
+        finally:
+            # The consumer stopped early: do not leave loops running behind it
+            for task in active:
+                task.cancel()
+            if active:
+                await asyncio.gather(*active, return_exceptions=True)
+
+    async def _run_safely(self, task: ReflectionTask, limiter: asyncio.Semaphore) -> ReflectionResult:
+        """Run one reflection loop, returning the error instead of raising it."""
+        started = time.perf_counter()
+        try:
+            return await self.arun_reflection_loop(task, limiter, verbose=False)
+        except Exception as e:
+            return ReflectionResult(
+                task_id=task.task_id,
+                stop_reason="error",
+                duration=time.perf_counter() - started,
+                error=str(e),
+            )
         
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+import asyncio
+
+from shared.cli import load_workflow
+from shared.fake_llm import FakeChatModel, ScriptedReply
+
+module = load_workflow("reflection")
+
+
+def test_merge_critiques_drops_near_duplicates_and_perfect_critics():
+    merged = module.merge_critiques(
+        {
+            "Relevance": "- Question 3 is not about the Renaissance.",
+            "Depth": "- Question 3 is not about the Renaissance!\n- Question 5 only tests recall.",
+            "Difficulty": "RESULT_IS_PERFECT",
+        }
+    )
+    assert merged.splitlines() == [
+        "- [Relevance] Question 3 is not about the Renaissance.",
+        "- [Depth] Question 5 only tests recall.",
+    ]
+    assert module.merge_critiques({"Depth": "RESULT_IS_PERFECT"}) == "RESULT_IS_PERFECT"
+
+
+def test_loop_stops_when_the_questionnaire_stops_changing():
+    llm = FakeChatModel(
+        reply=ScriptedReply(
+            [("Questionnaire to review", "- Question 1 is too easy.")],
+            default="Question 1: Why did the Renaissance start in Italy?",
+        )
+    )
+    workflow = module.ReflectionWorkflow(llm=llm, convergence_threshold=0.9)
+    result = workflow.run_reflection_loop(module.ReflectionTask(max_iterations=5))
+    assert result.stop_reason == "converged"
+    assert result.iterations == 2
+    # Two generations and the critique of the first one
+    assert result.llm_calls == 3
+
+
+def test_run_many_yields_every_task_and_records_errors():
+    def reply(messages):
+        if "explode" in messages[0].content:
+            raise RuntimeError("model unavailable")
+        return "RESULT_IS_PERFECT"
+
+    workflow = module.ReflectionWorkflow(llm=FakeChatModel(reply=reply))
+    tasks = [
+        module.ReflectionTask(task_prompt="Write a quiz", task_id="ok"),
+        module.ReflectionTask(task_prompt="explode", task_id="failing"),
+    ]
+
+    async def run():
+        return [result async for result in workflow.run_many(tasks)]
+
+    results = {result.task_id: result for result in asyncio.run(run())}
+    assert results["ok"].stop_reason == "perfect"
+    assert results["failing"].stop_reason == "error"
+    assert results["failing"].error == "model unavailable"
+
+
+def test_closing_run_many_cancels_the_loops_still_running():
+    workflow = module.ReflectionWorkflow(llm=FakeChatModel())
+    cancelled = []
+
+    async def run_safely(task, limiter):
+        try:
+            await asyncio.sleep(0.01 if task.task_id == "fast" else 5.0)
+        except asyncio.CancelledError:
+            cancelled.append(task.task_id)
+            raise
+        return module.ReflectionResult(task_id=task.task_id)
+
+    workflow._run_safely = run_safely
+    tasks = [
+        module.ReflectionTask(task_id=name) for name in ("fast", "slow 0", "slow 1")
+    ]
+
+    async def run():
+        results = workflow.run_many(tasks)
+        first = await anext(results)
+        await results.aclose()
+        return first, {task for task in asyncio.all_tasks() if not task.done()}
+
+    first, pending = asyncio.run(run())
+    assert first.task_id == "fast"
+    assert sorted(cancelled) == ["slow 0", "slow 1"]
+    assert len(pending) == 1  # only the task of run() itself
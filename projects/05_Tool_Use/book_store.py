@@ -0,0 +1,242 @@
+"""Indexed, file-backed book store behind the ``search_database`` tool.
+
+Rows are kept in column storage instead of one dict per book:
+
+- titles and authors are concatenated into string blobs addressed by offset
+  arrays, copies are an ``array`` of unsigned ints
+- a lowercase ``title + author`` blob, also addressed by offsets, is used to
+  verify matches and as a substring fallback scanned with ``str.find``
+
+Queries keep the semantics of the original tool (case-insensitive substring of
+the title or the author) but are answered from a token inverted index:
+
+- the vocabulary is kept sorted, so words starting with a prefix are found
+  with ``bisect``, and indexed by trigram, so words containing a fragment are
+  found without looking at every row
+- the most selective token of the query gives the candidate rows, which are
+  then checked against the lowercase text; queries no token narrows down
+  (e.g. a single letter) are answered by scanning the lowercase blob
+"""
+
+import csv
+import io
+import json
+import mmap
+import re
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+Book = Dict[str, str | int]
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Separates the title from the author in the lowercase blob, so a query never
+# matches across the two fields
+_FIELD_SEPARATOR = "\x1f"
+_ROW_SEPARATOR = "\x1e"
+# Candidate count below which no other token of the query is looked up
+_SELECTIVE_ROWS = 256
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a text."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def read_rows(path: str | Path) -> Iterator[Tuple[str, str, int]]:
+    """Yield (title, author, copies) from a CSV or JSONL file.
+
+    The file is memory-mapped, so it is read lazily by the OS instead of being
+    loaded whole. CSV files need a header with ``title`` and ``author`` columns
+    (``copies`` is optional), JSONL files one object per line with those keys.
+    """
+    path = Path(path)
+    with open(path, "rb") as raw_file:
+        if path.stat().st_size == 0:
+            return
+        with mmap.mmap(raw_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            lines = (line.decode("utf-8") for line in iter(mapped.readline, b""))
+            if path.suffix.lower() in (".jsonl", ".ndjson"):
+                for line in lines:
+                    if line.strip():
+                        row = json.loads(line)
+                        yield row["title"], row["author"], int(row.get("copies", 0))
+            else:
+                for row in csv.DictReader(lines):
+                    yield row["title"], row["author"], int(row.get("copies") or 0)
+
+
+class BookStore:
+    """Column storage of books with a token inverted index."""
+
+    def __init__(self, rows: Iterable[Tuple[str, str, int]] = ()):
+        """Build the store from (title, author, copies) rows."""
+        # Rows are appended to growing buffers and arrays, so building the store
+        # never holds one Python object per row
+        titles, authors, lowered = io.StringIO(), io.StringIO(), io.StringIO()
+        self.title_offsets = array("Q", [0])
+        self.author_offsets = array("Q", [0])
+        self.text_offsets = array("Q", [0])
+        self.copies = array("I")
+        self.postings: Dict[str, array] = {}
+
+        for row_id, (title, author, copies) in enumerate(rows):
+            titles.write(title)
+            authors.write(author)
+            self.title_offsets.append(self.title_offsets[-1] + len(title))
+            self.author_offsets.append(self.author_offsets[-1] + len(author))
+            self.copies.append(copies)
+            text = f"{title.lower()}{_FIELD_SEPARATOR}{author.lower()}{_ROW_SEPARATOR}"
+            lowered.write(text)
+            self.text_offsets.append(self.text_offsets[-1] + len(text))
+            for token in set(_TOKEN_PATTERN.findall(text)):
+                postings = self.postings.get(token)
+                if postings is None:
+                    postings = self.postings[token] = array("I")
+                postings.append(row_id)
+
+        self.titles = titles.getvalue()
+        self.authors = authors.getvalue()
+        self.text = lowered.getvalue()
+        self.vocabulary: List[str] = sorted(self.postings)
+        self._vocabulary_blob = "\n" + "\n".join(self.vocabulary) + "\n"
+        word_trigrams: Dict[str, List[int]] = {}
+        for word_id, word in enumerate(self.vocabulary):
+            for trigram in {word[i : i + 3] for i in range(len(word) - 2)}:
+                word_trigrams.setdefault(trigram, []).append(word_id)
+        self._word_trigrams: Dict[str, array] = {
+            trigram: array("I", word_ids) for trigram, word_ids in word_trigrams.items()
+        }
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "BookStore":
+        """Load a store from a CSV or JSONL file."""
+        return cls(read_rows(path))
+
+    def __len__(self) -> int:
+        return len(self.copies)
+
+    def book(self, row_id: int) -> Book:
+        """The book stored at ``row_id``."""
+        return {
+            "title": self.titles[
+                self.title_offsets[row_id] : self.title_offsets[row_id + 1]
+            ],
+            "author": self.authors[
+                self.author_offsets[row_id] : self.author_offsets[row_id + 1]
+            ],
+            "copies": self.copies[row_id],
+        }
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Book]:
+        """Books whose title or author contains ``query`` (case-insensitive), in store order."""
+        query = query.lower()
+        if _FIELD_SEPARATOR in query or _ROW_SEPARATOR in query:
+            return []
+        candidates = self._candidates(query)
+        if not query:
+            row_ids: Iterable[int] = range(len(self))
+        elif candidates is None:
+            row_ids = self._scan(query)
+        else:
+            row_ids = (
+                row_id for row_id in candidates if query in self._row_text(row_id)
+            )
+        results = []
+        for row_id in row_ids:
+            if limit is not None and len(results) >= limit:
+                break
+            results.append(self.book(row_id))
+        return results
+
+    def words_with_prefix(self, prefix: str) -> List[str]:
+        """Vocabulary words starting with ``prefix``."""
+        words = []
+        for index in range(bisect_left(self.vocabulary, prefix), len(self.vocabulary)):
+            word = self.vocabulary[index]
+            if not word.startswith(prefix):
+                break
+            words.append(word)
+        return words
+
+    def words_containing(self, fragment: str) -> List[str]:
+        """Vocabulary words containing ``fragment``."""
+        if len(fragment) >= 3:
+            # Only words sharing the rarest trigram of the fragment can contain it
+            trigrams = [fragment[i : i + 3] for i in range(len(fragment) - 2)]
+            word_ids = min(
+                (self._word_trigrams.get(trigram, ()) for trigram in trigrams), key=len
+            )
+            return [
+                self.vocabulary[word_id]
+                for word_id in word_ids
+                if fragment in self.vocabulary[word_id]
+            ]
+        blob = self._vocabulary_blob
+        words = []
+        position = blob.find(fragment)
+        while position != -1:
+            start = blob.rfind("\n", 0, position) + 1
+            end = blob.find("\n", position)
+            words.append(blob[start:end])
+            position = blob.find(fragment, end)
+        return words
+
+    def _candidates(self, query: str) -> Optional[List[int]]:
+        """Sorted row ids that may contain ``query``, None when the index cannot tell."""
+        # Each token of the query constrains the words of a matching row:
+        # a token touching neither end of the query is a whole word, one only
+        # touching the end a word prefix, one only touching the start a word
+        # suffix, and one spanning the whole query a word fragment. Cheap
+        # constraints are tried first and the search stops once one is selective.
+        constraints = []
+        for match in _TOKEN_PATTERN.finditer(query):
+            token = match.group()
+            at_start = match.start() == 0
+            at_end = match.end() == len(query)
+            if not at_start and not at_end:
+                constraints.append((0, token, "word"))
+            elif not at_start:
+                constraints.append((1, token, "prefix"))
+            elif len(token) >= 3:
+                # Shorter fragments match most of the vocabulary
+                constraints.append((2, token, "fragment" if at_end else "suffix"))
+
+        best: Optional[List[str]] = None
+        best_rows = len(self) // 4
+        for _, token, kind in sorted(constraints):
+            if kind == "word":
+                words = [token] if token in self.postings else []
+            elif kind == "prefix":
+                words = self.words_with_prefix(token)
+            else:
+                words = self.words_containing(token)
+                if kind == "suffix":
+                    words = [word for word in words if word.endswith(token)]
+            rows = sum(len(self.postings[word]) for word in words)
+            if rows <= best_rows:
+                best, best_rows = words, rows
+            if best_rows <= _SELECTIVE_ROWS:
+                break
+
+        if best is None:
+            # Not selective: scanning the blob is cheaper than merging postings
+            return None
+        if len(best) == 1:
+            return list(self.postings[best[0]])
+        row_ids = set()
+        for word in best:
+            row_ids.update(self.postings[word])
+        return sorted(row_ids)
+
+    def _scan(self, query: str) -> Iterator[int]:
+        """Row ids whose lowercase text contains ``query``, by scanning the blob."""
+        position = self.text.find(query)
+        while position != -1:
+            row_id = bisect_left(self.text_offsets, position + 1) - 1
+            yield row_id
+            position = self.text.find(query, self.text_offsets[row_id + 1])
+
+    def _row_text(self, row_id: int) -> str:
+        return self.text[self.text_offsets[row_id] : self.text_offsets[row_id + 1]]
@@ -0,0 +1,209 @@
+"""Per-session conversation state of the Tool Use Workflow.
+
+``ConversationStore`` keeps one message list per session id, so many
+conversations can run in one process without sharing or leaking history:
+
+- after every append the session is trimmed to a token budget, dropping the
+  oldest turns first but always keeping the system messages, and never
+  separating an AI message requesting tools from its tool results; the token
+  count of every turn is kept, so trimming only counts the new messages
+- sessions idle for longer than ``idle_seconds`` can be spilled to JSON files
+  in ``spill_dir`` and are loaded back transparently on their next use
+"""
+
+import hashlib
+import json
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, List, Optional
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    SystemMessage,
+    ToolMessage,
+    messages_from_dict,
+    messages_to_dict,
+)
+
+
+def estimate_message_tokens(message: BaseMessage) -> int:
+    """Rough token count of a message (about 4 characters per token)."""
+    size = len(str(message.content))
+    if isinstance(message, AIMessage) and message.tool_calls:
+        size += len(json.dumps(message.tool_calls, default=str))
+    return size // 4 + 4
+
+
+def group_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Split messages into units that must be kept or dropped together.
+
+    An AI message requesting tools forms one unit with the tool results that
+    follow it; every other message is a unit of its own.
+    """
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, ToolMessage) and turns:
+            turns[-1].append(message)
+        else:
+            turns.append([message])
+    return turns
+
+
+def trim_to_budget(
+    messages: List[BaseMessage],
+    token_budget: int,
+    token_counter: Callable[[BaseMessage], int] = estimate_message_tokens,
+) -> List[BaseMessage]:
+    """Drop the oldest turns until the messages fit ``token_budget``.
+
+    System messages and the latest turn are always kept.
+    """
+    session = _Session()
+    for message in messages:
+        session.add(message, token_counter(message))
+    session.trim(token_budget)
+    return session.messages()
+
+
+class _Session:
+    """Messages of one session, grouped in turns with their token counts."""
+
+    def __init__(self):
+        self.system: List[BaseMessage] = []
+        self.turns: Deque[List[BaseMessage]] = deque()
+        self.turn_tokens: Deque[int] = deque()
+        self.tokens = 0
+        self.size = 0
+
+    def add(self, message: BaseMessage, tokens: int) -> None:
+        if isinstance(message, SystemMessage):
+            self.system.append(message)
+        elif isinstance(message, ToolMessage) and self.turns:
+            self.turns[-1].append(message)
+            self.turn_tokens[-1] += tokens
+        else:
+            self.turns.append([message])
+            self.turn_tokens.append(tokens)
+        self.tokens += tokens
+        self.size += 1
+
+    def trim(self, token_budget: int) -> int:
+        """Drop the oldest turns until the session fits, return the messages dropped."""
+        dropped = 0
+        while self.tokens > token_budget and len(self.turns) > 1:
+            turn = self.turns.popleft()
+            self.tokens -= self.turn_tokens.popleft()
+            dropped += len(turn)
+        self.size -= dropped
+        return dropped
+
+    def messages(self) -> List[BaseMessage]:
+        return self.system + [message for turn in self.turns for message in turn]
+
+
+class ConversationStore:
+    """Token-bounded message history per session, with optional spill to disk."""
+
+    def __init__(
+        self,
+        token_budget: int = 4000,
+        spill_dir: Optional[str | Path] = None,
+        idle_seconds: float = 300.0,
+        token_counter: Callable[[BaseMessage], int] = estimate_message_tokens,
+    ):
+        """Initialize the store.
+
+        Args:
+            token_budget: Maximum estimated tokens kept per session
+            spill_dir: Directory idle sessions are written to, None to keep them in memory
+            idle_seconds: Idle time after which ``spill_idle`` writes a session to disk
+            token_counter: Function estimating the tokens of a message
+        """
+        self.token_budget = token_budget
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.idle_seconds = idle_seconds
+        self.token_counter = token_counter
+        self._sessions: Dict[str, _Session] = {}
+        self._last_used: Dict[str, float] = {}
+        self.trimmed_messages = 0
+        self.spilled_sessions = 0
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+    def messages(self, session_id: str) -> List[BaseMessage]:
+        """Messages of a session (empty for a new one)."""
+        return self._session(session_id).messages()
+
+    def append(self, session_id: str, *messages: BaseMessage) -> None:
+        """Add messages to a session and trim it to the token budget."""
+        session = self._session(session_id)
+        for message in messages:
+            session.add(message, self.token_counter(message))
+        self.trimmed_messages += session.trim(self.token_budget)
+
+    def close(self, session_id: str) -> None:
+        """Forget a session, in memory and on disk."""
+        self._sessions.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        path = self._spill_path(session_id)
+        if path and path.exists():
+            path.unlink()
+
+    def spill_idle(self) -> int:
+        """Write the sessions idle for ``idle_seconds`` to disk and drop them from memory."""
+        if not self.spill_dir:
+            return 0
+        deadline = time.monotonic() - self.idle_seconds
+        idle = [
+            session_id
+            for session_id in self._sessions
+            if self._last_used.get(session_id, 0) <= deadline
+        ]
+        for session_id in idle:
+            self._spill_path(session_id).write_text(
+                json.dumps(messages_to_dict(self._sessions.pop(session_id).messages())),
+                encoding="utf-8",
+            )
+            self._last_used.pop(session_id, None)
+        self.spilled_sessions += len(idle)
+        return len(idle)
+
+    def session_ids(self) -> Iterable[str]:
+        """Ids of the sessions held in memory."""
+        return list(self._sessions)
+
+    def stats(self) -> Dict[str, int]:
+        """Sessions in memory and on disk, and messages trimmed so far."""
+        on_disk = len(list(self.spill_dir.glob("*.json"))) if self.spill_dir else 0
+        return {
+            "sessions_in_memory": len(self._sessions),
+            "sessions_on_disk": on_disk,
+            "messages_in_memory": sum(s.size for s in self._sessions.values()),
+            "trimmed_messages": self.trimmed_messages,
+            "spilled_sessions": self.spilled_sessions,
+        }
+
+    def _session(self, session_id: str) -> _Session:
+        self._last_used[session_id] = time.monotonic()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session()
+            for message in self._load(session_id):
+                session.add(message, self.token_counter(message))
+        return session
+
+    def _spill_path(self, session_id: str) -> Optional[Path]:
+        if not self.spill_dir:
+            return None
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:32]
+        return self.spill_dir / f"{digest}.json"
+
+    def _load(self, session_id: str) -> List[BaseMessage]:
+        path = self._spill_path(session_id)
+        if not path or not path.exists():
+            return []
+        messages = messages_from_dict(json.loads(path.read_text(encoding="utf-8")))
+        path.unlink()
+        return messages
@@ -4,94 +4,148 @@ Tool Use Workflow
 This workflow demonstrates the Tool Use agentic design pattern using langchain.
 """
 
-import json
-from langchain_openai import ChatOpenAI
+import asyncio
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import (
+    AIMessage,
     SystemMessage,
     HumanMessage,
     ToolMessage,
-    BaseMessage,
 )
 from dotenv import load_dotenv
 from tools import search_database
+from conversation_store import ConversationStore
+from tool_registry import ToolRegistry
+from tool_results import ResultShaper, ToolResultCache
+from shared.llm_factory import chat_model
 
 load_dotenv()
 
+SYSTEM_PROMPT = "You are an assistant that can search a database of books."
+DEFAULT_QUESTION = "How many copies of the book 'The Great Gatsby' are in the database?"
+
+
+def default_registry() -> ToolRegistry:
+    """Registry with a memoized ``search_database`` returning compact results."""
+    registry = ToolRegistry(
+        cache=ToolResultCache(max_entries=1024, ttl_seconds=300),
+        shaper=ResultShaper(
+            max_items=20,
+            token_budget=500,
+            fields={"search_database": ("title", "author", "copies")},
+        ),
+    )
+    registry.register(search_database, memoize=True)
+    return registry
+
 
 class ToolUseWorkflow:
     """Tool Use Workflow"""
 
-    _conversation_messages: list[BaseMessage] = []
     _llm: BaseChatModel
     publicProperty = "public property"
 
-    def __init__(self):
-        """Initialize the workflow with LLM configuration."""
+    def __init__(
+        self,
+        max_rounds: int = 5,
+        registry: ToolRegistry | None = None,
+        store: ConversationStore | None = None,
+        llm: BaseChatModel | None = None,
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.7,
+    ):
+        """Initialize the workflow with LLM configuration.
+
+        Args:
+            max_rounds: Maximum number of model turns requesting tools per question
+            registry: Tools the model can call (default: ``search_database``,
+                memoized, see ``default_registry``)
+            store: Per-session conversation history (default: in memory,
+                trimmed to 4000 tokens per session)
+            llm: Model used instead of ``gpt-4o-mini``, e.g. a
+                ``shared.fake_llm.FakeChatModel`` answering with tool calls;
+                it must support ``bind_tools``
+            model: OpenAI model name, when ``llm`` is not given
+            temperature: Sampling temperature, when ``llm`` is not given
+        """
 
         try:
-            self._llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
-            self._llm = self._llm.bind_tools([search_database])
+            self.max_rounds = max_rounds
+            self.registry = registry or default_registry()
+            self.store = store or ConversationStore()
+            # Without tools bound, for the final answer of a capped loop
+            self._answer_llm = llm or chat_model(model=model, temperature=temperature)
+            self._llm = self._answer_llm.bind_tools(self.registry.tools)
 
         except Exception as e:
             print(f"Error initializing LLM: {e}")
             exit(1)
 
-    def run(self):
+    def run(self, question: str = DEFAULT_QUESTION, session_id: str = "default") -> str:
         """Run the workflow."""
 
         print("--- Running Tool Use Workflow ---\n")
 
-        result = self._start_conversation()
-
-        self._handle_tools_calls(result.tool_calls)
-
-        final_response_message = self._llm.invoke(self._conversation_messages)
-
-        final_response = final_response_message.content
+        final_response = asyncio.run(self.arun(question, session_id))
 
         print(f"{'-' * 10} Workflow completed {'-' * 10}")
         print(f"Result: {final_response}")
-
-    def _start_conversation(self):
-        """Start the conversation."""
-
-        self._conversation_messages.append(
-            SystemMessage(
-                content="You are an assistant that can search a database of books."
-            )
-        )
-        self._conversation_messages.append(
-            HumanMessage(
-                content="How many copies of the book 'The Great Gatsby' are in the database?"
+        print(f"📊 Tools: {self.registry.report()}")
+        return final_response
+
+    async def arun(
+        self, question: str = DEFAULT_QUESTION, session_id: str = "default"
+    ) -> str:
+        """Answer a question, calling tools for as many rounds as the model needs.
+
+        The question continues the conversation of ``session_id``; different
+        sessions can be answered concurrently, one question at a time per
+        session. Each model turn requesting tools has all its tool calls run
+        concurrently; the loop ends when the model answers without requesting
+        tools, or after ``max_rounds`` tool rounds: the tool calls still pending
+        are then answered with errors and the model answers without tools, so
+        the session never ends on unanswered tool calls.
+        """
+
+        result = await self._start_conversation(question, session_id)
+
+        for round_number in range(1, self.max_rounds + 1):
+            if not result.tool_calls:
+                return result.content
+            print(f"🔧 Round {round_number}: {len(result.tool_calls)} tool call(s)")
+            tool_messages = await self.registry.arun_many(result.tool_calls)
+            self.store.append(session_id, *tool_messages)
+            result = await self._llm.ainvoke(self.store.messages(session_id))
+            self.store.append(session_id, result)
+
+        if result.tool_calls:
+            print(f"⚠️ Stopped after {self.max_rounds} tool rounds")
+            self.store.append(
+                session_id,
+                *(
+                    ToolMessage(
+                        content=f"Error: tool round limit ({self.max_rounds}) reached, "
+                        "answer with the results gathered so far",
+                        tool_call_id=call["id"],
+                        status="error",
+                    )
+                    for call in result.tool_calls
+                ),
             )
-        )
-        result = self._llm.invoke(self._conversation_messages)
-        self._conversation_messages.append(result)
+            result = await self._answer_llm.ainvoke(self.store.messages(session_id))
+            self.store.append(session_id, result)
+        return result.content
+
+    async def _start_conversation(self, question: str, session_id: str) -> AIMessage:
+        """Start the conversation, or continue the one of the session."""
+
+        if not self.store.messages(session_id):
+            self.store.append(session_id, SystemMessage(content=SYSTEM_PROMPT))
+        self.store.append(session_id, HumanMessage(content=question))
+        result = await self._llm.ainvoke(self.store.messages(session_id))
+        self.store.append(session_id, result)
         return result
 
-    def _handle_tools_calls(self, tool_calls: list[dict]):
-        """Handle tool calls."""
-
-        for tool_call in tool_calls:
-            self._handle_tool_call(tool_call)
-
-    def _handle_tool_call(self, tool_call: dict):
-        """Handle a tool call."""
-
-        tool_name = tool_call["name"]
-        tool_args = tool_call["args"]
-        if tool_name == "search_database":
-            tool_result = search_database.invoke(tool_args)
-            self._conversation_messages.append(
-                ToolMessage(
-                    content=json.dumps(tool_result), tool_call_id=tool_call["id"]
-                )
-            )
-            print(f"Tool result: {tool_result}")
-        else:
-            print(f"Unknown tool: {tool_name}")
-
 
 if __name__ == "__main__":
     workflow = ToolUseWorkflow()
@@ -0,0 +1,9 @@
+"""Put the project and the repository root on ``sys.path``, as running from the project does."""
+
+import sys
+from pathlib import Path
+
+PROJECT = Path(__file__).resolve().parent.parent
+for path in (PROJECT.parent.parent, PROJECT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
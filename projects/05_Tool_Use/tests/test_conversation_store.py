@@ -0,0 +1,59 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from conversation_store import ConversationStore, trim_to_budget
+
+
+def count_one(message):
+    return 1
+
+
+def tool_turn(number):
+    call = {"name": "search_books", "args": {"query": str(number)}, "id": str(number)}
+    return [
+        AIMessage(content="", tool_calls=[call]),
+        ToolMessage(content="[]", tool_call_id=str(number)),
+    ]
+
+
+def test_append_trims_oldest_turns_and_keeps_system_messages():
+    store = ConversationStore(token_budget=4, token_counter=count_one)
+    store.append("s", SystemMessage(content="system"))
+    for number in range(5):
+        store.append("s", HumanMessage(content=f"question {number}"))
+    messages = store.messages("s")
+    assert [m.content for m in messages] == [
+        "system",
+        "question 2",
+        "question 3",
+        "question 4",
+    ]
+    assert store.stats()["trimmed_messages"] == 2
+    assert store.stats()["messages_in_memory"] == 4
+
+
+def test_tool_results_are_dropped_with_their_request():
+    store = ConversationStore(token_budget=3, token_counter=count_one)
+    store.append("s", HumanMessage(content="question"), *tool_turn(1))
+    store.append("s", *tool_turn(2))
+    messages = store.messages("s")
+    assert [type(m) for m in messages] == [AIMessage, ToolMessage]
+    assert messages[0].tool_calls[0]["id"] == "2"
+
+
+def test_incremental_trim_matches_trimming_the_whole_history():
+    history = [SystemMessage(content="system")]
+    store = ConversationStore(token_budget=60)
+    store.append("s", history[0])
+    for number in range(20):
+        turn = [HumanMessage(content="question " * number), *tool_turn(number)]
+        history.extend(turn)
+        store.append("s", *turn)
+    assert store.messages("s") == trim_to_budget(history, 60)
+
+
+def test_spilled_session_is_loaded_back(tmp_path):
+    store = ConversationStore(spill_dir=tmp_path, idle_seconds=0)
+    store.append("s", SystemMessage(content="system"), HumanMessage(content="hi"))
+    assert store.spill_idle() == 1
+    assert store.stats()["sessions_in_memory"] == 0
+    assert [m.content for m in store.messages("s")] == ["system", "hi"]
@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+from tool_results import ResultShaper, ToolResultCache
+
+BOOKS = [
+    {"title": "The Great Gatsby", "author": "F. Scott Fitzgerald", "copies": 3},
+    {"title": "Emma", "author": "Jane Austen", "copies": 1},
+]
+
+
+def test_small_list_is_never_bigger_than_json():
+    shaper = ResultShaper()
+    content = shaper.shape("search_books", BOOKS)
+    assert json.loads(content) == BOOKS
+    report = shaper.report()
+    assert report["bytes_saved"] >= 0
+    assert report["tokens_saved"] >= 0
+
+
+def test_long_list_is_encoded_as_rows_within_budget():
+    books = [{"title": f"Book {i}", "author": "A", "copies": i} for i in range(30)]
+    shaper = ResultShaper(max_items=20, token_budget=100)
+    content = json.loads(shaper.shape("search_books", books))
+    assert content["total"] == 30
+    assert content["columns"] == ["title", "author", "copies"]
+    assert 1 <= len(content["rows"]) < 20
+    assert shaper.report()["bytes_saved"] > 0
+
+
+def test_waiters_run_the_tool_when_the_first_call_is_cancelled():
+    cache = ToolResultCache()
+    runs = []
+
+    async def lookup():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        first = asyncio.create_task(cache.get_or_run("key", lookup))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(cache.get_or_run("key", lookup)) for _ in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(run()) == ["result"] * 3
+    # One waiter took the call over, the others waited on it
+    assert len(runs) == 2
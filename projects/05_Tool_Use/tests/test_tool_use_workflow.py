@@ -0,0 +1,45 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+from shared.cli import load_workflow
+from shared.fake_llm import FakeChatModel, ScriptedReply
+
+
+def tool_call(messages) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "search_database",
+                "args": {"query": "Gatsby"},
+                "id": f"call_{len(messages)}",
+            }
+        ],
+    )
+
+
+def test_capped_loop_answers_pending_tool_calls():
+    module = load_workflow("tool-use")
+    llm = FakeChatModel(
+        reply=ScriptedReply(
+            [("tool round limit", "There are 3 copies.")], default=tool_call
+        )
+    )
+    workflow = module.ToolUseWorkflow(max_rounds=2, llm=llm)
+    try:
+        answer = asyncio.run(workflow.arun("How many Gatsby?", "alice"))
+    finally:
+        workflow.registry.shutdown()
+
+    assert answer == "There are 3 copies."
+    messages = workflow.store.messages("alice")
+    assert not messages[-1].tool_calls
+    answered = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+    requested = {
+        call["id"]
+        for m in messages
+        if isinstance(m, AIMessage)
+        for call in m.tool_calls
+    }
+    assert requested <= answered
@@ -0,0 +1,122 @@
+"""Tool registry of the Tool Use Workflow.
+
+Maps tool names to LangChain tools and runs the tool calls of a model turn
+concurrently: async tools on the event loop, sync tools (like
+``search_database``) in a bounded thread pool so they do not block it.
+Results of memoized tools are served from a ``ToolResultCache`` and every
+result is serialized by a ``ResultShaper`` (see ``tool_results.py``).
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool
+
+from tool_results import ResultShaper, ToolResultCache, cache_key
+
+
+class ToolRegistry:
+    """Registry dispatching tool calls by name."""
+
+    def __init__(
+        self,
+        tools: Iterable[BaseTool] = (),
+        max_workers: int = 8,
+        cache: Optional[ToolResultCache] = None,
+        shaper: Optional[ResultShaper] = None,
+    ):
+        """Initialize the registry.
+
+        Args:
+            tools: Tools to register
+            max_workers: Threads available to run sync tools concurrently
+            cache: Memo of the results of tools registered with ``memoize=True``
+            shaper: Serializer of tool results (default: ``ResultShaper()``)
+        """
+        self._tools: Dict[str, BaseTool] = {}
+        self._memoized: set = set()
+        self.cache = cache or ToolResultCache()
+        self.shaper = shaper or ResultShaper()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tool"
+        )
+        for tool in tools:
+            self.register(tool)
+
+    def register(self, tool: BaseTool, memoize: bool = False) -> None:
+        """Register a tool under its name.
+
+        Only memoize tools whose result depends on their normalized arguments
+        alone: strings are compared trimmed and case-folded.
+        """
+        self._tools[tool.name] = tool
+        if memoize:
+            self._memoized.add(tool.name)
+        else:
+            self._memoized.discard(tool.name)
+
+    @property
+    def tools(self) -> List[BaseTool]:
+        """Registered tools, e.g. for ``bind_tools``."""
+        return list(self._tools.values())
+
+    def get(self, name: str) -> Optional[BaseTool]:
+        """The tool registered under ``name``, if any."""
+        return self._tools.get(name)
+
+    async def arun(self, tool_call: Dict[str, Any]) -> ToolMessage:
+        """Run one tool call and return its result as a ``ToolMessage``.
+
+        Unknown tools and tool errors are returned as error messages, so the
+        model can react to them instead of the loop failing.
+        """
+        tool = self.get(tool_call["name"])
+        if tool is None:
+            print(f"Unknown tool: {tool_call['name']}")
+            return ToolMessage(
+                content=f"Unknown tool: {tool_call['name']}",
+                tool_call_id=tool_call["id"],
+                status="error",
+            )
+        try:
+            if tool.name in self._memoized:
+                result = await self.cache.get_or_run(
+                    cache_key(tool.name, tool_call["args"]),
+                    lambda: self._call(tool, tool_call["args"]),
+                )
+            else:
+                result = await self._call(tool, tool_call["args"])
+        except Exception as e:
+            print(f"Tool {tool.name} failed: {e}")
+            return ToolMessage(
+                content=f"Error: {e}", tool_call_id=tool_call["id"], status="error"
+            )
+        print(f"Tool result: {result}")
+        return ToolMessage(
+            content=self.shaper.shape(tool.name, result), tool_call_id=tool_call["id"]
+        )
+
+    async def arun_many(self, tool_calls: List[Dict[str, Any]]) -> List[ToolMessage]:
+        """Run the tool calls of one model turn concurrently, keeping their order."""
+        return list(await asyncio.gather(*(self.arun(call) for call in tool_calls)))
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """Memoization counters and bytes/tokens saved by result shaping."""
+        return {"cache": self.cache.stats(), "results": self.shaper.report()}
+
+    def shutdown(self) -> None:
+        """Stop the thread pool of sync tools."""
+        self._executor.shutdown(wait=False)
+
+    async def _call(self, tool: BaseTool, args: Dict[str, Any]) -> Any:
+        if getattr(tool, "coroutine", None) is not None:
+            return await tool.ainvoke(args)
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the caller's context, so the tool run is traced
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, context.run, tool.invoke, args
+        )
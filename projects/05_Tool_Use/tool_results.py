@@ -0,0 +1,216 @@
+"""Memoization and compact serialization of tool results.
+
+- ``ToolResultCache`` memoizes tool results per tool, keyed on normalized
+  arguments (``"gatsby"`` and ``"Gatsby "`` share an entry), with a TTL and
+  LRU eviction once ``max_entries`` is reached. Identical calls running at the
+  same time share one execution.
+- ``ResultShaper`` turns a tool result into the ``ToolMessage`` content:
+  lists are capped, dicts projected to the useful fields, lists of dicts
+  encoded as columns and rows, and rows dropped until the content fits a
+  token budget. It counts the bytes and tokens saved against ``json.dumps``.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def normalize_value(value: Any) -> Any:
+    """Canonical form of an argument: trimmed, case-folded, single-spaced strings."""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {key: normalize_value(value[key]) for key in sorted(value)}
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(item) for item in value]
+    return value
+
+
+def cache_key(tool_name: str, args: Dict[str, Any]) -> str:
+    """Cache key of a tool call."""
+    return json.dumps([tool_name, normalize_value(args)], sort_keys=True, default=str)
+
+
+class ToolResultCache:
+    """TTL and size bounded memo of tool results."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 300.0):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Entries kept before the least recently used is evicted
+            ttl_seconds: Seconds an entry stays valid, None for no expiry
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_or_run(self, key: str, run: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the memoized result of ``key``, running ``run`` on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            del self._entries[key]
+
+        in_flight = self._in_flight.get(key)
+        while in_flight is not None:
+            try:
+                result = await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                # The call waited on was cancelled, not this one: run the tool
+                # here (or wait on whichever call took over meanwhile)
+                if not in_flight.cancelled():
+                    raise
+                in_flight = self._in_flight.get(key)
+                continue
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await run()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # Errors are not memoized: calls waiting on this one see it, later
+            # calls run the tool again
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+        future.set_result(result)
+        self._store(key, result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss and eviction counters."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _store(self, key: str, result: Any) -> None:
+        expires_at = (
+            time.monotonic() + self.ttl_seconds
+            if self.ttl_seconds is not None
+            else float("inf")
+        )
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+class ResultShaper:
+    """Compact, budgeted serialization of tool results."""
+
+    def __init__(
+        self,
+        max_items: int = 20,
+        token_budget: int = 500,
+        fields: Optional[Dict[str, Sequence[str]]] = None,
+    ):
+        """Initialize the shaper.
+
+        Args:
+            max_items: Maximum list items sent to the model
+            token_budget: Maximum estimated tokens of one tool result
+            fields: Per tool name, the dict keys kept in its results
+        """
+        self.max_items = max_items
+        self.token_budget = token_budget
+        self.fields = fields or {}
+        self.results = 0
+        self.raw_bytes = 0
+        self.shaped_bytes = 0
+        self.raw_tokens = 0
+        self.shaped_tokens = 0
+
+    def shape(self, tool_name: str, result: Any) -> str:
+        """Content of the ``ToolMessage`` carrying ``result``."""
+        raw = json.dumps(result, default=str)
+        if isinstance(result, list):
+            content = self._shape_list(tool_name, result)
+        elif isinstance(result, dict):
+            content = self._encode(self._project(tool_name, result))
+        elif isinstance(result, str):
+            content = result
+        else:
+            content = self._encode(result)
+
+        self.results += 1
+        self.raw_bytes += len(raw.encode("utf-8"))
+        self.shaped_bytes += len(content.encode("utf-8"))
+        self.raw_tokens += estimate_tokens(raw)
+        self.shaped_tokens += estimate_tokens(content)
+        return content
+
+    def report(self) -> Dict[str, int]:
+        """Bytes and estimated tokens saved against ``json.dumps`` of the full results."""
+        return {
+            "results": self.results,
+            "raw_bytes": self.raw_bytes,
+            "shaped_bytes": self.shaped_bytes,
+            "bytes_saved": self.raw_bytes - self.shaped_bytes,
+            "tokens_saved": self.raw_tokens - self.shaped_tokens,
+        }
+
+    def _shape_list(self, tool_name: str, items: List[Any]) -> str:
+        kept = items[: self.max_items]
+        is_table = bool(kept) and all(isinstance(item, dict) for item in kept)
+        if is_table:
+            kept = [self._project(tool_name, item) for item in kept]
+            columns = list(dict.fromkeys(key for item in kept for key in item))
+            rows = [[item.get(column) for column in columns] for item in kept]
+
+        def encode(count: int) -> str:
+            if count == len(items):
+                content = self._encode(kept)
+            else:
+                content = self._encode({"total": len(items), "items": kept[:count]})
+            if is_table:
+                # Columns and rows only pay off with enough rows
+                table = self._encode(
+                    {"total": len(items), "columns": columns, "rows": rows[:count]}
+                )
+                content = min(content, table, key=len)
+            return content
+
+        count = len(kept)
+        content = encode(count)
+        while count > 1 and estimate_tokens(content) > self.token_budget:
+            count = max(1, count * 3 // 4)
+            content = encode(count)
+        return content
+
+    def _project(self, tool_name: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        fields = self.fields.get(tool_name)
+        if not fields:
+            return item
+        return {key: item[key] for key in fields if key in item}
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
@@ -1,15 +1,37 @@
 """Tools for the Tool Use Workflow."""
 
-from typing import cast
+import os
+from functools import lru_cache
+
 from langchain_core.tools import tool as langchain_tool
 
+from book_store import BookStore
+
+SAMPLE_BOOKS = [
+    ("The Great Gatsby", "F. Scott Fitzgerald", 10),
+    ("1984", "George Orwell", 5),
+    ("To Kill a Mockingbird", "Harper Lee", 3),
+]
+
+
+@lru_cache(maxsize=1)
+def get_book_store() -> BookStore:
+    """Book store loaded once per process.
+
+    Loaded from the CSV/JSONL file named by ``BOOK_STORE_PATH`` when it is set,
+    from a few sample books otherwise.
+    """
+    path = os.getenv("BOOK_STORE_PATH")
+    return BookStore.from_file(path) if path else BookStore(SAMPLE_BOOKS)
+
 
 @langchain_tool
-def search_database(query: str) -> list[dict[str, str | int]]:
-    """Fake tool that would search a database of books using the query
+def search_database(query: str, limit: int = 50) -> list[dict[str, str | int]]:
+    """Search a database of books using the query
 
     Args:
         query: The query to search the database for
+        limit: The maximum number of books to return
     Returns:
         A list of dictionaries with the title and author of the books.
         Properties:
@@ -18,20 +40,4 @@ def search_database(query: str) -> list[dict[str, str | int]]:
             copies: The number of copies of the book in the database
     """
     print(f"{'-' * 10} Tool called - Searching database for: {query} {'-' * 10}")
-    fake_results: list[dict[str, str | int]] = [
-        {"title": "The Great Gatsby", "author": "F. Scott Fitzgerald", "copies": 10},
-        {"title": "1984", "author": "George Orwell", "copies": 5},
-        {"title": "To Kill a Mockingbird", "author": "Harper Lee", "copies": 3},
-    ]
-
-    def matches_query(book: dict[str, str | int]) -> bool:
-        title = cast(str, book.get("title", ""))
-        author = cast(str, book.get("author", ""))
-        query_lower = query.lower()
-        return query_lower in title.lower() or query_lower in author.lower()
-
-    filtered_results: list[dict[str, str | int]] = [
-        cast(dict[str, str | int], book) for book in fake_results if matches_query(book)
-    ]
-
-    return filtered_results
+    return get_book_store().search(query, limit=limit)
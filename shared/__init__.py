@@ -0,0 +1,5 @@
+"""Shared building blocks used by several workflow projects.
+
+The projects import this package as ``shared``; the repository root must be on
+``PYTHONPATH`` (the development container sets ``PYTHONPATH=/workspace``).
+"""
@@ -0,0 +1,45 @@
+"""Registry of compiled prompt templates and chains.
+
+``ChatPromptTemplate.from_template`` parses its template string and
+``prompt | llm | parser`` allocates a new ``RunnableSequence``. Doing this on
+every call is pure per-request overhead, so templates are compiled once per
+process and chains are built once per workflow instance.
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, Tuple
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+
+
+@lru_cache(maxsize=None)
+def compile_template(template: str) -> ChatPromptTemplate:
+    """Compile a single-message prompt template once per process."""
+    return ChatPromptTemplate.from_template(template)
+
+
+@lru_cache(maxsize=None)
+def compile_messages(messages: Tuple[Tuple[str, str], ...]) -> ChatPromptTemplate:
+    """Compile a (role, template) message list once per process."""
+    return ChatPromptTemplate.from_messages(list(messages))
+
+
+class ChainRegistry:
+    """Per-instance registry of built chains, keyed by name."""
+
+    def __init__(self):
+        self._chains: Dict[str, Runnable] = {}
+
+    def get(self, name: str, factory: Callable[[], Runnable]) -> Runnable:
+        """Return the chain registered under ``name``, building it on first use."""
+        chain = self._chains.get(name)
+        if chain is None:
+            chain = self._chains[name] = factory()
+        return chain
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._chains
+
+    def __len__(self) -> int:
+        return len(self._chains)
@@ -0,0 +1,298 @@
+"""Command line running any of the five workflows.
+
+Only ``click`` is imported at start-up. A subcommand imports its project
+(``projects/<project>/main.py``, and with it LangChain and the OpenAI client)
+when it runs, so ``--help`` and the other subcommands do not pay for it.
+
+``--import-profile`` runs the command again under ``python -X importtime`` and
+prints where the start-up time went, per top-level package and per import.
+``--trace FILE`` records the spans of the run (see ``shared.tracing``), read
+with ``python -m shared.tracing FILE``.
+
+Usage (from the repository root):
+    python -m shared.cli --help
+    python -m shared.cli routing "What's the weather in Paris?"
+    python -m shared.cli tool-use "Who wrote 1984?" --session-id alice
+    python -m shared.cli --import-profile parallelization --fused "Great release!"
+    python -m shared.cli --trace trace.jsonl reflection --max-iterations 2
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import click
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORKFLOW_PROJECTS = {
+    "prompt-chaining": "01_Prompt_Chaining",
+    "routing": "02_Routing",
+    "parallelization": "03_parallelization",
+    "reflection": "04_Reflection",
+    "tool-use": "05_Tool_Use",
+}
+
+
+def load_workflow(name: str) -> ModuleType:
+    """Import the ``main.py`` of a workflow (a key of ``WORKFLOW_PROJECTS``).
+
+    Its directory is put on ``sys.path`` for its helper modules, and it is
+    imported under a name of its own, so several workflows can be loaded in one
+    process.
+    """
+    directory = ROOT / "projects" / WORKFLOW_PROJECTS[name]
+    if str(directory) not in sys.path:
+        sys.path.insert(0, str(directory))
+    module_name = f"{WORKFLOW_PROJECTS[name].lower()}_main"
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            module_name, directory / "main.py"
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[module_name]
+
+
+def parse_importtime(lines: Sequence[str]) -> List[Tuple[str, int, int, int]]:
+    """Parse ``-X importtime`` lines into (module, depth, self µs, cumulative µs)."""
+    imports = []
+    for line in lines:
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def print_import_profile(
+    imports: List[Tuple[str, int, int, int]], wall: float, top: int
+) -> None:
+    """Print the import time per top-level package and the slowest imports."""
+    total_us = sum(self_us for _, _, self_us, _ in imports)
+    per_package: Dict[str, int] = defaultdict(int)
+    for name, _, self_us, _ in imports:
+        per_package[name.split(".")[0]] += self_us
+
+    click.echo(
+        f"\n⏱️ Import profile: {len(imports)} modules, {total_us / 1000:.0f} ms "
+        f"of imports, {wall * 1000:.0f} ms total",
+        err=True,
+    )
+    click.echo(f"{'package':<32}{'ms':>8}{'share':>8}", err=True)
+    for package, self_us in sorted(per_package.items(), key=lambda item: -item[1])[
+        :top
+    ]:
+        click.echo(
+            f"{package:<32}{self_us / 1000:>8.1f}{self_us / max(total_us, 1):>8.0%}",
+            err=True,
+        )
+    click.echo(f"\n{'slowest imports (cumulative)':<32}{'ms':>8}", err=True)
+    top_level = [entry for entry in imports if entry[1] == 0]
+    for name, _, _, cumulative_us in sorted(top_level, key=lambda entry: -entry[3])[
+        :top
+    ]:
+        click.echo(f"{name:<32}{cumulative_us / 1000:>8.1f}", err=True)
+
+
+def profile_imports(args: List[str], top: int = 15) -> int:
+    """Run the CLI with ``args`` under ``-X importtime`` and print the profile."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(ROOT), env.get("PYTHONPATH")])
+    )
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "shared.cli", *args],
+        env=env,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    lines = process.stderr.splitlines()
+    for line in lines:
+        if not line.startswith("import time:"):
+            click.echo(line, err=True)
+    print_import_profile(parse_importtime(lines), wall, top)
+    return process.returncode
+
+
+@click.group(context_settings={"help_option_names": ["-h", "--help"]})
+@click.option(
+    "--import-profile",
+    is_flag=True,
+    help="Report the import time of the command (runs it under python -X importtime).",
+)
+@click.option(
+    "--top", default=15, show_default=True, help="Entries listed by --import-profile."
+)
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False),
+    envvar="LLM_TRACE_FILE",
+    help="Append the spans of the LLM and tool calls to this JSONL file.",
+)
+@click.pass_context
+def cli(ctx: click.Context, import_profile: bool, top: int, trace: Optional[str]):
+    """Run one of the agentic design pattern workflows."""
+    if trace:
+        # Imported here: it loads LangChain, which --help does not need
+        from shared.tracing import tracing
+
+        recorder = ctx.with_resource(tracing(trace))
+        ctx.call_on_close(
+            lambda: click.echo(
+                f"\n📊 {recorder.exported} spans written to {trace}, "
+                f"report: python -m shared.tracing {trace}",
+                err=True,
+            )
+        )
+
+
+@cli.command("prompt-chaining")
+@click.option("--interest", help="Field of interest (prompted for if missing).")
+@click.option("--auto-select", is_flag=True, help="Pick the first topic idea.")
+@click.option("--stream", is_flag=True, help="Print the article as it is written.")
+@click.option("--concurrent", is_flag=True, help="Draft the sections concurrently.")
+@click.option("--max-concurrency", default=4, show_default=True)
+def prompt_chaining(
+    interest: Optional[str],
+    auto_select: bool,
+    stream: bool,
+    concurrent: bool,
+    max_concurrency: int,
+):
+    """Write an article: topics, outline, sections, review."""
+    interest = interest or click.prompt(
+        "Enter your field of interest", default="artificial intelligence"
+    )
+    workflow = load_workflow("prompt-chaining").PromptChainingWorkflow()
+    if stream:
+        workflow.run_streaming_workflow(interest, auto_select)
+        return
+    result = workflow.run_complete_workflow(
+        interest,
+        auto_select,
+        concurrent_sections=concurrent,
+        max_concurrency=max_concurrency,
+    )
+    click.echo("\n🎯 Final Article:")
+    click.echo("=" * 50)
+    click.echo(result["final_draft"])
+
+
+@cli.command()
+@click.argument("requests", nargs=-1)
+@click.option("--no-fast-path", is_flag=True, help="Route every request with the LLM.")
+@click.option(
+    "--decision-log",
+    envvar="ROUTING_DECISION_LOG",
+    help="JSONL log of the LLM router decisions.",
+)
+@click.option("--max-concurrency", default=16, show_default=True)
+def routing(
+    requests: Tuple[str, ...],
+    no_fast_path: bool,
+    decision_log: Optional[str],
+    max_concurrency: int,
+):
+    """Route requests to the weather, news or stock market handler."""
+    requests = requests or (click.prompt("Enter your request"),)
+    workflow = load_workflow("routing").RoutingWorkflow(
+        fast_path=not no_fast_path, decision_log_path=decision_log
+    )
+    if len(requests) == 1:
+        click.echo(workflow.run_coordinator_agent(requests[0]))
+    else:
+        for output in workflow.route_many(requests, max_concurrency):
+            click.echo(output)
+    click.echo(f"Routing paths: {workflow.routing_report()}")
+
+
+@cli.command()
+@click.argument("comment", required=False)
+@click.option("--fused", is_flag=True, help="Analyze with a single fused call.")
+@click.option("--max-in-flight-calls", default=16, show_default=True)
+def parallelization(comment: Optional[str], fused: bool, max_in_flight_calls: int):
+    """Analyze a comment with concurrent branches and synthesize the results."""
+    import asyncio
+
+    comment = comment or click.prompt("Comment")
+    workflow = load_workflow("parallelization").ParallelizationWorkflow(
+        max_in_flight_calls=max_in_flight_calls
+    )
+    result = asyncio.run(
+        workflow.analyze_comment(comment, "fused" if fused else "fanout")
+    )
+    click.echo("\n----- Result -----\n")
+    click.echo(result)
+    workflow.print_latency_report()
+
+
+@cli.command()
+@click.option("--max-iterations", default=3, show_default=True)
+@click.option(
+    "--compact-history", is_flag=True, help="Send only the latest draft and critique."
+)
+@click.option(
+    "--convergence-threshold",
+    type=float,
+    help="Stop when two drafts are this similar (e.g. 0.95).",
+)
+@click.option(
+    "--multi-critic", is_flag=True, help="Review with several critics concurrently."
+)
+def reflection(
+    max_iterations: int,
+    compact_history: bool,
+    convergence_threshold: Optional[float],
+    multi_critic: bool,
+):
+    """Generate, critique and refine a Renaissance questionnaire."""
+    module = load_workflow("reflection")
+    workflow = module.ReflectionWorkflow(
+        compact_history=compact_history,
+        convergence_threshold=convergence_threshold,
+        multi_critic=multi_critic,
+    )
+    workflow.run_reflection_loop(module.ReflectionTask(max_iterations=max_iterations))
+
+
+@cli.command("tool-use")
+@click.argument("question", required=False)
+@click.option("--session-id", default="default", show_default=True)
+@click.option("--max-rounds", default=5, show_default=True)
+def tool_use(question: Optional[str], session_id: str, max_rounds: int):
+    """Answer a question about the book database, calling tools as needed."""
+    module = load_workflow("tool-use")
+    workflow = module.ToolUseWorkflow(max_rounds=max_rounds)
+    try:
+        workflow.run(question or module.DEFAULT_QUESTION, session_id)
+    finally:
+        workflow.registry.shutdown()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Entry point; ``--import-profile`` is handled before click parses anything."""
+    args = list(sys.argv[1:] if argv is None else argv)
+    if "--import-profile" in args:
+        args.remove("--import-profile")
+        top = 15
+        if "--top" in args:
+            index = args.index("--top")
+            top = int(args[index + 1])
+            del args[index : index + 2]
+        sys.exit(profile_imports(args, top))
+    cli.main(args, prog_name="python -m shared.cli")
+
+
+if __name__ == "__main__":
+    main()
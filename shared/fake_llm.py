@@ -0,0 +1,177 @@
+"""Offline chat model with injectable replies and latency.
+
+``FakeChatModel`` can be passed to the workflows instead of ``ChatOpenAI`` to
+exercise them without network access: its latency can be fixed or computed per
+call (e.g. to emulate a slow tail), and it reports estimated token usage the
+same way the OpenAI integration does. Replies can be ``AIMessage`` objects
+carrying tool calls, and ``bind_tools`` is accepted (and ignored).
+
+``ScriptedReply`` picks the reply from the prompt with ordered rules, and
+``lognormal_latency`` and ``filler_text`` give realistic latency and reply
+length distributions, reproducible from a seed.
+
+Example:
+    slow_tail = lambda call: 2.0 if call % 10 == 0 else 0.1
+    llm = FakeChatModel(reply="positive", latency=slow_tail)
+
+    script = ScriptedReply([("JSON array", '["a", "b"]')], default="ok")
+    llm = FakeChatModel(reply=script, latency=lognormal_latency(0.2, sigma=0.5))
+"""
+
+import asyncio
+import math
+import random
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+Reply = Union[str, AIMessage]
+ReplyRule = Union[Reply, Callable[[List[BaseMessage]], Reply]]
+
+FILLER_WORDS = (
+    "the model returns a short draft about agents tools memory and planning "
+    "with examples of prompts chains routing reflection and evaluation"
+).split()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def lognormal_latency(
+    median: float, sigma: float = 0.5, seed: int = 0
+) -> Callable[[int], float]:
+    """Per-call latency with a log-normal distribution (a long slow tail).
+
+    Args:
+        median: Median latency in seconds
+        sigma: Spread of the distribution, 0 for a fixed latency
+        seed: Seed of the random generator, for reproducible runs
+    """
+    if median <= 0:
+        return lambda call: 0.0
+    rng = random.Random(seed)
+    mu = math.log(median)
+    return lambda call: rng.lognormvariate(mu, sigma)
+
+
+def filler_text(tokens: int) -> str:
+    """Text of about ``tokens`` tokens (as counted by ``estimate_tokens``)."""
+    words: List[str] = []
+    size = 0
+    while size < tokens * 4:
+        word = FILLER_WORDS[len(words) % len(FILLER_WORDS)]
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+class ScriptedReply:
+    """Reply function choosing the answer from the prompt with ordered rules.
+
+    Each rule is a ``(pattern, reply)`` pair: the pattern is a substring looked
+    up in the prompt text, or a predicate on the prompt messages, and the reply
+    a string, an ``AIMessage`` or a function of the messages returning one.
+    The first matching rule answers; ``default`` answers when none matches.
+    """
+
+    def __init__(
+        self,
+        rules: Sequence[
+            Tuple[Union[str, Callable[[List[BaseMessage]], bool]], ReplyRule]
+        ],
+        default: ReplyRule = "ok",
+    ):
+        self.rules = list(rules)
+        self.default = default
+
+    def __call__(self, messages: List[BaseMessage]) -> Reply:
+        text = "\n".join(str(message.content) for message in messages)
+        for pattern, reply in self.rules:
+            matched = pattern in text if isinstance(pattern, str) else pattern(messages)
+            if matched:
+                return reply(messages) if callable(reply) else reply
+        return self.default(messages) if callable(self.default) else self.default
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering with a canned reply after an injectable delay."""
+
+    # Not validated: pydantic would try to build an AIMessage from a callable
+    reply: Any = "ok"
+    """Reply text or ``AIMessage``, or a function computing it from the prompt messages."""
+
+    latency: Union[float, Callable[[int], float]] = 0.0
+    """Delay in seconds, or a function computing it from the call number (0-based)."""
+
+    calls: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "FakeChatModel":
+        """Accept tools like the OpenAI model; tool calls come from ``reply``."""
+        return self
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        delay = self._start_call()
+        try:
+            time.sleep(delay)
+            return self._result(messages)
+        finally:
+            self.in_flight -= 1
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        delay = self._start_call()
+        try:
+            await asyncio.sleep(delay)
+            return self._result(messages)
+        finally:
+            self.in_flight -= 1
+
+    def _start_call(self) -> float:
+        call = self.calls
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return self.latency(call) if callable(self.latency) else self.latency
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        reply = self.reply(messages) if callable(self.reply) else self.reply
+        if isinstance(reply, str):
+            reply = AIMessage(content=reply)
+        input_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        output_tokens = estimate_tokens(
+            str(reply.content) + (str(reply.tool_calls) if reply.tool_calls else "")
+        )
+        message = reply.model_copy(
+            update={
+                "response_metadata": {"model_name": self._llm_type},
+                "usage_metadata": {
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "total_tokens": input_tokens + output_tokens,
+                },
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
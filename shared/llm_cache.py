@@ -0,0 +1,244 @@
+"""Persistent on-disk cache for chat model responses.
+
+``SQLiteLLMCache`` implements LangChain's ``BaseCache`` interface, so it is
+plugged into a chat model with ``ChatOpenAI(..., cache=cache)`` and consulted
+before every API call. LangChain builds the lookup key from the serialized
+messages and the model configuration (model, temperature, bound tools, stop
+words...). Sampled responses (temperature > 0) are not deterministic, so they
+bypass the cache unless explicitly allowed.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+DEFAULT_CACHE_PATH = (
+    Path(__file__).resolve().parent.parent / ".cache" / "llm_cache.sqlite"
+)
+
+_TEMPERATURE_PATTERN = re.compile(r"""["']temperature["']\s*[:,]\s*([0-9.]+)""")
+
+
+class SQLiteLLMCache(BaseCache):
+    """LRU/size-bounded SQLite cache of LLM generations with an optional TTL."""
+
+    def __init__(
+        self,
+        database_path: str | Path = DEFAULT_CACHE_PATH,
+        max_entries: Optional[int] = 10_000,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        cache_nonzero_temperature: bool = False,
+    ):
+        """Initialize the cache.
+
+        Args:
+            database_path: SQLite file, created with its parent directory if missing
+            max_entries: Maximum number of cached responses (least recently used evicted)
+            max_bytes: Maximum total size of the cached responses
+            ttl_seconds: Entries older than this are treated as misses and removed
+            cache_nonzero_temperature: Also cache calls made with temperature > 0
+        """
+        self.database_path = Path(database_path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.cache_nonzero_temperature = cache_nonzero_temperature
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+        self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            str(self.database_path), check_same_thread=False
+        )
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_last_access "
+                "ON llm_cache (last_access)"
+            )
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Return the cached generations for this prompt and model, if any."""
+        if self._bypass(llm_string):
+            self.bypassed += 1
+            return None
+
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._expired(row[1], now):
+                with self._connection:
+                    self._connection.execute(
+                        "DELETE FROM llm_cache WHERE key = ?", (key,)
+                    )
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key)
+                )
+            self.hits += 1
+
+        generations = loads(row[0])
+        for generation in generations:
+            generation.generation_info = {
+                **(generation.generation_info or {}),
+                "cache_hit": True,
+            }
+            if hasattr(generation, "message"):
+                generation.message.response_metadata["cache_hit"] = True
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store the generations and evict entries over the configured limits."""
+        if self._bypass(llm_string):
+            return
+
+        value = dumps(list(return_val))
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (self._key(prompt, llm_string), value, len(value), now, now),
+            )
+            self._evict()
+        # Only called after a miss: tag the fresh response (not the stored copy)
+        for generation in return_val:
+            if hasattr(generation, "message"):
+                generation.message.response_metadata["cache_hit"] = False
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove every cached response."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size, to measure what the cache saves."""
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def _bypass(self, llm_string: str) -> bool:
+        if self.cache_nonzero_temperature:
+            return False
+        match = _TEMPERATURE_PATTERN.search(llm_string)
+        return match is not None and float(match.group(1)) > 0
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache is within its limits."""
+        if self.ttl_seconds is not None:
+            cursor = self._connection.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            self.evictions += cursor.rowcount
+
+        (entries,) = self._connection.execute(
+            "SELECT COUNT(*) FROM llm_cache"
+        ).fetchone()
+        if self.max_entries is not None and entries > self.max_entries:
+            cursor = self._connection.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                (entries - self.max_entries,),
+            )
+            self.evictions += cursor.rowcount
+
+        if self.max_bytes is not None:
+            size = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()[0]
+            while size > self.max_bytes:
+                row = self._connection.execute(
+                    "SELECT key, size FROM llm_cache ORDER BY last_access LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    break
+                self._connection.execute(
+                    "DELETE FROM llm_cache WHERE key = ?", (row[0],)
+                )
+                self.evictions += 1
+                size -= row[1]
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+
+_default_cache: Optional[SQLiteLLMCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[SQLiteLLMCache]:
+    """Return the process-wide cache configured from the environment.
+
+    Environment variables:
+        LLM_CACHE_ENABLED: set to "false" to disable caching (default "true")
+        LLM_CACHE_PATH: SQLite file (default ``.cache/llm_cache.sqlite`` at the repo root)
+        LLM_CACHE_MAX_ENTRIES: maximum number of entries (default 10000)
+        LLM_CACHE_MAX_MB: maximum total size in megabytes (default unlimited)
+        LLM_CACHE_TTL_SECONDS: entry time to live (default unlimited)
+        LLM_CACHE_NONZERO_TEMPERATURE: set to "true" to also cache sampled calls
+    """
+    global _default_cache
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() == "false":
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            max_mb = os.getenv("LLM_CACHE_MAX_MB")
+            ttl = os.getenv("LLM_CACHE_TTL_SECONDS")
+            _default_cache = SQLiteLLMCache(
+                database_path=os.getenv("LLM_CACHE_PATH", str(DEFAULT_CACHE_PATH)),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000")),
+                max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else None,
+                ttl_seconds=float(ttl) if ttl else None,
+                cache_nonzero_temperature=os.getenv(
+                    "LLM_CACHE_NONZERO_TEMPERATURE", "false"
+                ).lower()
+                == "true",
+            )
+        return _default_cache
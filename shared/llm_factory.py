@@ -0,0 +1,306 @@
+"""Process-wide factory of chat models sharing one HTTP connection pool.
+
+``LLMClientFactory.chat_model`` builds ``ChatOpenAI`` models that all send
+their requests through the same ``httpx`` clients, so workflows (and many
+instances of them) running in one process reuse warm keep-alive connections
+instead of opening their own, and the pool is tuned in one place:
+
+- ``max_connections`` / ``max_keepalive_connections`` / ``keepalive_expiry``
+  bound the connections to the API and how long idle ones are kept open
+- connect, read, write and pool timeouts apply to every call
+- HTTP/2 is used when enabled and the ``h2`` package is installed
+
+Connections of an ``asyncio`` event loop cannot be used from another one, so
+async calls get their own pools per running loop (the workflows call
+``asyncio.run`` several times per process). An httpcore pool also gets slower
+the more requests wait on it (each release scans every connection and waiting
+request), so the async pool of a loop is split into ``pool_shards`` smaller
+pools, each request going to the least busy one (see ``ShardedPoolTransport``).
+
+Every request also goes through the process-wide ``AdaptiveRateLimiter`` (see
+``shared.rate_limiter``), so the calls of all workflows share one RPM/TPM
+budget and back off together on 429s.
+
+``get_llm_factory()`` returns the factory configured from the environment, and
+``chat_model(...)`` is a shortcut for ``get_llm_factory().chat_model(...)``.
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from shared.llm_cache import get_llm_cache
+from shared.rate_limiter import (
+    AdaptiveRateLimiter,
+    RateLimitedSyncTransport,
+    RateLimitedTransport,
+    get_rate_limiter,
+)
+
+
+@dataclass(frozen=True)
+class HttpPoolConfig:
+    """Connection pool and timeouts of the HTTP clients shared by chat models."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 50
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 120.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 30.0
+    http2: bool = False
+    pool_shards: int = 8
+    max_retries: int = 2
+
+    @classmethod
+    def from_env(cls) -> "HttpPoolConfig":
+        """Read the configuration from the environment.
+
+        Environment variables (defaults in parentheses):
+            LLM_HTTP_MAX_CONNECTIONS: connections open at once (100)
+            LLM_HTTP_MAX_KEEPALIVE: idle connections kept open (50)
+            LLM_HTTP_KEEPALIVE_EXPIRY: seconds an idle connection is kept (30)
+            LLM_HTTP_CONNECT_TIMEOUT / LLM_HTTP_READ_TIMEOUT /
+            LLM_HTTP_WRITE_TIMEOUT / LLM_HTTP_POOL_TIMEOUT: seconds (5/120/30/30)
+            LLM_HTTP2: set to "true" to use HTTP/2 (needs the ``h2`` package)
+            LLM_HTTP_POOL_SHARDS: async pools the connections are split over (8)
+            LLM_MAX_RETRIES: retries of a failed call by the OpenAI client (2)
+        """
+        defaults = cls()
+        return cls(
+            max_connections=int(
+                os.getenv("LLM_HTTP_MAX_CONNECTIONS", defaults.max_connections)
+            ),
+            max_keepalive_connections=int(
+                os.getenv("LLM_HTTP_MAX_KEEPALIVE", defaults.max_keepalive_connections)
+            ),
+            keepalive_expiry=float(
+                os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", defaults.keepalive_expiry)
+            ),
+            connect_timeout=float(
+                os.getenv("LLM_HTTP_CONNECT_TIMEOUT", defaults.connect_timeout)
+            ),
+            read_timeout=float(
+                os.getenv("LLM_HTTP_READ_TIMEOUT", defaults.read_timeout)
+            ),
+            write_timeout=float(
+                os.getenv("LLM_HTTP_WRITE_TIMEOUT", defaults.write_timeout)
+            ),
+            pool_timeout=float(
+                os.getenv("LLM_HTTP_POOL_TIMEOUT", defaults.pool_timeout)
+            ),
+            http2=os.getenv("LLM_HTTP2", "false").lower() == "true",
+            pool_shards=int(os.getenv("LLM_HTTP_POOL_SHARDS", defaults.pool_shards)),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", defaults.max_retries)),
+        )
+
+    def limits(self, shards: int = 1) -> httpx.Limits:
+        """Limits of one of ``shards`` pools sharing the connections."""
+        return httpx.Limits(
+            max_connections=max(1, self.max_connections // shards),
+            max_keepalive_connections=max(1, self.max_keepalive_connections // shards),
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+class ShardedPoolTransport(httpx.AsyncBaseTransport):
+    """Async transport spreading requests over several pools per event loop.
+
+    The pools of a loop are closed when ``asyncio.run`` (or ``aclose``)
+    finishes with it: a task waiting for the cancellation ``asyncio.run``
+    sends to the tasks left over closes them before the loop is closed.
+    """
+
+    def __init__(self, config: HttpPoolConfig):
+        self.config = config
+        self.shards = max(1, config.pool_shards)
+        # Event loop -> its pools, dropped when the loop is garbage collected
+        self._pools = weakref.WeakKeyDictionary()
+        # Event loop -> task closing its pools when cancelled
+        self._closers: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+        # Pool -> requests waiting on it for a response
+        self._in_flight: Dict[httpx.AsyncHTTPTransport, int] = {}
+
+    def pools(self) -> List[httpx.AsyncHTTPTransport]:
+        """Pools of the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        pools = self._pools.get(loop)
+        if pools is None:
+            pools = self._pools[loop] = [
+                httpx.AsyncHTTPTransport(
+                    limits=self.config.limits(self.shards), http2=self.config.http2
+                )
+                for _ in range(self.shards)
+            ]
+            for pool in pools:
+                self._in_flight[pool] = 0
+            self._closers[loop] = loop.create_task(self._close_when_cancelled(loop))
+        return pools
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # The first least busy pool: sequential calls keep reusing one
+        # connection, concurrent ones are spread over the pools
+        pool = min(self.pools(), key=lambda pool: self._in_flight.get(pool, 0))
+        self._in_flight[pool] += 1
+        try:
+            return await pool.handle_async_request(request)
+        finally:
+            if pool in self._in_flight:
+                self._in_flight[pool] -= 1
+
+    async def aclose(self) -> None:
+        """Close the pools of the running loop."""
+        loop = asyncio.get_running_loop()
+        closer = self._closers.pop(loop, None)
+        if closer is not None:
+            closer.cancel()
+            await asyncio.gather(closer, return_exceptions=True)
+        await self._close(self._pools.pop(loop, []))
+
+    async def _close_when_cancelled(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            await loop.create_future()
+        finally:
+            self._closers.pop(loop, None)
+            await self._close(self._pools.pop(loop, []))
+
+    async def _close(self, pools: List[httpx.AsyncHTTPTransport]) -> None:
+        for pool in pools:
+            self._in_flight.pop(pool, None)
+            await pool.aclose()
+
+
+# Default of ``LLMClientFactory(rate_limiter=...)``: the process-wide limiter
+_PROCESS_RATE_LIMITER: Any = object()
+
+
+class LLMClientFactory:
+    """Hands out chat models backed by one shared, tunable connection pool."""
+
+    def __init__(
+        self,
+        config: Optional[HttpPoolConfig] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = _PROCESS_RATE_LIMITER,
+    ):
+        """Initialize the factory.
+
+        Args:
+            config: Pool and timeouts (default: ``HttpPoolConfig.from_env()``)
+            rate_limiter: Limiter of the requests, None for no limiter (default:
+                ``get_rate_limiter()``, None when disabled by
+                ``LLM_RATE_LIMIT_ENABLED=false``)
+        """
+        self.config = config or HttpPoolConfig.from_env()
+        self.rate_limiter = (
+            get_rate_limiter()
+            if rate_limiter is _PROCESS_RATE_LIMITER
+            else rate_limiter
+        )
+        if self.config.http2 and importlib.util.find_spec("h2") is None:
+            print("⚠️ LLM_HTTP2 needs the 'h2' package, using HTTP/1.1")
+            self.config = replace(self.config, http2=False)
+        self._lock = threading.Lock()
+        self._sync_client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self.models_created = 0
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        """HTTP client shared by the sync calls of every model."""
+        with self._lock:
+            if self._sync_client is None:
+                transport = httpx.HTTPTransport(
+                    limits=self.config.limits(), http2=self.config.http2
+                )
+                if self.rate_limiter is not None:
+                    transport = RateLimitedSyncTransport(transport, self.rate_limiter)
+                self._sync_client = httpx.Client(
+                    transport=transport, timeout=self.config.timeout()
+                )
+            return self._sync_client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """HTTP client shared by the async calls of every model."""
+        with self._lock:
+            if self._async_client is None:
+                transport = ShardedPoolTransport(self.config)
+                if self.rate_limiter is not None:
+                    transport = RateLimitedTransport(transport, self.rate_limiter)
+                self._async_client = httpx.AsyncClient(
+                    transport=transport, timeout=self.config.timeout()
+                )
+            return self._async_client
+
+    def chat_model(
+        self, model: str = "gpt-4o-mini", temperature: float = 0.7, **kwargs: Any
+    ):
+        """A ``ChatOpenAI`` using the shared clients and the LLM response cache.
+
+        Args:
+            model: OpenAI model name
+            temperature: Sampling temperature
+            kwargs: Other ``ChatOpenAI`` arguments, e.g. ``base_url``
+        """
+        # Imported here: the OpenAI client is slow to import and only needed
+        # once a model is actually created
+        from langchain_openai import ChatOpenAI
+
+        kwargs.setdefault("cache", get_llm_cache())
+        kwargs.setdefault("timeout", self.config.timeout())
+        kwargs.setdefault("max_retries", self.config.max_retries)
+        self.models_created += 1
+        return ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            http_client=self.sync_client,
+            http_async_client=self.async_client,
+            **kwargs,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Models created, the pool configuration and the rate limiter state."""
+        stats = {"models_created": self.models_created, **asdict(self.config)}
+        if self.rate_limiter is not None:
+            stats["rate_limiter"] = self.rate_limiter.stats()
+        return stats
+
+    def close(self) -> None:
+        """Close the sync client; async pools are closed with their event loop."""
+        with self._lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+
+_default_factory: Optional[LLMClientFactory] = None
+_default_factory_lock = threading.Lock()
+
+
+def get_llm_factory() -> LLMClientFactory:
+    """Return the process-wide factory configured from the environment."""
+    global _default_factory
+    with _default_factory_lock:
+        if _default_factory is None:
+            _default_factory = LLMClientFactory()
+        return _default_factory
+
+
+def chat_model(model: str = "gpt-4o-mini", temperature: float = 0.7, **kwargs: Any):
+    """Chat model from the process-wide factory (see ``LLMClientFactory.chat_model``)."""
+    return get_llm_factory().chat_model(model, temperature, **kwargs)
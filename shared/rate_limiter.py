@@ -0,0 +1,522 @@
+"""Process-wide adaptive rate limiter of the LLM API calls.
+
+``AdaptiveRateLimiter`` is shared by every chat model of the process (the
+``LLMClientFactory`` wraps its HTTP transports with it), so the concurrent
+chains of all workflows draw from the same budgets instead of each call
+retrying on its own:
+
+- token buckets enforce requests-per-minute and tokens-per-minute budgets;
+  the tokens of a call are estimated from its request body and corrected
+  with the ``usage`` of its response
+- the number of calls in flight adapts AIMD-style: +1 per window of
+  successful calls, halved (``decrease_factor``) on a 429, at most once per
+  window so a burst of 429s does not collapse it
+- a 429 pauses every caller for its ``retry-after`` (or ``retry-after-ms``)
+  delay, including the OpenAI client's own retries, which go through the
+  same transport
+- a streamed response holds its slot until its body is closed, and its
+  tokens are corrected with the ``usage`` of its last chunk when the stream
+  reports one
+
+``stats()`` exposes the current concurrency limit, the calls in flight and
+the callers waiting (queue depth).
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+import httpx
+
+# Completion tokens reserved for a call that does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 256
+
+# End of a streamed response kept to read the usage of its last chunk
+_USAGE_TAIL_BYTES = 4096
+
+
+class TokenBucket:
+    """Budget refilled continuously at ``per_minute`` units per minute."""
+
+    def __init__(self, per_minute: float, burst_seconds: float = 10.0):
+        """Initialize a full bucket.
+
+        Args:
+            per_minute: Units added per minute
+            burst_seconds: Seconds of budget that can be spent at once
+        """
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (capped to a full bucket)."""
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float) -> None:
+        """Spend ``amount``; a negative amount gives budget back."""
+        self.level = min(self.capacity, self.level - amount)
+
+
+class AdaptiveRateLimiter:
+    """RPM/TPM token buckets and an AIMD concurrency limit shared by all calls."""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = 64,
+        min_concurrency: int = 1,
+        decrease_factor: float = 0.5,
+        default_retry_after: float = 1.0,
+        burst_seconds: float = 10.0,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            requests_per_minute: Request budget, None for unlimited
+            tokens_per_minute: Token budget (prompt and completion), None for unlimited
+            max_concurrency: Calls in flight at most, and the initial limit
+            min_concurrency: The limit is never decreased below this
+            decrease_factor: Factor applied to the limit on a 429
+            default_retry_after: Pause after a 429 without a retry-after header, in seconds
+            burst_seconds: Seconds of budget the buckets can spend at once
+        """
+        self.requests = (
+            TokenBucket(requests_per_minute, burst_seconds)
+            if requests_per_minute
+            else None
+        )
+        self.tokens = (
+            TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute else None
+        )
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.decrease_factor = decrease_factor
+        self.default_retry_after = default_retry_after
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        # Callers waiting for a call to finish: (event loop, future) or (None, threading.Event)
+        self._waiters: Deque[Tuple[Optional[asyncio.AbstractEventLoop], Any]] = deque()
+        self.calls = 0
+        self.throttled = 0
+        self.failures = 0
+        self.decreases = 0
+        self.wait_seconds = 0.0
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait for a slot and the budget of a call; returns its start time."""
+        loop = asyncio.get_running_loop()
+        requested = time.monotonic()
+        with self._lock:
+            self.queue_depth += 1
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_acquire(tokens)
+                    if wait is None:
+                        return self._started(requested)
+                    waiter = loop.create_future()
+                    self._waiters.append((loop, waiter))
+                try:
+                    await asyncio.wait_for(waiter, timeout=wait or None)
+                except asyncio.TimeoutError:
+                    pass
+                except asyncio.CancelledError:
+                    # Pass a wake-up this caller will not use on to the next one
+                    if waiter.done() and not waiter.cancelled():
+                        with self._lock:
+                            self._wake(1)
+                    raise
+                finally:
+                    self._discard_waiter(waiter)
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+
+    def acquire_sync(self, tokens: int = 0) -> float:
+        """Blocking version of ``acquire``, for sync calls."""
+        requested = time.monotonic()
+        with self._lock:
+            self.queue_depth += 1
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_acquire(tokens)
+                    if wait is None:
+                        return self._started(requested)
+                    waiter = threading.Event()
+                    self._waiters.append((None, waiter))
+                waiter.wait(timeout=wait or None)
+                self._discard_waiter(waiter)
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+
+    def release(
+        self,
+        started_at: float,
+        throttled: bool = False,
+        retry_after: Optional[float] = None,
+        tokens_reserved: int = 0,
+        tokens_used: Optional[int] = None,
+        failed: bool = False,
+    ) -> None:
+        """Record the end of a call started at ``started_at``.
+
+        Args:
+            throttled: The call was answered with a 429
+            retry_after: Delay requested by the API, in seconds
+            tokens_reserved: Tokens taken from the bucket by ``acquire``
+            tokens_used: Tokens the call actually used, to correct the bucket
+            failed: The call ended without a response (transport error or
+                cancellation): the limit is left as it is
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.failures += 1
+            elif throttled:
+                self.throttled += 1
+                # A rejected request does not use its tokens
+                if self.tokens is not None:
+                    self.tokens.take(-tokens_reserved)
+                pause = (
+                    retry_after if retry_after is not None else self.default_retry_after
+                )
+                self.paused_until = max(self.paused_until, now + pause)
+                # Calls started before the last decrease saw the old limit:
+                # their 429s do not decrease it again
+                if started_at > self._last_decrease:
+                    self.limit = max(
+                        float(self.min_concurrency), self.limit * self.decrease_factor
+                    )
+                    self._last_decrease = now
+                    self.decreases += 1
+            else:
+                self.limit = min(
+                    float(self.max_concurrency), self.limit + 1 / self.limit
+                )
+                if self.tokens is not None and tokens_used is not None:
+                    self.tokens.take(tokens_used - tokens_reserved)
+            self._wake(max(1, int(self.limit) - self.in_flight))
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit, calls in flight, queue depth and counters."""
+        with self._lock:
+            now = time.monotonic()
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.refill(now)
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queue_depth": self.queue_depth,
+                "paused_for": round(max(0.0, self.paused_until - now), 3),
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "failures": self.failures,
+                "decreases": self.decreases,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "requests_available": (
+                    round(self.requests.level, 1) if self.requests else None
+                ),
+                "tokens_available": round(self.tokens.level) if self.tokens else None,
+            }
+
+    def _try_acquire(self, tokens: int) -> Optional[float]:
+        """Take a slot and budget, or return the seconds to wait (0: until a call ends)."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= max(self.min_concurrency, int(self.limit)):
+            return 0.0
+        wait = 0.0
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_time(amount))
+        if wait > 0:
+            return wait
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+        self.in_flight += 1
+        return None
+
+    def _started(self, requested: float) -> float:
+        now = time.monotonic()
+        self.calls += 1
+        self.wait_seconds += now - requested
+        return now
+
+    def _wake(self, count: int) -> None:
+        while count > 0 and self._waiters:
+            loop, waiter = self._waiters.popleft()
+            if loop is None:
+                waiter.set()
+            else:
+                loop.call_soon_threadsafe(_resolve, waiter)
+            count -= 1
+
+    def _discard_waiter(self, waiter: Any) -> None:
+        with self._lock:
+            for entry in self._waiters:
+                if entry[1] is waiter:
+                    self._waiters.remove(entry)
+                    break
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def estimate_request_tokens(request: httpx.Request) -> int:
+    """Prompt tokens (about 4 bytes per token) plus the completion tokens allowed."""
+    body = request.content
+    completion = DEFAULT_COMPLETION_TOKENS
+    try:
+        payload = json.loads(body) if body else {}
+        completion = int(
+            payload.get("max_completion_tokens")
+            or payload.get("max_tokens")
+            or completion
+        )
+    except (ValueError, TypeError, AttributeError):
+        pass
+    return len(body) // 4 + completion
+
+
+def parse_retry_after(headers: httpx.Headers) -> Optional[float]:
+    """Delay requested by a 429 response, in seconds, if any."""
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def _is_json(response: httpx.Response) -> bool:
+    return response.headers.get("content-type", "").startswith("application/json")
+
+
+def _tokens_used(response: httpx.Response) -> Optional[int]:
+    if not _is_json(response):
+        return None
+    try:
+        return int(json.loads(response.content)["usage"]["total_tokens"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _streamed_tokens_used(tail: bytes) -> Optional[int]:
+    """Total tokens of the last server-sent event of a stream carrying a usage."""
+    for line in reversed(tail.split(b"\n")):
+        if not line.startswith(b"data:") or b'"usage"' not in line:
+            continue
+        try:
+            usage = json.loads(line[5:])["usage"]
+            if usage:
+                return int(usage["total_tokens"])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return None
+
+
+def _releaser(
+    limiter: AdaptiveRateLimiter, started_at: float, tokens_reserved: int
+) -> Callable[[Optional[int], bool], None]:
+    """Release callback of a streamed call, given the tokens it used (if known)
+    and whether reading its body failed."""
+    return lambda tokens_used, failed: limiter.release(
+        started_at,
+        tokens_reserved=tokens_reserved,
+        tokens_used=tokens_used,
+        failed=failed,
+    )
+
+
+class _ReleasingStream:
+    """Response body releasing the limiter slot of its call once closed."""
+
+    def __init__(self, stream: Any, release: Callable[[Optional[int], bool], None]):
+        self.stream = stream
+        self.release = release
+        self.tail = b""
+        self.released = False
+        self.failed = False
+
+    def _observe(self, chunk: bytes) -> None:
+        self.tail = (self.tail + chunk)[-_USAGE_TAIL_BYTES:]
+
+    def _finish(self) -> None:
+        if not self.released:
+            self.released = True
+            self.release(_streamed_tokens_used(self.tail), self.failed)
+
+
+class _ReleasingAsyncStream(_ReleasingStream, httpx.AsyncByteStream):
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self.stream:
+                self._observe(chunk)
+                yield chunk
+        except Exception:
+            self.failed = True
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            self._finish()
+
+
+class _ReleasingSyncStream(_ReleasingStream, httpx.SyncByteStream):
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            for chunk in self.stream:
+                self._observe(chunk)
+                yield chunk
+        except Exception:
+            self.failed = True
+            raise
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        finally:
+            self._finish()
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async transport sending every request through an ``AdaptiveRateLimiter``.
+
+    JSON responses are read before the slot is released, to count their
+    tokens; other (streamed) responses release it when their body is closed.
+    """
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, limiter: AdaptiveRateLimiter
+    ):
+        self.transport = transport
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = estimate_request_tokens(request)
+        started_at = await self.limiter.acquire(tokens)
+        try:
+            response = await self.transport.handle_async_request(request)
+            if response.status_code == 429:
+                self.limiter.release(
+                    started_at,
+                    throttled=True,
+                    retry_after=parse_retry_after(response.headers),
+                    tokens_reserved=tokens,
+                )
+                return response
+            if not _is_json(response):
+                response.stream = _ReleasingAsyncStream(
+                    response.stream, _releaser(self.limiter, started_at, tokens)
+                )
+                return response
+            await response.aread()
+        except BaseException:
+            self.limiter.release(started_at, tokens_reserved=tokens, failed=True)
+            raise
+        self.limiter.release(
+            started_at, tokens_reserved=tokens, tokens_used=_tokens_used(response)
+        )
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class RateLimitedSyncTransport(httpx.BaseTransport):
+    """Sync version of ``RateLimitedTransport``."""
+
+    def __init__(self, transport: httpx.BaseTransport, limiter: AdaptiveRateLimiter):
+        self.transport = transport
+        self.limiter = limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = estimate_request_tokens(request)
+        started_at = self.limiter.acquire_sync(tokens)
+        try:
+            response = self.transport.handle_request(request)
+            if response.status_code == 429:
+                self.limiter.release(
+                    started_at,
+                    throttled=True,
+                    retry_after=parse_retry_after(response.headers),
+                    tokens_reserved=tokens,
+                )
+                return response
+            if not _is_json(response):
+                response.stream = _ReleasingSyncStream(
+                    response.stream, _releaser(self.limiter, started_at, tokens)
+                )
+                return response
+            response.read()
+        except BaseException:
+            self.limiter.release(started_at, tokens_reserved=tokens, failed=True)
+            raise
+        self.limiter.release(
+            started_at, tokens_reserved=tokens, tokens_used=_tokens_used(response)
+        )
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+_default_limiter: Optional[AdaptiveRateLimiter] = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[AdaptiveRateLimiter]:
+    """Return the process-wide limiter configured from the environment.
+
+    Environment variables:
+        LLM_RATE_LIMIT_ENABLED: set to "false" to disable the limiter (default "true")
+        LLM_RATE_LIMIT_RPM: requests per minute (default unlimited)
+        LLM_RATE_LIMIT_TPM: tokens per minute (default unlimited)
+        LLM_RATE_LIMIT_MAX_CONCURRENCY: calls in flight at most (default 64)
+        LLM_RATE_LIMIT_MIN_CONCURRENCY: lowest adaptive limit (default 1)
+    """
+    global _default_limiter
+    if os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "false":
+        return None
+
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            rpm = os.getenv("LLM_RATE_LIMIT_RPM")
+            tpm = os.getenv("LLM_RATE_LIMIT_TPM")
+            _default_limiter = AdaptiveRateLimiter(
+                requests_per_minute=float(rpm) if rpm else None,
+                tokens_per_minute=float(tpm) if tpm else None,
+                max_concurrency=int(os.getenv("LLM_RATE_LIMIT_MAX_CONCURRENCY", "64")),
+                min_concurrency=int(os.getenv("LLM_RATE_LIMIT_MIN_CONCURRENCY", "1")),
+            )
+        return _default_limiter
@@ -0,0 +1,180 @@
+"""Local stub of the OpenAI chat completions API.
+
+Serves ``POST /v1/chat/completions`` with a canned reply after a configurable
+latency, so workflows and servers can be load tested without network access.
+Point ``ChatOpenAI`` at it with ``OPENAI_BASE_URL=http://127.0.0.1:<port>/v1``.
+
+Rate limits of the real API can be emulated: requests over
+``requests_per_minute`` (sliding window) or ``max_concurrent_requests`` are
+answered with a 429 and a ``retry-after`` header.
+
+Usage:
+    python -m shared.stub_openai_server --port 8001 --latency-ms 200 --reply unclear
+    python -m shared.stub_openai_server --requests-per-minute 600 --max-concurrent 8
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from aiohttp import web
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used for the ``usage`` block (about 4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class StubOpenAIServer:
+    """aiohttp application answering chat completion requests with a canned reply."""
+
+    def __init__(
+        self,
+        reply: str | Callable[[List[Dict[str, Any]]], str] = "unclear",
+        latency_ms: float = 0.0,
+        requests_per_minute: Optional[int] = None,
+        max_concurrent_requests: Optional[int] = None,
+    ):
+        """Initialize the stub.
+
+        Args:
+            reply: Reply text, or a function computing it from the request messages
+            latency_ms: Delay before each response, to emulate model latency
+            requests_per_minute: Requests accepted per minute, 429 beyond (None: no limit)
+            max_concurrent_requests: Requests served at once, 429 beyond (None: no limit)
+        """
+        self.reply = reply
+        self.latency_ms = latency_ms
+        self.requests_per_minute = requests_per_minute
+        self.max_concurrent_requests = max_concurrent_requests
+        self.requests = 0
+        self.throttled = 0
+        # Arrival times of the requests accepted in the last minute
+        self._accepted: deque = deque()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Client (host, port) pairs seen: one per TCP connection opened
+        self.connections: set = set()
+        self._runner: Optional[web.AppRunner] = None
+
+    def build_app(self) -> web.Application:
+        """Create the aiohttp application."""
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.handle_chat_completions)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving in the running event loop and return the ``/v1`` base URL."""
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = self._runner.addresses[0][1]
+        return f"http://{host}:{bound_port}/v1"
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def retry_after(self) -> Optional[float]:
+        """Seconds the next request has to wait when over a limit, else None."""
+        now = time.monotonic()
+        while self._accepted and now - self._accepted[0] >= 60:
+            self._accepted.popleft()
+        if (
+            self.requests_per_minute is not None
+            and len(self._accepted) >= self.requests_per_minute
+        ):
+            return 60 - (now - self._accepted[0])
+        if (
+            self.max_concurrent_requests is not None
+            and self.in_flight >= self.max_concurrent_requests
+        ):
+            return max(self.latency_ms / 1000, 0.05)
+        self._accepted.append(now)
+        return None
+
+    async def handle_chat_completions(self, request: web.Request) -> web.Response:
+        """Answer one chat completion request."""
+        self.requests += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        retry_after = self.retry_after()
+        if retry_after is not None:
+            self.throttled += 1
+            return web.json_response(
+                {
+                    "error": {
+                        "message": "Rate limit reached, please retry later.",
+                        "type": "requests",
+                        "code": "rate_limit_exceeded",
+                    }
+                },
+                status=429,
+                headers={
+                    "retry-after": f"{retry_after:.3f}",
+                    "retry-after-ms": str(int(retry_after * 1000)),
+                },
+            )
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            body = await request.json()
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000)
+            messages = body.get("messages", [])
+            content = self.reply(messages) if callable(self.reply) else self.reply
+            prompt_tokens = estimate_tokens(json.dumps(messages))
+            completion_tokens = estimate_tokens(content)
+            return web.json_response(
+                {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                }
+            )
+        finally:
+            self.in_flight -= 1
+
+
+def main():
+    """Run the stub server from the command line."""
+    parser = argparse.ArgumentParser(description="Stub OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--reply", default="unclear")
+    parser.add_argument("--requests-per-minute", type=int)
+    parser.add_argument("--max-concurrent", type=int)
+    args = parser.parse_args()
+
+    stub = StubOpenAIServer(
+        reply=args.reply,
+        latency_ms=args.latency_ms,
+        requests_per_minute=args.requests_per_minute,
+        max_concurrent_requests=args.max_concurrent,
+    )
+    print(f"Stub OpenAI server on http://{args.host}:{args.port}/v1")
+    web.run_app(stub.build_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import asyncio
+
+import httpx
+
+from shared.llm_factory import HttpPoolConfig, ShardedPoolTransport
+from shared.stub_openai_server import StubOpenAIServer
+
+
+def test_pools_are_closed_when_their_loop_ends():
+    transport = ShardedPoolTransport(HttpPoolConfig(pool_shards=2))
+    pools = []
+
+    async def call(base_url):
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get(f"{base_url}/models")
+        pools.extend(transport.pools())
+
+    async def run():
+        stub = StubOpenAIServer()
+        base_url = await stub.start()
+        try:
+            # A loop of its own, as a workflow run with asyncio.run would have
+            await asyncio.to_thread(asyncio.run, call(base_url))
+        finally:
+            await stub.stop()
+
+    asyncio.run(run())
+    assert len(pools) == 2
+    assert not transport._closers
+    assert not transport._in_flight
+    assert all(len(pool._pool.connections) == 0 for pool in pools)
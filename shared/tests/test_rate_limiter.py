@@ -0,0 +1,146 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from shared.llm_factory import HttpPoolConfig, LLMClientFactory
+from shared.rate_limiter import AdaptiveRateLimiter, RateLimitedTransport
+from shared.stub_openai_server import StubOpenAIServer
+
+
+def test_429_halves_the_limit_once_per_window():
+    limiter = AdaptiveRateLimiter(max_concurrency=8, default_retry_after=0)
+
+    async def run():
+        first = await limiter.acquire()
+        second = await limiter.acquire()
+        limiter.release(first, throttled=True)
+        # Started before the decrease: it saw the old limit
+        limiter.release(second, throttled=True)
+        limiter.release(await limiter.acquire(), throttled=True)
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert stats["throttled"] == 3
+    assert stats["decreases"] == 2
+    assert stats["limit"] == 2
+
+
+def test_retry_after_pauses_every_caller():
+    limiter = AdaptiveRateLimiter()
+
+    async def run():
+        limiter.release(await limiter.acquire(), throttled=True, retry_after=0.2)
+        start = time.monotonic()
+        limiter.release(await limiter.acquire())
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.2
+
+
+def test_transport_error_leaves_the_limit_unchanged():
+    def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    limiter = AdaptiveRateLimiter(max_concurrency=8)
+    limit = limiter.stats()["limit"]
+    transport = RateLimitedTransport(httpx.MockTransport(handler), limiter)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            try:
+                await client.post("http://stub/v1", content=b"{}")
+            except httpx.ConnectError:
+                pass
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert stats["failures"] == 1
+    assert stats["limit"] == limit
+    assert stats["in_flight"] == 0
+
+
+def test_429_gives_back_the_reserved_tokens():
+    def handler(request):
+        return httpx.Response(429, headers={"retry-after": "0"})
+
+    limiter = AdaptiveRateLimiter(tokens_per_minute=60_000, burst_seconds=1)
+    transport = RateLimitedTransport(httpx.MockTransport(handler), limiter)
+    body = json.dumps({"max_tokens": 500})
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.post("http://stub/v1", content=body)
+            assert response.status_code == 429
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert stats["throttled"] == 1
+    assert stats["tokens_available"] == 1000
+
+
+def test_streamed_response_holds_its_slot_until_closed():
+    events = [
+        b'data: {"choices":[{"delta":{"content":"ok"}}],"usage":null}\n\n',
+        b'data: {"choices":[],"usage":{"total_tokens":40}}\n\n',
+        b"data: [DONE]\n\n",
+    ]
+
+    async def stream():
+        for event in events:
+            yield event
+
+    def handler(request):
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, content=stream()
+        )
+
+    limiter = AdaptiveRateLimiter(tokens_per_minute=60_000, burst_seconds=1)
+    transport = RateLimitedTransport(httpx.MockTransport(handler), limiter)
+    body = json.dumps({"max_tokens": 500, "stream": True})
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            request = client.build_request("POST", "http://stub/v1", content=body)
+            response = await client.send(request, stream=True)
+            assert limiter.stats()["in_flight"] == 1
+            await response.aread()
+            await response.aclose()
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0
+    # The reservation (about 500 tokens) was corrected to the 40 used
+    assert stats["tokens_available"] >= 1000 - 40 - 5
+
+
+def test_limiter_absorbs_the_429s_of_a_busy_server():
+    async def run():
+        stub = StubOpenAIServer(reply="ok", latency_ms=20, max_concurrent_requests=2)
+        base_url = await stub.start()
+        try:
+            # Halving 16 down to the 2 calls the server takes needs three
+            # rounds of 429s: a call may be throttled in each of them
+            limiter = AdaptiveRateLimiter(max_concurrency=16)
+            factory = LLMClientFactory(HttpPoolConfig(max_retries=4), limiter)
+            model = factory.chat_model(base_url=base_url, api_key="stub", cache=False)
+            replies = await asyncio.gather(
+                *(model.ainvoke(f"Request {i}") for i in range(20))
+            )
+            return replies, limiter.stats(), stub.throttled
+        finally:
+            await stub.stop()
+
+    replies, stats, throttled = asyncio.run(run())
+    assert [reply.content for reply in replies] == ["ok"] * 20
+    assert throttled > 0
+    assert stats["decreases"] > 0
+    assert stats["limit"] < 16
+    assert stats["in_flight"] == 0
+
+
+def test_factory_without_a_limiter(monkeypatch):
+    monkeypatch.setenv("LLM_RATE_LIMIT_ENABLED", "true")
+    assert LLMClientFactory(rate_limiter=None).rate_limiter is None
+    assert LLMClientFactory().rate_limiter is not None
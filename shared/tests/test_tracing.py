@@ -0,0 +1,23 @@
+from shared.fake_llm import FakeChatModel
+from shared.llm_cache import SQLiteLLMCache
+from shared.tracing import load_spans, tracing
+
+
+def llm_spans(path):
+    return [span for span in load_spans(path) if span["kind"] == "llm"]
+
+
+def test_llm_spans_report_cache_hits_misses_and_bypasses(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "cache.sqlite")
+    cached = FakeChatModel(reply="ok", cache=cache)
+    uncached = FakeChatModel(reply="ok")
+    trace = tmp_path / "trace.jsonl"
+    with tracing(trace):
+        cached.invoke("hello", {"run_name": "first"})
+        cached.invoke("hello", {"run_name": "second"})
+        uncached.invoke("hello", {"run_name": "no cache"})
+    assert {span["name"]: span["cache"] for span in llm_spans(trace)} == {
+        "first": "miss",
+        "second": "hit",
+        "no cache": None,
+    }
@@ -0,0 +1,465 @@
+"""Step-level tracing of the workflows, exported as JSONL spans.
+
+``TraceRecorder`` is a LangChain callback handler recording a span per chain,
+LLM and tool run: start and end times, model, token counts, whether the
+response came from the LLM cache ("hit", "miss", or none when the cache was
+not looked up, e.g. without a cache or at temperature > 0), and errors. It is
+installed globally through LangChain's configure hook, so every chain invoked
+inside ``with tracing(path):`` is recorded without passing callbacks around;
+the context follows ``asyncio.run``, tasks and LangChain's thread pools.
+
+Spans nest by their LangChain parent run. ``trace_step(name)`` opens a span of
+its own around several calls (e.g. one reflection iteration), which becomes
+the parent of the runs started inside it. Chains are named with
+``config={"run_name": ...}`` / ``with_config(run_name=...)``; the plumbing
+runs LangChain nests in them (``Runnable*``, prompt templates, output
+parsers) are not recorded, their children are attached to the closest
+recorded ancestor.
+
+Every finished span is appended to the JSONL file at once, and
+``python -m shared.tracing trace.jsonl`` prints the critical path, the slowest
+spans and the tokens per step of a trace file.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+# Names of the runs LangChain creates for its own building blocks
+_PLUMBING_NAME = re.compile(r"^(Runnable\w*|\w*PromptTemplate|\w*OutputParser)(<.*>)?$")
+
+
+@dataclass
+class Span:
+    """One timed step, chain, LLM or tool call of a trace."""
+
+    span_id: str
+    trace_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: str
+    start: float
+    end: Optional[float] = None
+    duration_ms: Optional[float] = None
+    component: Optional[str] = None
+    model: Optional[str] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    cache: Optional[str] = None
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+class TraceRecorder(BaseCallbackHandler):
+    """Callback handler recording LangChain runs as spans."""
+
+    # Called in the thread and context of the run, so steps are seen as parents
+    run_inline = True
+
+    def __init__(self, path: Optional[str | Path] = None, keep: bool = True):
+        """Initialize the recorder.
+
+        Args:
+            path: JSONL file the finished spans are appended to (None: not exported)
+            keep: Also keep the finished spans in ``self.spans``
+        """
+        self.path = Path(path) if path else None
+        self.keep = keep
+        self.spans: List[Span] = []
+        self.exported = 0
+        self._open: Dict[str, Span] = {}
+        # LangChain run -> its span
+        self._run_spans: Dict[UUID, str] = {}
+        # Run not recorded -> span of its closest recorded ancestor
+        self._elided: Dict[UUID, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("a", encoding="utf-8")
+
+    def start_span(
+        self, name: str, kind: str, parent_id: Optional[str], **attributes: Any
+    ) -> Span:
+        """Open a span under ``parent_id`` (a new trace when None)."""
+        span_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            parent = self._open.get(parent_id) if parent_id else None
+            span = Span(
+                span_id=span_id,
+                trace_id=parent.trace_id if parent else span_id,
+                parent_id=parent_id,
+                name=name,
+                kind=kind,
+                start=time.time(),
+                **attributes,
+            )
+            self._open[span_id] = span
+        return span
+
+    def end_span(self, span_id: Optional[str], **updates: Any) -> None:
+        """Close a span, export it and keep it if configured to."""
+        with self._lock:
+            span = self._open.pop(span_id, None) if span_id else None
+            if span is None:
+                return
+            for key, value in updates.items():
+                if value is not None:
+                    setattr(span, key, value)
+            span.end = time.time()
+            span.duration_ms = round((span.end - span.start) * 1000, 3)
+            if self.keep:
+                self.spans.append(span)
+            if self._file:
+                self._file.write(json.dumps(asdict(span)) + "\n")
+                self._file.flush()
+                self.exported += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    # --- LangChain callbacks ---
+
+    def on_chain_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or _component(serialized) or "chain"
+        parent_id = self._parent_of(parent_run_id)
+        if parent_run_id is not None and _PLUMBING_NAME.match(name):
+            self._elided[run_id] = parent_id
+            return
+        self._start_run(run_id, name, "chain", parent_id, serialized)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_run(run_id)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end_run(run_id, error=repr(error))
+
+    def on_chat_model_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        messages: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def on_llm_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        usage: Dict[str, Any] = {}
+        model = None
+        cache_hit = None
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is None:
+                    continue
+                usage = getattr(message, "usage_metadata", None) or usage
+                model = message.response_metadata.get("model_name") or model
+                # Set by shared.llm_cache when it was looked up, absent otherwise
+                cache_hit = message.response_metadata.get("cache_hit", cache_hit)
+        if not usage and response.llm_output:
+            token_usage = response.llm_output.get("token_usage") or {}
+            usage = {
+                "input_tokens": token_usage.get("prompt_tokens"),
+                "output_tokens": token_usage.get("completion_tokens"),
+                "total_tokens": token_usage.get("total_tokens"),
+            }
+        self._end_run(
+            run_id,
+            model=model,
+            input_tokens=usage.get("input_tokens"),
+            output_tokens=usage.get("output_tokens"),
+            total_tokens=usage.get("total_tokens"),
+            cache=None if cache_hit is None else "hit" if cache_hit else "miss",
+        )
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end_run(run_id, error=repr(error))
+
+    def on_tool_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._start_run(
+            run_id, name, "tool", self._parent_of(parent_run_id), serialized
+        )
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_run(run_id)
+
+    def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end_run(run_id, error=repr(error))
+
+    def _parent_of(self, parent_run_id: Optional[UUID]) -> Optional[str]:
+        if parent_run_id in self._run_spans:
+            return self._run_spans[parent_run_id]
+        if parent_run_id in self._elided:
+            return self._elided[parent_run_id]
+        return _current_span.get()
+
+    def _start_llm(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        run_id: UUID,
+        parent_run_id: Optional[UUID],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        params = kwargs.get("invocation_params") or {}
+        metadata = kwargs.get("metadata") or {}
+        model = (
+            params.get("model")
+            or params.get("model_name")
+            or metadata.get("ls_model_name")
+        )
+        name = kwargs.get("name") or _component(serialized) or "llm"
+        self._start_run(
+            run_id, name, "llm", self._parent_of(parent_run_id), serialized, model=model
+        )
+
+    def _start_run(
+        self,
+        run_id: UUID,
+        name: str,
+        kind: str,
+        parent_id: Optional[str],
+        serialized: Optional[Dict[str, Any]],
+        **attributes: Any,
+    ) -> None:
+        span = self.start_span(
+            name, kind, parent_id, component=_component(serialized), **attributes
+        )
+        self._run_spans[run_id] = span.span_id
+
+    def _end_run(self, run_id: UUID, **updates: Any) -> None:
+        if run_id in self._elided:
+            del self._elided[run_id]
+            return
+        self.end_span(self._run_spans.pop(run_id, None), **updates)
+
+
+def _component(serialized: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not serialized:
+        return None
+    ids = serialized.get("id") or []
+    return ids[-1] if ids else serialized.get("name")
+
+
+_active_recorder: ContextVar[Optional[TraceRecorder]] = ContextVar(
+    "agentic_trace_recorder", default=None
+)
+# Span of the innermost ``trace_step`` of the current context
+_current_span: ContextVar[Optional[str]] = ContextVar(
+    "agentic_trace_span", default=None
+)
+register_configure_hook(_active_recorder, inheritable=True)
+
+
+@contextmanager
+def tracing(
+    path: Optional[str | Path] = None, keep: bool = True
+) -> Iterator[TraceRecorder]:
+    """Record every LangChain run of the block (see ``TraceRecorder``)."""
+    recorder = TraceRecorder(path, keep)
+    token = _active_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _active_recorder.reset(token)
+        recorder.close()
+
+
+@contextmanager
+def trace_step(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Group the runs of the block under a span named ``name``.
+
+    Does nothing (and yields None) outside ``tracing``.
+    """
+    recorder = _active_recorder.get()
+    if recorder is None:
+        yield None
+        return
+    span = recorder.start_span(name, "step", _current_span.get(), attributes=attributes)
+    token = _current_span.set(span.span_id)
+    error = None
+    try:
+        yield span
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        recorder.end_span(span.span_id, error=error)
+
+
+# --- Report ---
+
+
+def load_spans(path: str | Path) -> List[Dict[str, Any]]:
+    """Spans of a JSONL trace file, as dictionaries."""
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def _children(spans: List[Dict[str, Any]]) -> Dict[Optional[str], List[Dict[str, Any]]]:
+    children: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+    ids = {span["span_id"] for span in spans}
+    for span in spans:
+        # Spans whose parent is missing (e.g. a crash) are reported as roots
+        parent = span["parent_id"] if span["parent_id"] in ids else None
+        children[parent].append(span)
+    return children
+
+
+def critical_path(
+    span: Dict[str, Any], children: Dict[Optional[str], List[Dict[str, Any]]]
+) -> List[tuple]:
+    """(depth, span) pairs of the chain of children that determined ``span``'s end.
+
+    From the child ending last, walks back through the children that ended
+    before the next one on the path started: the sequential steps, and the
+    slowest of each group of concurrent ones.
+    """
+    path = []
+    remaining = sorted(children.get(span["span_id"], []), key=lambda s: s["end"])
+    sequence = []
+    cutoff = float("inf")
+    for child in reversed(remaining):
+        if child["end"] <= cutoff:
+            sequence.append(child)
+            cutoff = child["start"]
+    for child in reversed(sequence):
+        path.append((0, child))
+        path.extend((depth + 1, s) for depth, s in critical_path(child, children))
+    return path
+
+
+def _step_of(span: Dict[str, Any], by_id: Dict[str, Dict[str, Any]]) -> str:
+    """Names of the ancestors of a span below its root, and its own run name."""
+    names = []
+    if span["name"] != span.get("component"):
+        names.append(span["name"])
+    parent = by_id.get(span["parent_id"])
+    while parent is not None and parent["parent_id"] in by_id:
+        names.append(parent["name"])
+        parent = by_id.get(parent["parent_id"])
+    if not names:
+        names.append(parent["name"] if parent else span["name"])
+    return " > ".join(reversed(names))
+
+
+def print_report(spans: List[Dict[str, Any]], top: int = 10) -> None:
+    """Print the critical path of the slowest traces, the slowest spans and the tokens per step."""
+    spans = [span for span in spans if span.get("end") is not None]
+    if not spans:
+        print("⚠️ No spans")
+        return
+    children = _children(spans)
+    by_id = {span["span_id"]: span for span in spans}
+    roots = sorted(children[None], key=lambda s: -s["duration_ms"])
+    llm_spans = [span for span in spans if span["kind"] == "llm"]
+    hits = sum(1 for span in llm_spans if span.get("cache") == "hit")
+    tokens = sum(span.get("total_tokens") or 0 for span in llm_spans)
+    print(
+        f"📊 {len(roots)} trace(s), {len(spans)} spans, {len(llm_spans)} LLM calls "
+        f"({hits} cache hits), {tokens} tokens"
+    )
+
+    for root in roots[:3]:
+        print(f"\n⏱️ Critical path of '{root['name']}' ({root['duration_ms']:.0f} ms)")
+        print(f"{'span':<48}{'kind':<7}{'ms':>10}{'tokens':>8}")
+        for depth, span in critical_path(root, children):
+            label = ("  " * depth + span["name"])[:47]
+            print(
+                f"{label:<48}{span['kind']:<7}{span['duration_ms']:>10.0f}"
+                f"{span.get('total_tokens') or '':>8}"
+            )
+
+    print("\n🐢 Slowest spans")
+    print(f"{'span':<48}{'kind':<7}{'ms':>10}{'model':>16}{'tokens':>8}{'cache':>7}")
+    for span in sorted(spans, key=lambda s: -s["duration_ms"])[:top]:
+        print(
+            f"{_step_of(span, by_id)[:47]:<48}{span['kind']:<7}"
+            f"{span['duration_ms']:>10.0f}{(span.get('model') or '')[:15]:>16}"
+            f"{span.get('total_tokens') or '':>8}{span.get('cache') or '':>7}"
+        )
+
+    per_step: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for span in llm_spans:
+        step = per_step[_step_of(span, by_id)]
+        step["calls"] += 1
+        step["hits"] += span.get("cache") == "hit"
+        step["input"] += span.get("input_tokens") or 0
+        step["output"] += span.get("output_tokens") or 0
+        step["ms"] += span["duration_ms"]
+    print("\n🔢 Tokens per step")
+    print(f"{'step':<48}{'calls':>6}{'hits':>6}{'input':>9}{'output':>9}{'LLM ms':>10}")
+    for name, step in sorted(
+        per_step.items(), key=lambda item: -(item[1]["input"] + item[1]["output"])
+    ):
+        print(
+            f"{name[:47]:<48}{step['calls']:>6.0f}{step['hits']:>6.0f}"
+            f"{step['input']:>9.0f}{step['output']:>9.0f}{step['ms']:>10.0f}"
+        )
+
+
+def main():
+    """Print the report of a trace file from the command line."""
+    parser = argparse.ArgumentParser(description="Report of a JSONL trace file")
+    parser.add_argument("path", help="JSONL file written by tracing()")
+    parser.add_argument("--top", type=int, default=10, help="Slowest spans listed")
+    args = parser.parse_args()
+    print_report(load_spans(args.path), args.top)
+
+
+if __name__ == "__main__":
+    main()